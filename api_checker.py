@@ -1,29 +1,90 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import sys
 import requests
 import logging
 import json
-from typing import Dict, Any, Optional, List
+import threading
+from typing import Dict, Any, Optional, List, Tuple, Callable, Union
+from concurrent.futures import ThreadPoolExecutor
 import time
+from dotenv import load_dotenv
+
+from utils import create_http_session, parse_retry_after, TokenBucket
+from eligibility_cache import get_eligibility_cache
+
+# Загружаем переменные окружения
+load_dotenv()
 
 # API URL для получения доказательства
-API_URL = "https://common.kerneldao.com/merkle/proofs/kernel_eth"
+API_URL = os.getenv("API_URL", "https://common.kerneldao.com/merkle/proofs/kernel_eth")
+# Идентификатор кампании для кэша - последний сегмент пути API
+CAMPAIGN = API_URL.rstrip("/").rsplit("/", 1)[-1]
+
+# Сколько запросов к API выполнять одновременно
+ELIGIBILITY_CONCURRENCY = int(os.getenv("ELIGIBILITY_CONCURRENCY", "16"))
+# Ограничение частоты запросов к API (запросов в секунду, 0 - без ограничения).
+# При 10 запросах/с проверка 10 000 кошельков без кэша занимает ~17 минут;
+# если API допускает больше, лимит поднимается вместе с ELIGIBILITY_CONCURRENCY
+ELIGIBILITY_RATE_LIMIT = float(os.getenv("ELIGIBILITY_RATE_LIMIT", "10"))
+# Сколько раз повторять запрос после ответа 429
+MAX_RATE_LIMIT_RETRIES = 5
+# Пауза после 429, если API не прислал Retry-After
+DEFAULT_RETRY_AFTER = 5.0
+
+# Общие для всех потоков сессия и ограничитель частоты
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_rate_limiter = TokenBucket(ELIGIBILITY_RATE_LIMIT)
+
+class EligibilityCheckError(Exception):
+    """
+    API не дал ответа об eligibility (исчерпаны повторы после 429, 5xx, сеть,
+    некорректный ответ). Это не "не eligible": адрес нужно проверить позже
+    """
+
+def get_api_session() -> requests.Session:
+    """
+    Возвращает общую HTTP-сессию с пулом keep-alive соединений к API
 
-def check_eligibility(address: str, signature: str) -> Optional[Dict[str, Any]]:
+    Returns:
+        requests.Session: Сессия
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_http_session(ELIGIBILITY_CONCURRENCY)
+        return _session
+
+def check_eligibility(address: str, signature: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
     """
-    Проверяет eligibility адреса для получения дропа, делая запрос к API KernelDAO
+    Проверяет eligibility адреса для получения дропа, делая запрос к API KernelDAO.
+    Ответы (включая "не eligible") сохраняются в кэш на диске; ошибки не кэшируются
+    и выбрасываются как EligibilityCheckError, чтобы их нельзя было спутать с "не eligible".
     
     Args:
         address (str): Адрес, для которого проверяется eligibility
         signature (str): Подпись сообщения "Sign message to view your Season 1 points"
+        use_cache (bool): Использовать ли кэш eligibility
         
     Returns:
         Optional[Dict[str, Any]]: Словарь с данными eligibility (balance, proof)
-                                 или None если адрес не eligible или произошла ошибка
+                                 или None если адрес не eligible
+
+    Raises:
+        EligibilityCheckError: Если API не дал ответа об eligibility
     """
     logger = logging.getLogger("api_checker")
     
+    cache = get_eligibility_cache() if use_cache else None
+    if cache:
+        found, cached_data = cache.get(CAMPAIGN, address)
+        if found:
+            logger.debug(f"Результат eligibility для {address} взят из кэша")
+            return cached_data
+    
     try:
         # Формируем URL с параметрами
         url = f"{API_URL}?address={address}&signature={signature}"
@@ -34,9 +95,21 @@ def check_eligibility(address: str, signature: str) -> Optional[Dict[str, Any]]:
             "User-Agent": "Mozilla/5.0 KernelDAO-Bot/1.0"
         }
         
-        # Делаем запрос к API
-        logger.info(f"Отправка запроса к API для адреса {address}")
-        response = requests.get(url, headers=headers, timeout=30)
+        # Делаем запрос к API через общую сессию с учетом ограничения частоты.
+        # На 429 ждем столько, сколько просит API (Retry-After), и повторяем
+        session = get_api_session()
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            _rate_limiter.acquire()
+            logger.info(f"Отправка запроса к API для адреса {address}")
+            response = session.get(url, headers=headers, timeout=30)
+            
+            if response.status_code != 429:
+                break
+                
+            retry_after = parse_retry_after(response.headers.get("Retry-After"), DEFAULT_RETRY_AFTER)
+            logger.warning(f"API ограничил частоту запросов (429), пауза {retry_after:.1f} с "
+                           f"(попытка {attempt+1}/{MAX_RATE_LIMIT_RETRIES})")
+            _rate_limiter.pause(retry_after)
         
         # Проверяем ответ
         if response.status_code == 200:
@@ -45,7 +118,7 @@ def check_eligibility(address: str, signature: str) -> Optional[Dict[str, Any]]:
             # Проверяем наличие data в ответе
             if "data" not in response_data:
                 logger.warning(f"API вернул ответ без поля 'data' для {address}: {response_data}")
-                return None
+                raise EligibilityCheckError(f"Ответ API без поля 'data' для {address}")
                 
             data = response_data["data"]
             
@@ -57,30 +130,72 @@ def check_eligibility(address: str, signature: str) -> Optional[Dict[str, Any]]:
             # Проверяем критерии eligibility: непустой proof и положительный balance
             if proof and int(balance) > 0:
                 logger.info(f"✅ Адрес {address} eligible для получения {balance_tokens:.4f} KERNEL")
+                if cache:
+                    cache.put_eligible(CAMPAIGN, address, data)
                 return data
             else:
                 logger.info(f"❌ Адрес {address} не eligible. Balance: {balance_tokens:.4f} KERNEL, Proof: {'Есть' if proof else 'Отсутствует'}")
+                if cache:
+                    cache.put_not_eligible(CAMPAIGN, address)
                 return None
                 
         elif response.status_code == 404:
             # 404 обычно означает что адрес не eligible
             logger.info(f"❌ Адрес {address} не eligible для получения дропа (404)")
+            if cache:
+                cache.put_not_eligible(CAMPAIGN, address)
             return None
             
         else:
             # Другие ошибки
             logger.error(f"Ошибка API: {response.status_code} - {response.text}")
-            return None
+            raise EligibilityCheckError(f"Ошибка API: {response.status_code}")
             
+    except EligibilityCheckError:
+        raise
     except requests.RequestException as e:
         logger.error(f"Ошибка сети при запросе к API: {str(e)}")
-        return None
+        raise EligibilityCheckError(f"Ошибка сети: {str(e)}") from e
     except json.JSONDecodeError as e:
         logger.error(f"Ошибка декодирования ответа API: {str(e)}")
-        return None
+        raise EligibilityCheckError(f"Ошибка декодирования ответа API: {str(e)}") from e
     except Exception as e:
         logger.error(f"Неожиданная ошибка при проверке eligibility: {str(e)}")
-        return None
+        raise EligibilityCheckError(f"Неожиданная ошибка: {str(e)}") from e
+
+def check_eligibility_many(
+    requests_data: List[Tuple[str, str]],
+    max_workers: int = ELIGIBILITY_CONCURRENCY,
+    on_done: Callable[[str, Optional[Dict[str, Any]]], None] = None
+) -> List[Union[Dict[str, Any], None, EligibilityCheckError]]:
+    """
+    Проверяет eligibility для многих адресов одновременно. Частота запросов
+    ограничивается общим token bucket, ответы 429 обрабатываются с учетом Retry-After.
+    Ошибка по одному адресу не прерывает остальные: вместо результата для него
+    возвращается экземпляр EligibilityCheckError.
+
+    Args:
+        requests_data (List[Tuple[str, str]]): Список пар (адрес, подпись)
+        max_workers (int): Максимальное количество одновременных запросов
+        on_done: Callback (адрес, результат), вызываемый по завершении каждого запроса
+
+    Returns:
+        List[Union[Dict[str, Any], None, EligibilityCheckError]]: Результаты check_eligibility
+            (или ошибки) в порядке входного списка
+    """
+    def worker(item: Tuple[str, str]) -> Union[Dict[str, Any], None, EligibilityCheckError]:
+        address, signature = item
+        try:
+            result = check_eligibility(address, signature)
+        except EligibilityCheckError as e:
+            result = e
+        if on_done:
+            on_done(address, result)
+        return result
+        
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map возвращает результаты в порядке входных данных
+        return list(executor.map(worker, requests_data))
 
 def retry_check_eligibility(address: str, signature: str, max_retries: int = 3, delay: int = 2) -> Optional[Dict[str, Any]]:
     """
@@ -94,27 +209,23 @@ def retry_check_eligibility(address: str, signature: str, max_retries: int = 3,
         
     Returns:
         Optional[Dict[str, Any]]: Данные eligibility (balance, proof) или None
+
+    Raises:
+        EligibilityCheckError: Если API не ответил ни с одной попытки
     """
     logger = logging.getLogger("api_checker")
     
     for attempt in range(max_retries):
         try:
-            result = check_eligibility(address, signature)
-            if result is not None:
-                return result
-                
-            # Если получили None из-за 404 (не eligible), не повторяем
-            elif attempt == 0:
-                return None
-                
-        except Exception as e:
+            # None - ответ "не eligible", его не повторяем
+            return check_eligibility(address, signature)
+        except EligibilityCheckError as e:
             logger.warning(f"Попытка {attempt+1}/{max_retries} не удалась: {str(e)}")
+            if attempt == max_retries - 1:
+                raise
             
         # Ждем перед следующей попыткой
-        if attempt < max_retries - 1:
-            time.sleep(delay)
-            
-    return None
+        time.sleep(delay)
 
 if __name__ == "__main__":
     # Настраиваем базовое логирование для тестирования
@@ -125,10 +236,14 @@ if __name__ == "__main__":
     test_address = "0x742d35Cc6634C0532925a3b844Bc454e4438f44e"
     test_signature = "0x..."  # Подставьте реальную подпись
     
-    result = check_eligibility(test_address, test_signature)
+    try:
+        result = check_eligibility(test_address, test_signature)
+    except EligibilityCheckError as e:
+        print(f"⚠️ Не удалось проверить {test_address}: {str(e)}")
+        sys.exit(1)
     if result:
         print(f"✅ Адрес {test_address} eligible!")
         print(f"Balance: {int(result.get('balance', '0'))/10**18:.4f} KERNEL")
         print(f"Proof: {result.get('proof', [])}")
     else:
-        print(f"❌ Адрес {test_address} не eligible или произошла ошибка") 
\ No newline at end of file
+        print(f"❌ Адрес {test_address} не eligible") 
\ No newline at end of file
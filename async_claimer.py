@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import asyncio
+import logging
+from typing import List, Dict, Any, Tuple, Optional, Callable
+from web3 import Web3
+from eth_account.signers.local import LocalAccount
+from dotenv import load_dotenv
+
+from rpc_provider import async_web3_provider
+from signer import get_signature, get_signatures, SEASON1_MESSAGE
+from api_checker import check_eligibility, EligibilityCheckError
+from balance_checker import check_gas_requirements, get_claimed_multicall
+from claim_index import ClaimIndex
+from wallet_loader import Wallet
+from gas_oracle import estimate_fees
+from nonce_manager import get_nonce_manager, is_nonce_too_low_error
+from receipt_tracker import get_receipt_tracker, ReceiptTimeout
+from tx_replacer import get_tx_replacer
+from gas_estimates import get_gas_estimate_cache, gas_key, GasKey, GAS_LIMIT_MULTIPLIER
+from deadlines import deadline, without_deadline, WALLET_TIME_BUDGET
+from journal import get_journal, STAGE_CLAIM, STAGE_SEND, STATUS_PENDING, STATUS_DONE, STATUS_FAILED
+from claimer import (
+    DROP_CONTRACT_ADDRESS, DROP_CONTRACT_ABI, CLAIM_INDEX, DEFAULT_GAS_LIMIT
+)
+from sender import TOKEN_ADDRESS, TOKEN_ABI, DEFAULT_GAS_LIMIT as DEFAULT_TRANSFER_GAS_LIMIT
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+CLAIM_CONCURRENCY = int(os.getenv("CLAIM_CONCURRENCY", "20"))
+# Сколько отправок на биржу выполняется одновременно в режиме клейм + отправка
+SEND_CONCURRENCY = int(os.getenv("SEND_CONCURRENCY", "10"))
+ESTIMATE_GAS_TIMEOUT = 15
+
+# Строка результата: (адрес, статус, tx hash, amount KERNEL, баланс ETH)
+ClaimResult = Tuple[str, str, str, str, str]
+# Строка результата клейма + (статус отправки, tx hash отправки)
+PipelineResult = Tuple[str, str, str, str, str, str, str]
+
+async def _submit_transaction(
+    web3: Web3,
+    account: LocalAccount,
+    address: str,
+    call,
+    default_gas_limit: int,
+    chain_id: int,
+    on_sent: Callable[[str, int], None] = lambda tx_hash, nonce: None,
+    estimate_key: Optional[GasKey] = None
+) -> Tuple[str, Optional[bool]]:
+    """
+    Отправляет вызов контракта с nonce из общего NonceManager и ждет подтверждения
+
+    Args:
+        web3 (Web3): Асинхронный объект Web3
+        account (LocalAccount): Аккаунт отправителя
+        address (str): Адрес отправителя
+        call: Вызов функции контракта (contract.functions.<f>(...))
+        default_gas_limit (int): gasLimit, если оценить его не удалось
+        chain_id (int): Chain ID сети
+        on_sent: Callback (хеш, nonce) сразу после отправки, до подтверждения
+        estimate_key (Optional[GasKey]): Вид вызова для кэша оценок газа
+
+    Returns:
+        Tuple[str, Optional[bool]]: (хеш транзакции, успех).
+            Успех равен None, если подтверждения дождаться не удалось
+    """
+    logger = logging.getLogger("claimer")
+    nonce_manager = get_nonce_manager()
+
+    # EIP-1559: комиссии из общего оракула газа - eth_feeHistory запрашивается
+    # один раз на блок для всех кошельков (оракул синхронный, поэтому в потоке)
+    fees = await asyncio.to_thread(estimate_fees)
+    max_fee = fees["max_fee_wei"]
+    priority_fee = fees["priority_fee_wei"]
+
+    # gasLimit берем из кэша оценок, пока их не набралось - оцениваем с таймаутом;
+    # asyncio.wait_for не зависит от сигналов
+    gas_limit = default_gas_limit
+    gas_estimates = get_gas_estimate_cache()
+    cached_estimate = gas_estimates.get(estimate_key) if estimate_key else None
+    if cached_estimate is not None:
+        gas_limit = int(cached_estimate * GAS_LIMIT_MULTIPLIER)
+    else:
+        try:
+            estimated = await asyncio.wait_for(call.estimate_gas({'from': address}), ESTIMATE_GAS_TIMEOUT)
+            if estimate_key:
+                gas_estimates.add(estimate_key, estimated)
+            gas_limit = int(estimated * GAS_LIMIT_MULTIPLIER)
+        except asyncio.TimeoutError:
+            logger.warning(f"Таймаут при оценке gasLimit для {address}. Используем значение по умолчанию.")
+        except Exception as e:
+            logger.warning(f"Не удалось оценить gasLimit для {address}: {str(e)}. Используем дефолтное значение.")
+
+    for attempt in range(2):
+        # Без seed менеджер запрашивает pending nonce у ноды, поэтому в потоке
+        nonce = await asyncio.to_thread(nonce_manager.next_nonce, address)
+        tx = await call.build_transaction({
+            'from': address,
+            'gas': gas_limit,
+            'maxFeePerGas': max_fee,
+            'maxPriorityFeePerGas': priority_fee,
+            'nonce': nonce,
+            'chainId': chain_id
+        })
+
+        signed_tx = account.sign_transaction(tx)
+        try:
+            tx_hash = await web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            break
+        except Exception as e:
+            if is_nonce_too_low_error(e) and attempt == 0:
+                logger.warning(f"Nonce {nonce} для {address} уже использован, синхронизируем с сетью")
+                await asyncio.to_thread(nonce_manager.resync, address)
+                continue
+            nonce_manager.release(address, nonce)
+            raise
+
+    tx_hash_hex = Web3.to_hex(tx_hash)
+    logger.info(f"Транзакция для {address} отправлена: {tx_hash_hex}")
+    on_sent(tx_hash_hex, nonce)
+
+    try:
+        # Receipts всех кошельков опрашиваются трекером одним batch на блок
+        receipt = await asyncio.wrap_future(get_receipt_tracker().track(tx_hash_hex))
+    except ReceiptTimeout:
+        # Зависшую транзакцию ускоряем заменами с тем же nonce; ожидание замен
+        # блокирующее, но нужно только для редких зависших транзакций
+        logger.warning(f"Транзакция {tx_hash_hex} не подтверждена вовремя, ускоряем")
+        replacer = get_tx_replacer()
+        replacer.watch(account, tx, tx_hash_hex)
+        # Замены ждут по своим таймаутам, бюджет кошелька на них не распространяется
+        with without_deadline():
+            receipt = await asyncio.to_thread(replacer.wait, address, nonce, replace_first=True)
+    except Exception as e:
+        logger.warning(f"Не удалось дождаться подтверждения {tx_hash_hex}: {str(e)}")
+        return tx_hash_hex, None
+
+    if receipt is None:
+        return tx_hash_hex, None
+    if receipt['status'] != 1 and estimate_key:
+        # Откат или нехватка газа: оценки этого вида вызова собираем заново
+        gas_estimates.invalidate(estimate_key)
+    # Подтвердиться могла одна из замен
+    return receipt['transactionHash'], receipt['status'] == 1
+
+async def _claim_on_chain(
+    web3: Web3,
+    contract,
+    account: LocalAccount,
+    address: str,
+    amount: int,
+    proof: List[str],
+    chain_id: int,
+    on_sent: Callable[[str, int], None] = lambda tx_hash, nonce: None
+) -> Tuple[Optional[str], Optional[bool]]:
+    """
+    Отправляет транзакцию claim() и ждет ее подтверждения
+
+    Returns:
+        Tuple[Optional[str], Optional[bool]]: (хеш транзакции, успех).
+            Успех равен None, если подтверждения дождаться не удалось
+    """
+    logger = logging.getLogger("claimer")
+    claim_call = contract.functions.claim(CLAIM_INDEX, address, amount, proof)
+    logger.info(f"Отправка транзакции клейма для {address}")
+    # Получатель дропа получает токен впервые - запись в новый слот
+    return await _submit_transaction(
+        web3, account, address, claim_call, DEFAULT_GAS_LIMIT, chain_id, on_sent,
+        estimate_key=gas_key(DROP_CONTRACT_ADDRESS, "claim", len(proof), recipient_is_new=True)
+    )
+
+async def _claim_wallet(
+    web3: Web3,
+    contract,
+    wallet: Wallet,
+    gas_balance: Optional[float],
+    gas_data: Dict[str, Any],
+    claim_index: Optional[ClaimIndex],
+    chain_id: int,
+    on_status: Callable[[str, str], None],
+    already_claimed: Optional[bool] = None
+) -> Tuple[ClaimResult, bool, Optional[int]]:
+    """
+    Выполняет для одного кошелька проверку газа, подпись, проверку eligibility,
+    проверку предыдущего клейма и сам клейм
+
+    Args:
+        already_claimed (Optional[bool]): Статус клейма из пакетной проверки
+                                          (prefetch_claimed); None - проверить здесь
+
+    Returns:
+        Tuple[ClaimResult, bool, Optional[int]]: (строка результата, есть ли на кошельке
+            токены дропа, полученная сумма в wei - только для клейма в этом запуске)
+    """
+    logger = logging.getLogger("claim")
+    journal = get_journal()
+    address = wallet.address
+
+    # Проверяем баланс ETH
+    if gas_balance is None:
+        gas_balance = float(Web3.from_wei(await web3.eth.get_balance(address), "ether"))
+    gas_reqs = check_gas_requirements(address, gas_balance, gas_data)
+    eth_balance = f"{gas_reqs['gas_balance']:.6f}"
+
+    if not gas_reqs['has_enough_for_claim']:
+        logger.warning(f"Недостаточно ETH для клейма на адресе {address}: {gas_reqs['gas_balance']:.6f} ETH (требуется ~{gas_reqs['claim_cost']:.6f} ETH)")
+        return (address, "❌ Недостаточно ETH", "-", "-", eth_balance), False, None
+
+    # Подпись и запрос к API выполняются в потоках, чтобы не блокировать event loop
+    on_status(address, f"Проверка eligibility для {address[:8]}...")
+    signature = await asyncio.to_thread(get_signature, wallet.private_key, SEASON1_MESSAGE, address)
+    try:
+        eligibility_data = await asyncio.to_thread(check_eligibility, address, signature)
+    except EligibilityCheckError as e:
+        # Ошибка API - не "не eligible": кошелек остается для повторного запуска
+        logger.warning(f"Не удалось проверить eligibility для {address}: {str(e)}")
+        return (address, "⚠️ Ошибка API, повторите позже", "-", "-", eth_balance), False, None
+
+    if not eligibility_data or "balance" not in eligibility_data or int(eligibility_data["balance"]) == 0:
+        logger.info(f"Адрес {address} не eligible для клейма")
+        return (address, "❌ Not eligible", "-", "0", eth_balance), False, None
+
+    balance = int(eligibility_data["balance"])
+    balance_in_kernel = f"{balance / 10**18:.4f}"
+
+    # Статус обычно уже получен пакетно; если пакетная проверка для адреса
+    # не удалась, индекс клеймов подтверждает клейм, остальное - isClaimed
+    if already_claimed is None:
+        on_status(address, f"Проверка предыдущих клеймов для {address[:8]}...")
+        already_claimed = claim_index is not None and claim_index.is_claimed(address, CLAIM_INDEX)
+        if not already_claimed:
+            already_claimed = await contract.functions.isClaimed(CLAIM_INDEX, address).call()
+
+    if already_claimed:
+        logger.info(f"Адрес {address} уже выполнил клейм ранее")
+        journal.record(address, STAGE_CLAIM, STATUS_DONE, amount=balance)
+        return (address, "⚠️ Already claimed", "-", balance_in_kernel, eth_balance), True, None
+
+    on_status(address, f"Отправка транзакции клейма для {address[:8]}...")
+    tx_hash, success = await _claim_on_chain(
+        web3, contract, wallet.account, address, balance, eligibility_data["proof"], chain_id,
+        on_sent=lambda tx_hash, nonce: journal.record(address, STAGE_CLAIM, STATUS_PENDING, tx_hash, nonce, balance)
+    )
+
+    if success is None:
+        logger.warning(f"Статус клейма для {address} неизвестен, tx: {tx_hash}")
+        return (address, "⏳ Не подтверждена", tx_hash, balance_in_kernel, eth_balance), False, None
+    if not success:
+        logger.error(f"Транзакция клейма для {address} не удалась: {tx_hash}")
+        journal.record(address, STAGE_CLAIM, STATUS_FAILED, tx_hash)
+        return (address, "❌ Failed", tx_hash, balance_in_kernel, eth_balance), False, None
+
+    journal.record(address, STAGE_CLAIM, STATUS_DONE, tx_hash)
+    if claim_index:
+        claim_index.mark_claimed(address, CLAIM_INDEX)
+    logger.info(f"Успешный клейм для {address}, tx: {tx_hash}, amount: {balance_in_kernel} KERNEL")
+    return (address, "✅ Claimed", tx_hash, balance_in_kernel, eth_balance), True, balance
+
+async def claim_wallet(
+    web3: Web3,
+    contract,
+    wallet: Wallet,
+    gas_balance: Optional[float],
+    gas_data: Dict[str, Any],
+    claim_index: Optional[ClaimIndex],
+    chain_id: int,
+    on_status: Callable[[str, str], None],
+    already_claimed: Optional[bool] = None
+) -> ClaimResult:
+    """
+    Выполняет для одного кошелька проверку газа, подпись, проверку eligibility,
+    проверку предыдущего клейма и сам клейм
+
+    Returns:
+        ClaimResult: Строка результата для итоговой таблицы
+    """
+    result, _, _ = await _claim_wallet(web3, contract, wallet, gas_balance, gas_data, claim_index,
+                                       chain_id, on_status, already_claimed)
+    return result
+
+async def send_wallet(
+    web3: Web3,
+    token_contract,
+    wallet: Wallet,
+    amount: Optional[int],
+    chain_id: int,
+    on_status: Callable[[str, str], None]
+) -> Tuple[str, str]:
+    """
+    Отправляет токены дропа с кошелька на его адрес биржи
+
+    Args:
+        amount (Optional[int]): Сумма в wei; None - весь баланс токена
+
+    Returns:
+        Tuple[str, str]: (статус отправки, tx hash)
+    """
+    logger = logging.getLogger("token_sender")
+    journal = get_journal()
+    address = wallet.address
+
+    if not wallet.exchange_address:
+        logger.warning(f"Не указан адрес биржи для кошелька {address}")
+        return "❌ Нет адреса биржи", "-"
+
+    if amount is None:
+        amount = await token_contract.functions.balanceOf(address).call()
+    if amount <= 0:
+        logger.warning(f"Нет токенов для отправки с {address}")
+        return "⚠️ Нет токенов", "-"
+
+    on_status(address, f"Отправка токенов на биржу с {address[:8]}...")
+    # Оценки перевода выбираются по реальному балансу получателя; если его
+    # не было в пакетной проверке, запрашиваем, иначе кэш оценок не используется
+    gas_estimates = get_gas_estimate_cache()
+    recipient_is_new = gas_estimates.is_new_recipient(wallet.exchange_address)
+    if recipient_is_new is None:
+        try:
+            recipient_balance = await token_contract.functions.balanceOf(wallet.exchange_address).call()
+            gas_estimates.set_recipient_balances({wallet.exchange_address: recipient_balance})
+            recipient_is_new = recipient_balance == 0
+        except Exception as e:
+            logger.warning(f"Не удалось проверить баланс {wallet.exchange_address}: {str(e)}")
+    tx_hash, success = await _submit_transaction(
+        web3, wallet.account, address,
+        token_contract.functions.transfer(wallet.exchange_address, amount),
+        DEFAULT_TRANSFER_GAS_LIMIT, chain_id,
+        on_sent=lambda tx_hash, nonce: journal.record(address, STAGE_SEND, STATUS_PENDING, tx_hash, nonce, amount),
+        estimate_key=gas_key(token_contract.address, "transfer", recipient_is_new=recipient_is_new)
+        if recipient_is_new is not None else None
+    )
+
+    if success is None:
+        logger.warning(f"Статус отправки для {address} неизвестен, tx: {tx_hash}")
+        return "⏳ Не подтверждена", tx_hash
+    if not success:
+        logger.error(f"Транзакция отправки для {address} не удалась: {tx_hash}")
+        journal.record(address, STAGE_SEND, STATUS_FAILED, tx_hash)
+        return "❌ Failed", tx_hash
+
+    journal.record(address, STAGE_SEND, STATUS_DONE, tx_hash)
+    gas_estimates.mark_funded(wallet.exchange_address)
+    logger.info(f"Токены отправлены с {address} на {wallet.exchange_address}, tx: {tx_hash}")
+    return "✅ Отправлено", tx_hash
+
+def prefetch_claimed(wallets: List[Wallet], claim_index: Optional[ClaimIndex]) -> Dict[str, bool]:
+    """
+    Статус клейма кошельков до их обработки: адреса из индекса клеймов
+    заклеймлены, остальные проверяются через isClaimed одним Multicall3
+    на пачку. Индекс только подтверждает клейм: раскладка события Claimed
+    не сверена с контрактом, поэтому отсутствие адреса в нем ничего не значит.
+
+    Args:
+        wallets (List[Wallet]): Кошельки
+        claim_index (Optional[ClaimIndex]): Индекс клеймов или None
+
+    Returns:
+        Dict[str, bool]: {адрес в нижнем регистре: клейм выполнен}; адреса, которые
+                         проверить не удалось, отсутствуют (их проверит сам кошелек)
+    """
+    logger = logging.getLogger("claim")
+    claimed = {}
+    unknown = []
+    for wallet in wallets:
+        if claim_index is not None and claim_index.is_claimed(wallet.address, CLAIM_INDEX):
+            claimed[wallet.address.lower()] = True
+        else:
+            unknown.append(wallet.address)
+    if not unknown:
+        return claimed
+
+    try:
+        statuses = get_claimed_multicall(unknown, CLAIM_INDEX, DROP_CONTRACT_ADDRESS)
+    except Exception as e:
+        logger.warning(f"Не удалось проверить клеймы пакетно, кошельки проверят их по одному: {str(e)}")
+        return claimed
+    claimed.update({address.lower(): status for address, status in statuses.items() if status is not None})
+    return claimed
+
+def _journal_claim_result(address: str, state: Dict[str, Any]) -> ClaimResult:
+    """
+    Строка результата клейма по записи журнала (клейм завершен или еще ждет подтверждения)
+    """
+    status = "✅ Claimed (журнал)" if state["status"] == STATUS_DONE else "⏳ Не подтверждена"
+    amount = f"{state['amount'] / 10**18:.4f}" if state["amount"] is not None else "-"
+    return (address, status, state["tx_hash"] or "-", amount, "-")
+
+def _is_finished(state: Optional[Dict[str, Any]]) -> bool:
+    """
+    Этап кошелька завершен по журналу
+    """
+    return state is not None and state["status"] == STATUS_DONE
+
+def _is_settled(state: Optional[Dict[str, Any]]) -> bool:
+    """
+    Этап не нужно повторять в этом запуске (после Journal.reconcile):
+    он завершен или его транзакция еще в mempool
+    """
+    return state is not None and state["status"] in (STATUS_DONE, STATUS_PENDING)
+
+async def claim_for_all_async(
+    wallets: List[Wallet],
+    gas_balances: Dict[str, float],
+    gas_data: Dict[str, Any],
+    claim_index: Optional[ClaimIndex] = None,
+    concurrency: int = CLAIM_CONCURRENCY,
+    on_status: Callable[[str, str], None] = lambda address, description: None,
+    on_done: Callable[[ClaimResult], None] = lambda result: None
+) -> List[ClaimResult]:
+    """
+    Выполняет клейм для всех кошельков одновременно, ограничивая число
+    кошельков в работе значением concurrency
+
+    Args:
+        wallets (List[Wallet]): Список кошельков
+        gas_balances (Dict[str, float]): Заранее полученные балансы ETH
+        gas_data (Dict[str, Any]): Цены газа от get_current_gas_prices()
+        claim_index (Optional[ClaimIndex]): Индекс клеймов или None
+        concurrency (int): Максимальное количество кошельков, обрабатываемых одновременно
+        on_status: Callback (адрес, описание текущего шага)
+        on_done: Callback с результатом по завершении кошелька
+
+    Returns:
+        List[ClaimResult]: Результаты в порядке исходного списка кошельков
+    """
+    logger = logging.getLogger("claim")
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    # Кошельки, клейм которых завершен по журналу, не обрабатываются повторно;
+    # записи pending разбираются перед обработкой кошелька
+    claim_states = await asyncio.to_thread(get_journal().resume, [wallet.address for wallet in wallets], STAGE_CLAIM)
+    todo = [wallet for wallet in wallets if not _is_finished(claim_states.get(wallet.address.lower()))]
+    
+    # Подписываем сообщение для всех кошельков заранее пулом процессов;
+    # дальше claim_wallet берет подписи из кэша
+    try:
+        await asyncio.to_thread(
+            get_signatures,
+            [wallet.key for wallet in todo],
+            SEASON1_MESSAGE,
+            [wallet.address for wallet in todo]
+        )
+    except Exception as e:
+        logger.warning(f"Пакетная подпись не удалась, кошельки будут подписаны по одному: {str(e)}")
+    claimed = await asyncio.to_thread(prefetch_claimed, todo, claim_index)
+
+    async with async_web3_provider(pool_size=concurrency) as web3:
+        contract = web3.eth.contract(
+            address=Web3.to_checksum_address(DROP_CONTRACT_ADDRESS),
+            abi=DROP_CONTRACT_ABI
+        )
+        chain_id = await web3.eth.chain_id
+
+        async def run(wallet: Wallet) -> ClaimResult:
+            address = wallet.address
+            claim_state = claim_states.get(address.lower())
+            if _is_finished(claim_state):
+                result = _journal_claim_result(address, claim_state)
+                on_done(result)
+                return result
+
+            async with semaphore:
+                try:
+                    # Срок хранится в контексте задачи и действует на все RPC-вызовы кошелька
+                    with deadline(WALLET_TIME_BUDGET):
+                        claim_state = await asyncio.to_thread(get_journal().reconcile, address, STAGE_CLAIM, claim_state)
+                        if _is_settled(claim_state):
+                            result = _journal_claim_result(address, claim_state)
+                        else:
+                            result = await claim_wallet(
+                                web3, contract, wallet, gas_balances.get(address), gas_data,
+                                claim_index, chain_id, on_status, claimed.get(address.lower())
+                            )
+                except Exception as e:
+                    logger.error(f"Ошибка при клейме для {address}: {str(e)}")
+                    result = (address, f"❌ Ошибка: {str(e)}", "-", "-", "-")
+            on_done(result)
+            return result
+
+        return list(await asyncio.gather(*(run(wallet) for wallet in wallets)))
+
+async def claim_and_send_all_async(
+    wallets: List[Wallet],
+    gas_balances: Dict[str, float],
+    gas_data: Dict[str, Any],
+    claim_index: Optional[ClaimIndex] = None,
+    concurrency: int = CLAIM_CONCURRENCY,
+    send_concurrency: int = SEND_CONCURRENCY,
+    token_address: str = TOKEN_ADDRESS,
+    on_status: Callable[[str, str], None] = lambda address, description: None,
+    on_done: Callable[[PipelineResult], None] = lambda result: None
+) -> List[PipelineResult]:
+    """
+    Клеймит токены и сразу отправляет их на биржу. Отправка с кошелька
+    начинается, как только подтвердился его клейм, и идет параллельно с
+    клеймами остальных кошельков; число одновременных отправок ограничено
+    send_concurrency. Кошельки, заклеймленные ранее, тоже отправляют весь
+    баланс токена.
+
+    Args:
+        wallets (List[Wallet]): Список кошельков
+        gas_balances (Dict[str, float]): Заранее полученные балансы ETH
+        gas_data (Dict[str, Any]): Цены газа от get_current_gas_prices()
+        claim_index (Optional[ClaimIndex]): Индекс клеймов или None
+        concurrency (int): Максимальное количество одновременных клеймов
+        send_concurrency (int): Максимальное количество одновременных отправок
+        token_address (str): Адрес токена дропа
+        on_status: Callback (адрес, описание текущего шага)
+        on_done: Callback с результатом по завершении кошелька
+
+    Returns:
+        List[PipelineResult]: Результаты в порядке исходного списка кошельков
+    """
+    logger = logging.getLogger("claim")
+    claim_semaphore = asyncio.Semaphore(concurrency)
+    send_semaphore = asyncio.Semaphore(send_concurrency)
+
+    # Состояние кошельков по журналу: завершенные этапы пропускаются
+    journal = get_journal()
+    addresses = [wallet.address for wallet in wallets]
+    claim_states = await asyncio.to_thread(journal.resume, addresses, STAGE_CLAIM)
+    send_states = await asyncio.to_thread(journal.resume, addresses, STAGE_SEND)
+    todo = [wallet for wallet in wallets if not _is_finished(claim_states.get(wallet.address.lower()))]
+
+    try:
+        await asyncio.to_thread(
+            get_signatures,
+            [wallet.key for wallet in todo],
+            SEASON1_MESSAGE,
+            [wallet.address for wallet in todo]
+        )
+    except Exception as e:
+        logger.warning(f"Пакетная подпись не удалась, кошельки будут подписаны по одному: {str(e)}")
+    claimed = await asyncio.to_thread(prefetch_claimed, todo, claim_index)
+
+    async with async_web3_provider(pool_size=concurrency + send_concurrency) as web3:
+        contract = web3.eth.contract(
+            address=Web3.to_checksum_address(DROP_CONTRACT_ADDRESS),
+            abi=DROP_CONTRACT_ABI
+        )
+        token_contract = web3.eth.contract(
+            address=Web3.to_checksum_address(token_address),
+            abi=TOKEN_ABI
+        )
+        chain_id = await web3.eth.chain_id
+
+        async def run(wallet: Wallet) -> PipelineResult:
+            address = wallet.address
+            has_tokens, amount = False, None
+            claim_state = claim_states.get(address.lower())
+            send_state = send_states.get(address.lower())
+
+            # Записи pending из прошлого запуска разбираем до начала работы с кошельком
+            if any(state and state["status"] == STATUS_PENDING for state in (claim_state, send_state)):
+                async with claim_semaphore:
+                    try:
+                        with deadline(WALLET_TIME_BUDGET):
+                            send_state = await asyncio.to_thread(journal.reconcile, address, STAGE_SEND, send_state)
+                            claim_state = await asyncio.to_thread(journal.reconcile, address, STAGE_CLAIM, claim_state)
+                    except Exception as e:
+                        logger.error(f"Не удалось проверить транзакции из журнала для {address}: {str(e)}")
+                        result = (address, f"❌ Ошибка: {str(e)}", "-", "-", "-", "-", "-")
+                        on_done(result)
+                        return result
+
+            if _is_settled(send_state):
+                send_status = "✅ Отправлено (журнал)" if send_state["status"] == STATUS_DONE else "⏳ Не подтверждена"
+                claim_result = _journal_claim_result(address, claim_state) if claim_state else (address, "-", "-", "-", "-")
+                result = claim_result + (send_status, send_state["tx_hash"] or "-")
+                on_done(result)
+                return result
+
+            if _is_settled(claim_state):
+                # Клейм из прошлого запуска: если он подтвержден, отправляем весь баланс
+                claim_result = _journal_claim_result(address, claim_state)
+                has_tokens = claim_state["status"] == STATUS_DONE
+            else:
+                # Слот клейма освобождается до отправки, чтобы следующие кошельки
+                # клеймили, пока этот ждет своей очереди на отправку
+                async with claim_semaphore:
+                    try:
+                        with deadline(WALLET_TIME_BUDGET):
+                            claim_result, has_tokens, amount = await _claim_wallet(
+                                web3, contract, wallet, gas_balances.get(address), gas_data,
+                                claim_index, chain_id, on_status, claimed.get(address.lower())
+                            )
+                    except Exception as e:
+                        logger.error(f"Ошибка при клейме для {address}: {str(e)}")
+                        claim_result = (address, f"❌ Ошибка: {str(e)}", "-", "-", "-")
+
+            send_result = ("-", "-")
+            if has_tokens:
+                async with send_semaphore:
+                    try:
+                        with deadline(WALLET_TIME_BUDGET):
+                            send_result = await send_wallet(web3, token_contract, wallet, amount, chain_id, on_status)
+                    except Exception as e:
+                        logger.error(f"Ошибка при отправке токенов с адреса {address}: {str(e)}")
+                        send_result = (f"❌ Ошибка: {str(e)}", "-")
+
+            result = claim_result + send_result
+            on_done(result)
+            return result
+
+        return list(await asyncio.gather(*(run(wallet) for wallet in wallets)))
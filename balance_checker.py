@@ -3,19 +3,31 @@
 
 import os
 import logging
-from typing import Optional, Dict, Tuple, Any
+from functools import lru_cache
+from typing import Optional, Dict, Tuple, Any, List, Union
 from web3 import Web3
+from web3.exceptions import ContractLogicError
+from eth_abi import encode as abi_encode, decode as abi_decode
 from dotenv import load_dotenv
 
+from rpc_provider import get_web3_provider
+from rpc_batch import get_balances
+from wallet_loader import Wallet
+from gas_oracle import estimate_fees
+
 # Загружаем переменные окружения
 load_dotenv()
 
 # Константы
-TOKEN_ADDRESS = "0x3f80b1c54ae920be41a77f8b902259d48cf24ccf"
-DROP_CONTRACT_ADDRESS = "0x68b55c20a2634b25a50a219b632f22854d810bf5"
+TOKEN_ADDRESS = os.getenv("TOKEN_ADDRESS", "0x3f80b1c54ae920be41a77f8b902259d48cf24ccf")
+DROP_CONTRACT_ADDRESS = os.getenv("DROP_CONTRACT", "0x68b55c20a2634b25a50a219b632f22854d810bf5")
 DEFAULT_GAS_LIMIT_CLAIM = 200000
 DEFAULT_GAS_LIMIT_TRANSFER = 100000
 
+# Multicall3 развернут по одному адресу во всех основных сетях
+MULTICALL3_ADDRESS = os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+MULTICALL_CHUNK_SIZE = int(os.getenv("MULTICALL_CHUNK_SIZE", "500"))
+
 # ABI только для функции balanceOf из ERC20 контракта
 TOKEN_ABI = [
     {
@@ -47,72 +59,81 @@ TOKEN_ABI = [
     }
 ]
 
-def get_web3_provider() -> Web3:
-    """
-    Получает объект Web3 на основе RPC URL из .env файла или использует дефолтный
-    
-    Returns:
-        Web3: Объект Web3 с подключенным провайдером
-    """
-    # Получаем RPC URL из переменных окружения или используем дефолтный
-    rpc_url = os.getenv("ETH_RPC_URL", "https://eth.llamarpc.com")
-    
-    # Создаем Web3 объект
-    web3 = Web3(Web3.HTTPProvider(rpc_url))
-    
-    # Проверяем подключение
-    if not web3.is_connected():
-        raise ConnectionError(f"Не удалось подключиться к RPC провайдеру: {rpc_url}")
-        
-    return web3
+# ABI Multicall3: только aggregate3 и getEthBalance
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"internalType": "uint256", "name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+# Селекторы функций для ручного кодирования calldata
+BALANCE_OF_SELECTOR = Web3.keccak(text="balanceOf(address)")[:4]
+GET_ETH_BALANCE_SELECTOR = Web3.keccak(text="getEthBalance(address)")[:4]
+IS_CLAIMED_SELECTOR = Web3.keccak(text="isClaimed(uint256,address)")[:4]
 
 def get_current_gas_prices() -> Dict[str, Any]:
     """
-    Получает текущую цену газа и EIP-1559 параметры
+    Получает текущую цену газа и EIP-1559 параметры из общего оракула газа
+    (те же, с которыми клеймер и отправитель строят транзакции)
     
     Returns:
         Dict[str, Any]: Словарь с ценами газа и необходимыми параметрами
     """
     logger = logging.getLogger("balance_checker")
     
-    try:
-        web3 = get_web3_provider()
-        
-        # Получаем последний блок для базовой цены газа
-        latest_block = web3.eth.get_block('latest')
-        base_fee = latest_block['baseFeePerGas']
-        
-        # Устанавливаем минимальную приоритетную комиссию (почти нулевую)
-        priority_fee = web3.to_wei(0.01, 'gwei')
-        
-        # Используем базовую цену газа для максимальной цены
-        max_fee = base_fee
-        
-        # Преобразуем все величины в gwei для удобства
-        gas_data = {
-            'base_fee_gwei': web3.from_wei(base_fee, 'gwei'),
-            'priority_fee_gwei': web3.from_wei(priority_fee, 'gwei'),
-            'max_fee_gwei': web3.from_wei(max_fee, 'gwei'),
-            'base_fee_wei': base_fee,
-            'priority_fee_wei': priority_fee,
-            'max_fee_wei': max_fee,
-        }
-        
-        logger.debug(f"Текущие цены газа: base_fee={gas_data['base_fee_gwei']:.2f} gwei (используется как maxFee)")
-        
-        return gas_data
-        
-    except Exception as e:
-        logger.error(f"Ошибка при получении цен газа: {str(e)}")
-        # Возвращаем дефолтные значения в случае ошибки
-        return {
-            'base_fee_gwei': 0.4,
-            'priority_fee_gwei': 0.01,
-            'max_fee_gwei': 0.4,
-            'base_fee_wei': web3.to_wei(0.4, 'gwei'),
-            'priority_fee_wei': web3.to_wei(0.01, 'gwei'),
-            'max_fee_wei': web3.to_wei(0.4, 'gwei'),
-        }
+    fees = estimate_fees()
+    base_fee = fees["base_fee_wei"]
+    priority_fee = fees["priority_fee_wei"]
+    
+    # Нода принимает транзакцию, только если баланс покрывает gasLimit * maxFee,
+    # поэтому стоимость считаем по maxFee
+    max_fee = fees["max_fee_wei"]
+    
+    # Преобразуем все величины в gwei для удобства
+    gas_data = {
+        'base_fee_gwei': Web3.from_wei(base_fee, 'gwei'),
+        'priority_fee_gwei': Web3.from_wei(priority_fee, 'gwei'),
+        'max_fee_gwei': Web3.from_wei(max_fee, 'gwei'),
+        'base_fee_wei': base_fee,
+        'priority_fee_wei': priority_fee,
+        'max_fee_wei': max_fee,
+    }
+    
+    logger.debug(f"Текущие цены газа: base_fee={gas_data['base_fee_gwei']:.2f} gwei, maxFee={gas_data['max_fee_gwei']:.2f} gwei")
+    
+    return gas_data
 
 def calculate_tx_cost(gas_limit: int, gas_data: Dict[str, Any]) -> float:
     """
@@ -128,17 +149,28 @@ def calculate_tx_cost(gas_limit: int, gas_data: Dict[str, Any]) -> float:
     max_fee_wei = gas_data['max_fee_wei']
     cost_wei = gas_limit * max_fee_wei
     
-    web3 = get_web3_provider()
-    cost_eth = web3.from_wei(cost_wei, 'ether')
+    cost_eth = Web3.from_wei(cost_wei, 'ether')
     
     return float(cost_eth)
 
-def check_gas_balance(address: str) -> float:
+# Адрес в виде строки или кошелек из wallet_loader
+AddressLike = Union[str, Wallet]
+
+def _to_address(address: AddressLike) -> str:
+    """
+    Возвращает checksum-адрес. У Wallet он уже вычислен при загрузке,
+    поэтому keccak для него не пересчитывается.
+    """
+    if isinstance(address, Wallet):
+        return address.address
+    return Web3.to_checksum_address(address)
+
+def check_gas_balance(address: AddressLike) -> float:
     """
     Проверяет баланс газа (ETH) для указанного адреса
     
     Args:
-        address (str): Адрес для проверки
+        address (AddressLike): Адрес или кошелек для проверки
         
     Returns:
         float: Баланс в ETH
@@ -149,7 +181,7 @@ def check_gas_balance(address: str) -> float:
         web3 = get_web3_provider()
         
         # Приводим адрес к правильному формату
-        address = web3.to_checksum_address(address)
+        address = _to_address(address)
         
         # Получаем баланс ETH в wei
         balance_wei = web3.eth.get_balance(address)
@@ -164,12 +196,216 @@ def check_gas_balance(address: str) -> float:
         logger.error(f"Ошибка при проверке баланса газа для {address}: {str(e)}")
         raise
 
-def check_token_balance(address: str, token_address: str = TOKEN_ADDRESS) -> float:
+def _is_execution_error(error: Exception) -> bool:
+    """
+    Ошибка выполнения eth_call (revert, нехватка газа): ее возвращает нода
+    в поле error JSON-RPC ответа. Сетевые ошибки, таймауты и 429 сюда не относятся
+    """
+    if isinstance(error, ContractLogicError):
+        return True
+    return isinstance(error, ValueError) and bool(error.args) and isinstance(error.args[0], dict)
+
+def _aggregate3(web3: Web3, calls: List[Tuple[str, bytes]]) -> List[Optional[bytes]]:
+    """
+    Выполняет список вызовов одним eth_call через Multicall3.aggregate3.
+    Если eth_call откатывается или не хватает газа на слишком большой
+    пачке, пачка делится пополам. Ошибки транспорта пробрасываются сразу:
+    деление пачки при недоступном RPC только умножило бы число запросов.
+
+    Args:
+        web3 (Web3): Объект Web3
+        calls (List[Tuple[str, bytes]]): Список пар (адрес контракта, calldata)
+
+    Returns:
+        List[Optional[bytes]]: Ответ каждого вызова или None, если вызов не удался
+    """
+    multicall = web3.eth.contract(address=Web3.to_checksum_address(MULTICALL3_ADDRESS), abi=MULTICALL3_ABI)
+
+    try:
+        results = multicall.functions.aggregate3(
+            [(target, True, call_data) for target, call_data in calls]
+        ).call()
+    except Exception as e:
+        if len(calls) == 1 or not _is_execution_error(e):
+            raise
+        middle = len(calls) // 2
+        return _aggregate3(web3, calls[:middle]) + _aggregate3(web3, calls[middle:])
+
+    return [return_data if success and return_data else None for success, return_data in results]
+
+def get_balances_multicall(
+    addresses: List[AddressLike],
+    token_address: Optional[str] = TOKEN_ADDRESS,
+    include_eth: bool = True,
+    chunk_size: int = MULTICALL_CHUNK_SIZE
+) -> Dict[str, Dict[str, Optional[int]]]:
+    """
+    Получает балансы токена (balanceOf) и ETH (getEthBalance) для списка
+    адресов через Multicall3 - по одному eth_call на chunk_size адресов.
+    Неудачные вызовы не прерывают проверку, их результат равен None.
+
+    Args:
+        addresses (List[AddressLike]): Адреса или кошельки для проверки
+        token_address (Optional[str]): Адрес токена или None, чтобы не запрашивать токен
+        include_eth (bool): Запрашивать ли баланс ETH
+        chunk_size (int): Количество адресов в одном eth_call
+
+    Returns:
+        Dict[str, Dict[str, Optional[int]]]: Словарь {checksum-адрес: {"eth": wei, "token": raw}}
+    """
+    logger = logging.getLogger("balance_checker")
+    web3 = get_web3_provider()
+    addresses = [_to_address(address) for address in addresses]
+
+    multicall_address = Web3.to_checksum_address(MULTICALL3_ADDRESS)
+    token = Web3.to_checksum_address(token_address) if token_address else None
+
+    balances: Dict[str, Dict[str, Optional[int]]] = {}
+    for start in range(0, len(addresses), chunk_size):
+        chunk = addresses[start:start + chunk_size]
+
+        # Собираем вызовы: для каждого адреса balanceOf и/или getEthBalance
+        calls = []
+        for address in chunk:
+            encoded_address = abi_encode(["address"], [address])
+            if token:
+                calls.append((token, BALANCE_OF_SELECTOR + encoded_address))
+            if include_eth:
+                calls.append((multicall_address, GET_ETH_BALANCE_SELECTOR + encoded_address))
+
+        results = iter(_aggregate3(web3, calls))
+        for address in chunk:
+            entry = {"eth": None, "token": None}
+            if token:
+                data = next(results)
+                entry["token"] = abi_decode(["uint256"], data)[0] if data else None
+            if include_eth:
+                data = next(results)
+                entry["eth"] = abi_decode(["uint256"], data)[0] if data else None
+            balances[address] = entry
+
+        logger.debug(f"Multicall: получены балансы для {len(balances)}/{len(addresses)} адресов")
+
+    return balances
+
+def get_claimed_multicall(
+    addresses: List[AddressLike],
+    index: int,
+    drop_address: str = DROP_CONTRACT_ADDRESS,
+    chunk_size: int = MULTICALL_CHUNK_SIZE
+) -> Dict[str, Optional[bool]]:
+    """
+    Проверяет isClaimed(index, адрес) контракта дропа для списка адресов
+    через Multicall3 - по одному eth_call на chunk_size адресов
+
+    Args:
+        addresses (List[AddressLike]): Адреса или кошельки для проверки
+        index (int): Индекс в merkle tree
+        drop_address (str): Адрес контракта дропа
+        chunk_size (int): Количество адресов в одном eth_call
+
+    Returns:
+        Dict[str, Optional[bool]]: Словарь {checksum-адрес: клейм выполнен};
+                                   None, если вызов для адреса не удался
+    """
+    web3 = get_web3_provider()
+    addresses = [_to_address(address) for address in addresses]
+    drop = Web3.to_checksum_address(drop_address)
+
+    claimed: Dict[str, Optional[bool]] = {}
+    for start in range(0, len(addresses), chunk_size):
+        chunk = addresses[start:start + chunk_size]
+        calls = [(drop, IS_CLAIMED_SELECTOR + abi_encode(["uint256", "address"], [index, address])) for address in chunk]
+        for address, data in zip(chunk, _aggregate3(web3, calls)):
+            claimed[address] = abi_decode(["bool"], data)[0] if data else None
+    return claimed
+
+@lru_cache(maxsize=None)
+def get_token_metadata(token_address: str = TOKEN_ADDRESS) -> Tuple[int, str]:
+    """
+    Получает decimals и symbol токена (значения не меняются, поэтому кэшируются)
+
+    Args:
+        token_address (str): Адрес токена
+
+    Returns:
+        Tuple[int, str]: (decimals, symbol)
+    """
+    web3 = get_web3_provider()
+    token_contract = web3.eth.contract(address=Web3.to_checksum_address(token_address), abi=TOKEN_ABI)
+    decimals = token_contract.functions.decimals().call()
+    symbol = token_contract.functions.symbol().call()
+    return decimals, symbol
+
+def check_gas_balances(addresses: List[AddressLike]) -> Dict[str, float]:
+    """
+    Проверяет балансы газа (ETH) для списка адресов через Multicall3,
+    а если он недоступен - batch-запросами eth_getBalance
+
+    Args:
+        addresses (List[AddressLike]): Адреса или кошельки для проверки
+
+    Returns:
+        Dict[str, float]: Словарь {checksum-адрес: баланс в ETH}; адреса, для которых
+                          баланс получить не удалось, отсутствуют
+    """
+    logger = logging.getLogger("balance_checker")
+    addresses = [_to_address(address) for address in addresses]
+
+    try:
+        multicall_balances = get_balances_multicall(addresses, token_address=None)
+        balances_wei = {
+            address: entry["eth"] for address, entry in multicall_balances.items()
+            if entry["eth"] is not None
+        }
+    except Exception as e:
+        logger.warning(f"Multicall недоступен, используем batch eth_getBalance: {str(e)}")
+        try:
+            balances_wei = get_balances(addresses)
+        except Exception as e:
+            logger.error(f"Ошибка при batch-проверке балансов газа: {str(e)}")
+            raise
+
+    balances = {address: float(Web3.from_wei(balance, "ether")) for address, balance in balances_wei.items()}
+    logger.debug(f"Получены балансы газа для {len(balances)} адресов")
+    return balances
+
+def check_token_balances(addresses: List[AddressLike], token_address: str = TOKEN_ADDRESS) -> Dict[str, float]:
+    """
+    Проверяет балансы токена для списка адресов через Multicall3
+
+    Args:
+        addresses (List[AddressLike]): Адреса или кошельки для проверки
+        token_address (str): Адрес токена для проверки
+
+    Returns:
+        Dict[str, float]: Словарь {checksum-адрес: баланс токена с учетом десятичных знаков};
+                          адреса, для которых вызов не удался, отсутствуют
+    """
+    logger = logging.getLogger("balance_checker")
+
+    try:
+        decimals, symbol = get_token_metadata(token_address)
+        multicall_balances = get_balances_multicall(addresses, token_address=token_address, include_eth=False)
+
+        balances = {
+            address: entry["token"] / (10 ** decimals)
+            for address, entry in multicall_balances.items()
+            if entry["token"] is not None
+        }
+        logger.debug(f"Получены балансы {symbol} для {len(balances)}/{len(addresses)} адресов")
+        return balances
+
+    except Exception as e:
+        logger.error(f"Ошибка при multicall-проверке балансов токена: {str(e)}")
+        raise
+
+def check_token_balance(address: AddressLike, token_address: str = TOKEN_ADDRESS) -> float:
     """
     Проверяет баланс токена для указанного адреса
     
     Args:
-        address (str): Адрес для проверки
+        address (AddressLike): Адрес или кошелек для проверки
         token_address (str): Адрес токена для проверки
         
     Returns:
@@ -181,14 +417,14 @@ def check_token_balance(address: str, token_address: str = TOKEN_ADDRESS) -> flo
         web3 = get_web3_provider()
         
         # Приводим адреса к правильному формату
-        address = web3.to_checksum_address(address)
+        address = _to_address(address)
         token_address = web3.to_checksum_address(token_address)
         
         # Создаем объект контракта
         token_contract = web3.eth.contract(address=token_address, abi=TOKEN_ABI)
         
-        # Получаем количество десятичных знаков токена
-        decimals = token_contract.functions.decimals().call()
+        # Получаем количество десятичных знаков и символ токена (кэшируются)
+        decimals, symbol = get_token_metadata(token_address)
         
         # Получаем баланс токена
         balance_raw = token_contract.functions.balanceOf(address).call()
@@ -196,9 +432,6 @@ def check_token_balance(address: str, token_address: str = TOKEN_ADDRESS) -> flo
         # Конвертируем с учетом десятичных знаков
         balance = balance_raw / (10 ** decimals)
         
-        # Получаем символ токена для логирования
-        symbol = token_contract.functions.symbol().call()
-        
         logger.debug(f"Баланс {symbol} для {address}: {balance}")
         return float(balance)
         
@@ -206,18 +439,28 @@ def check_token_balance(address: str, token_address: str = TOKEN_ADDRESS) -> flo
         logger.error(f"Ошибка при проверке баланса токена для {address}: {str(e)}")
         raise
 
-def check_gas_requirements(address: str) -> Dict[str, Any]:
+def check_gas_requirements(
+    address: AddressLike,
+    gas_balance: Optional[float] = None,
+    gas_data: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """
     Проверяет требования к газу и достаточность средств для различных операций
     
     Args:
-        address (str): Адрес для проверки
+        address (AddressLike): Адрес или кошелек для проверки
+        gas_balance (Optional[float]): Уже известный баланс ETH (например, из batch-запроса)
+        gas_data (Optional[Dict[str, Any]]): Уже полученные цены газа от get_current_gas_prices()
         
     Returns:
         Dict[str, Any]: Словарь с информацией о балансе и требованиях
     """
-    gas_balance = check_gas_balance(address)
-    gas_data = get_current_gas_prices()
+    if isinstance(address, Wallet):
+        address = address.address
+    if gas_balance is None:
+        gas_balance = check_gas_balance(address)
+    if gas_data is None:
+        gas_data = get_current_gas_prices()
     
     # Рассчитываем стоимость транзакций
     claim_cost = calculate_tx_cost(DEFAULT_GAS_LIMIT_CLAIM, gas_data)
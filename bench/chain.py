@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import logging
+import threading
+from collections.abc import Mapping
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from web3 import Web3, EthereumTesterProvider
+from eth_utils import to_canonical_address
+
+# Константы
+CONTRACTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "contracts")
+# EVM без PUSH0: py-evm из eth-tester не поддерживает Shanghai
+EVM_VERSION = "paris"
+
+# Методы, для которых неизвестный хеш - это null, а не ошибка
+_NULL_IF_MISSING = {"eth_getTransactionReceipt", "eth_getTransactionByHash"}
+# Ошибка nonce из py-evm; бот распознает ее по тексту geth ("nonce too low")
+_NONCE_ERROR = re.compile(r"Invalid transaction nonce: Expected (\d+), but got (\d+)")
+
+def compile_contract(name: str) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Компилирует контракт из bench/contracts
+
+    Args:
+        name (str): Имя файла без расширения .vy
+
+    Returns:
+        Tuple[List[Dict[str, Any]], str]: (ABI, bytecode)
+
+    Raises:
+        RuntimeError: Если компилятор Vyper не установлен
+    """
+    try:
+        import vyper
+        from vyper.compiler.settings import Settings
+    except ImportError:
+        raise RuntimeError("Для бенчмарка нужен компилятор Vyper: pip install -r bench/requirements.txt")
+
+    with open(os.path.join(CONTRACTS_DIR, f"{name}.vy"), "r") as f:
+        source = f.read()
+    output = vyper.compile_code(source, output_formats=["abi", "bytecode"], settings=Settings(evm_version=EVM_VERSION))
+    return output["abi"], output["bytecode"]
+
+class BenchChain:
+    """
+    Цепочка в памяти процесса (eth-tester + py-evm): каждая транзакция
+    сразу включается в новый блок. Аккаунты eth-tester уже пополнены
+    и разблокированы, первый из них развертывает контракты.
+    """
+
+    def __init__(self, balances: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            balances (Optional[Dict[str, int]]): Балансы ETH в wei, которые адреса
+                                                 получают в genesis-блоке (без транзакций пополнения)
+        """
+        try:
+            from eth_tester import EthereumTester, PyEVMBackend
+        except ImportError:
+            raise RuntimeError("Для бенчмарка нужен eth-tester: pip install -r bench/requirements.txt")
+
+        genesis_state = PyEVMBackend.generate_genesis_state()
+        for address, balance in (balances or {}).items():
+            genesis_state[to_canonical_address(address)] = {"balance": balance, "storage": {}, "code": b"", "nonce": 0}
+
+        self.tester = EthereumTester(PyEVMBackend(genesis_state=genesis_state))
+        self.web3 = Web3(EthereumTesterProvider(self.tester))
+        self.deployer = self.web3.eth.accounts[0]
+        self.web3.eth.default_account = self.deployer
+
+    def deploy(self, name: str, *args: Any):
+        """
+        Компилирует и развертывает контракт
+
+        Args:
+            name (str): Имя контракта в bench/contracts
+            *args: Аргументы конструктора
+
+        Returns:
+            Contract: Развернутый контракт
+        """
+        abi, bytecode = compile_contract(name)
+        tx_hash = self.web3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).transact()
+        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        return self.web3.eth.contract(address=receipt["contractAddress"], abi=abi)
+
+    def transact(self, call) -> Dict[str, Any]:
+        """
+        Отправляет транзакцию вызова контракта от имени deployer и проверяет статус
+
+        Args:
+            call: Вызов вида contract.functions.f(...)
+
+        Returns:
+            Dict[str, Any]: Receipt
+        """
+        receipt = self.web3.eth.wait_for_transaction_receipt(call.transact())
+        if receipt["status"] != 1:
+            raise RuntimeError(f"Транзакция {receipt['transactionHash'].hex()} откатилась")
+        return receipt
+
+def _to_json(value: Any) -> Any:
+    # Ответ eth-tester приводится к виду JSON-RPC: числа и байты - hex-строки
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, Mapping):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return value
+
+def _error_message(error: Exception) -> str:
+    message = str(error) or type(error).__name__
+    match = _NONCE_ERROR.search(message)
+    if match and int(match.group(2)) < int(match.group(1)):
+        return f"nonce too low: next nonce {match.group(1)}, tx nonce {match.group(2)}"
+    return message
+
+class RpcBridge:
+    """
+    HTTP JSON-RPC сервер поверх BenchChain. Бот подключается к нему как
+    к обычному RPC (ETH_RPC_URLS), поэтому в замер входят транспорт,
+    batch-запросы и Multicall3. Запросы к eth-tester выполняются по одному.
+    """
+
+    def __init__(self, chain: BenchChain, host: str = "127.0.0.1", port: int = 0):
+        web3 = chain.web3
+        self._request = web3.provider.request_func(web3, web3.middleware_onion)
+        self._lock = threading.Lock()
+        self.requests = 0
+        bridge = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    self.send_error(400, "Invalid JSON")
+                    return
+                if isinstance(payload, list):
+                    response = [bridge.handle(item) for item in payload]
+                else:
+                    response = bridge.handle(payload)
+                data = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполняет один JSON-RPC запрос
+
+        Args:
+            item (Dict[str, Any]): Запрос {"id", "method", "params"}
+
+        Returns:
+            Dict[str, Any]: Ответ с result или error
+        """
+        response = {"jsonrpc": "2.0", "id": item.get("id")}
+        method = item.get("method")
+        with self._lock:
+            self.requests += 1
+            try:
+                result = self._request(method, item.get("params", []))
+            except Exception as e:
+                if method in _NULL_IF_MISSING:
+                    result = {"result": None}
+                else:
+                    result = {"error": {"code": -32000, "message": _error_message(e)}}
+
+        if "error" in result:
+            error = result["error"]
+            response["error"] = error if isinstance(error, dict) else {"code": -32000, "message": str(error)}
+        else:
+            response["result"] = _to_json(result.get("result"))
+        return response
+
+    def start(self) -> None:
+        """
+        Запускает сервер в фоновом потоке
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, name="rpc-bridge", daemon=True)
+        self._thread.start()
+        logging.getLogger("main").info(f"RPC бенчмарка слушает {self.url}")
+
+    def stop(self) -> None:
+        """
+        Останавливает сервер
+        """
+        self.server.shutdown()
+        self.server.server_close()
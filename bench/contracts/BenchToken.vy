@@ -0,0 +1,56 @@
+# @version 0.3.10
+"""
+@title ERC-20 токен для бенчмарка
+@notice Весь выпуск зачисляется создателю контракта
+"""
+
+event Transfer:
+    sender: indexed(address)
+    receiver: indexed(address)
+    value: uint256
+
+event Approval:
+    owner: indexed(address)
+    spender: indexed(address)
+    value: uint256
+
+name: public(String[32])
+symbol: public(String[8])
+decimals: public(uint8)
+totalSupply: public(uint256)
+balanceOf: public(HashMap[address, uint256])
+allowance: public(HashMap[address, HashMap[address, uint256]])
+
+@external
+def __init__(name: String[32], symbol: String[8], supply: uint256):
+    self.name = name
+    self.symbol = symbol
+    self.decimals = 18
+    self.totalSupply = supply
+    self.balanceOf[msg.sender] = supply
+    log Transfer(empty(address), msg.sender, supply)
+
+@internal
+def _transfer(sender: address, receiver: address, amount: uint256):
+    assert self.balanceOf[sender] >= amount, "insufficient balance"
+    self.balanceOf[sender] -= amount
+    self.balanceOf[receiver] += amount
+    log Transfer(sender, receiver, amount)
+
+@external
+def transfer(receiver: address, amount: uint256) -> bool:
+    self._transfer(msg.sender, receiver, amount)
+    return True
+
+@external
+def transferFrom(sender: address, receiver: address, amount: uint256) -> bool:
+    assert self.allowance[sender][msg.sender] >= amount, "insufficient allowance"
+    self.allowance[sender][msg.sender] -= amount
+    self._transfer(sender, receiver, amount)
+    return True
+
+@external
+def approve(spender: address, amount: uint256) -> bool:
+    self.allowance[msg.sender][spender] = amount
+    log Approval(msg.sender, spender, amount)
+    return True
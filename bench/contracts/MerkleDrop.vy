@@ -0,0 +1,69 @@
+# @version 0.3.10
+"""
+@title Merkle drop для бенчмарка
+@notice Тот же ABI claim / isClaimed / userClaims / Claimed, что и у
+        контракта дропа в claimer.DROP_CONTRACT_ABI. Лист дерева -
+        keccak256(account ++ cumulativeAmount), узлы хешируются
+        отсортированными парами.
+"""
+
+interface ERC20:
+    def transfer(to: address, amount: uint256) -> bool: nonpayable
+
+event Claimed:
+    index: uint256
+    account: indexed(address)
+    amount: uint256
+
+MAX_PROOF_LENGTH: constant(uint256) = 32
+
+token: public(address)
+owner: public(address)
+merkleRoots: public(HashMap[uint256, bytes32])
+claimed: HashMap[uint256, HashMap[address, bool]]
+lastClaimedIndex: HashMap[address, uint256]
+claimedAmount: HashMap[address, uint256]
+
+@external
+def __init__(token: address):
+    self.token = token
+    self.owner = msg.sender
+
+@external
+def setMerkleRoot(index: uint256, root: bytes32):
+    assert msg.sender == self.owner, "not owner"
+    self.merkleRoots[index] = root
+
+@view
+@external
+def isClaimed(index: uint256, account: address) -> bool:
+    return self.claimed[index][account]
+
+@view
+@external
+def userClaims(user: address) -> (uint256, uint256):
+    return self.lastClaimedIndex[user], self.claimedAmount[user]
+
+@external
+def claim(index: uint256, account: address, cumulativeAmount: uint256, merkleProof: DynArray[bytes32, MAX_PROOF_LENGTH]):
+    assert not self.claimed[index][account], "already claimed"
+    root: bytes32 = self.merkleRoots[index]
+    assert root != empty(bytes32), "unknown index"
+
+    node: bytes32 = keccak256(concat(convert(account, bytes20), convert(cumulativeAmount, bytes32)))
+    for sibling in merkleProof:
+        if convert(node, uint256) < convert(sibling, uint256):
+            node = keccak256(concat(node, sibling))
+        else:
+            node = keccak256(concat(sibling, node))
+    assert node == root, "invalid proof"
+
+    previous: uint256 = self.claimedAmount[account]
+    assert cumulativeAmount > previous, "nothing to claim"
+    self.claimed[index][account] = True
+    self.lastClaimedIndex[account] = index
+    self.claimedAmount[account] = cumulativeAmount
+
+    amount: uint256 = cumulativeAmount - previous
+    assert ERC20(self.token).transfer(account, amount, default_return_value=True)
+    log Claimed(index, account, amount)
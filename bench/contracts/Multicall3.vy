@@ -0,0 +1,35 @@
+# @version 0.3.10
+"""
+@title Совместимая с Multicall3 часть для бенчмарка
+@notice aggregate3 и getEthBalance с тем же ABI, что у Multicall3
+        (см. balance_checker.MULTICALL3_ABI). Размеры ограничены: до
+        MAX_CALLS вызовов, calldata и ответ каждого - до MAX_DATA байт.
+"""
+
+MAX_CALLS: constant(uint256) = 512
+MAX_DATA: constant(uint256) = 128
+
+struct Call3:
+    target: address
+    allowFailure: bool
+    callData: Bytes[MAX_DATA]
+
+struct Result:
+    success: bool
+    returnData: Bytes[MAX_DATA]
+
+@external
+def aggregate3(calls: DynArray[Call3, MAX_CALLS]) -> DynArray[Result, MAX_CALLS]:
+    results: DynArray[Result, MAX_CALLS] = []
+    for call in calls:
+        success: bool = False
+        data: Bytes[MAX_DATA] = b""
+        success, data = raw_call(call.target, call.callData, max_outsize=MAX_DATA, revert_on_failure=False)
+        assert success or call.allowFailure, "Multicall3: call failed"
+        results.append(Result({success: success, returnData: data}))
+    return results
+
+@view
+@external
+def getEthBalance(addr: address) -> uint256:
+    return addr.balance
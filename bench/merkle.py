@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Dict, List, Tuple
+from eth_utils import keccak, to_bytes, to_checksum_address
+
+def leaf_hash(address: str, amount: int) -> bytes:
+    """
+    Хеш листа: keccak256(адрес (20 байт) ++ сумма (32 байта)), как в contracts/MerkleDrop.vy
+
+    Args:
+        address (str): Адрес кошелька
+        amount (int): Сумма в wei
+
+    Returns:
+        bytes: Хеш листа
+    """
+    return keccak(to_bytes(hexstr=address) + amount.to_bytes(32, "big"))
+
+def _hash_pair(a: bytes, b: bytes) -> bytes:
+    # Пары хешируются отсортированными, поэтому в proof не нужно указывать сторону
+    return keccak(a + b) if a < b else keccak(b + a)
+
+def build_tree(claims: List[Tuple[str, int]]) -> Tuple[bytes, Dict[str, List[str]]]:
+    """
+    Строит merkle tree для списка клеймов
+
+    Args:
+        claims (List[Tuple[str, int]]): Пары (адрес, сумма в wei)
+
+    Returns:
+        Tuple[bytes, Dict[str, List[str]]]: (корень, {checksum-адрес: proof в виде hex-строк})
+    """
+    level = [leaf_hash(address, amount) for address, amount in claims]
+    # positions[i] - индекс листа i на текущем уровне
+    positions = list(range(len(level)))
+    proofs: List[List[str]] = [[] for _ in claims]
+
+    while len(level) > 1:
+        for i, position in enumerate(positions):
+            sibling = position ^ 1
+            if sibling < len(level):
+                proofs[i].append("0x" + level[sibling].hex())
+            positions[i] = position // 2
+        # Узел без пары переходит на следующий уровень без изменений
+        level = [
+            _hash_pair(level[j], level[j + 1]) if j + 1 < len(level) else level[j]
+            for j in range(0, len(level), 2)
+        ]
+
+    root = level[0] if level else b"\x00" * 32
+    return root, {to_checksum_address(address): proof for (address, _), proof in zip(claims, proofs)}
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальная замена API KernelDAO с merkle proof для нагрузочных тестов
+проверки eligibility.
+
+Тот же интерфейс, что у настоящего API: GET .../kernel_eth?address=...&signature=...
+и ответ {"data": {"proof": [...], "balance": "..."}}; неизвестный адрес - 404.
+Задержка ответа берется из выбранного распределения, часть ответов
+можно заменить на 404, 429 (с Retry-After) или 5xx.
+
+Отдельный запуск (бот подключается через API_URL):
+    python -m bench.mock_api --wallets 1000 --latency lognormal:0.08,0.5 --rate-429 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from bench.merkle import build_tree
+from bench.wallets import make_wallets
+
+# Константы
+# Путь как у настоящего API: последний сегмент - идентификатор кампании в кэше eligibility
+API_PATH = "/merkle/proofs/kernel_eth"
+DEFAULT_RETRY_AFTER = 1.0
+SERVER_ERRORS = (500, 502, 503)
+
+# Распределение задержки: функция от генератора случайных чисел
+Latency = Callable[[random.Random], float]
+
+def parse_latency(spec: str) -> Latency:
+    """
+    Разбирает описание распределения задержки ответа (в секундах)
+
+    Args:
+        spec (str): Одно из:
+                    fixed:T
+                    uniform:MIN,MAX
+                    normal:MEAN,STDDEV
+                    lognormal:MEDIAN,SIGMA
+                    exponential:MEAN
+
+    Returns:
+        Latency: Функция, возвращающая задержку (не меньше 0)
+
+    Raises:
+        ValueError: Если описание не распознано
+    """
+    name, _, raw = spec.partition(":")
+    try:
+        params = [float(value) for value in raw.split(",")] if raw else []
+    except ValueError:
+        raise ValueError(f"Некорректные параметры задержки: {spec}")
+
+    distributions = {
+        "fixed": (1, lambda rng, t: t),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, stddev: rng.gauss(mean, stddev)),
+        # Медиана и sigma логарифма: тяжелый хвост, как у реальных API
+        "lognormal": (2, lambda rng, median, sigma: median * rng.lognormvariate(0, sigma)),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    if name not in distributions or len(params) != distributions[name][0]:
+        raise ValueError(f"Неизвестное распределение задержки: {spec} (варианты: {', '.join(distributions)})")
+
+    sample = distributions[name][1]
+    return lambda rng: max(0.0, sample(rng, *params))
+
+class MockProofApi:
+    """
+    HTTP-сервер с merkle proof для заданных адресов. Каждый ответ
+    задерживается на время из распределения latency; с вероятностями
+    rate_404, rate_429 и rate_5xx вместо ответа возвращается ошибка.
+    Генератор случайных чисел инициализируется seed, поэтому при одном
+    и том же порядке запросов повторяются и задержки, и ошибки.
+    """
+
+    def __init__(
+        self,
+        proofs: Dict[str, Tuple[int, List[str]]],
+        latency: Latency = parse_latency("fixed:0"),
+        rate_404: float = 0.0,
+        rate_429: float = 0.0,
+        rate_5xx: float = 0.0,
+        retry_after: float = DEFAULT_RETRY_AFTER,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Args:
+            proofs (Dict[str, Tuple[int, List[str]]]): {адрес: (balance в wei, proof)}
+            latency (Latency): Распределение задержки (см. parse_latency)
+            rate_404 (float): Доля ответов 404 для eligible адресов
+            rate_429 (float): Доля ответов 429
+            rate_5xx (float): Доля ответов 500/502/503
+            retry_after (float): Значение Retry-After для 429, секунд
+            seed (int): Начальное значение генератора случайных чисел
+            host (str): Адрес сервера
+            port (int): Порт (0 - любой свободный)
+        """
+        self.proofs = {address.lower(): entry for address, entry in proofs.items()}
+        self.latency = latency
+        self.rate_404 = rate_404
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Количество ответов по HTTP-статусу
+        self.stats: Counter = Counter()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers, body = api.handle(self.path)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def _draw(self) -> Tuple[float, float]:
+        with self._lock:
+            return self.latency(self._rng), self._rng.random()
+
+    def handle(self, path: str) -> Tuple[int, Dict[str, str], dict]:
+        """
+        Формирует ответ на запрос
+
+        Args:
+            path (str): Путь запроса с query-строкой
+
+        Returns:
+            Tuple[int, Dict[str, str], dict]: (HTTP-статус, заголовки, тело)
+        """
+        delay, roll = self._draw()
+        time.sleep(delay)
+
+        url = urlparse(path)
+        query = parse_qs(url.query)
+        address = (query.get("address") or [""])[0].lower()
+
+        if url.path.rstrip("/") != API_PATH:
+            status, headers, body = 404, {}, {"error": "Not found"}
+        elif not address or not query.get("signature"):
+            status, headers, body = 400, {}, {"error": "address and signature are required"}
+        elif roll < self.rate_429:
+            status, headers, body = 429, {"Retry-After": f"{self.retry_after:g}"}, {"error": "Too many requests"}
+        elif roll < self.rate_429 + self.rate_5xx:
+            with self._lock:
+                status = self._rng.choice(SERVER_ERRORS)
+            headers, body = {}, {"error": "Internal error"}
+        elif address not in self.proofs or roll < self.rate_429 + self.rate_5xx + self.rate_404:
+            status, headers, body = 404, {}, {"error": "Address not found"}
+        else:
+            balance, proof = self.proofs[address]
+            status, headers, body = 200, {}, {"data": {"proof": proof, "balance": str(balance)}}
+
+        with self._lock:
+            self.stats[status] += 1
+        return status, headers, body
+
+    def start(self) -> None:
+        """
+        Запускает сервер в фоновом потоке
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-api", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Останавливает сервер
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Добавляет параметры задержки и ошибок mock API в парсер аргументов
+    """
+    parser.add_argument("--latency", default="fixed:0", help="распределение задержки API: fixed:T, uniform:MIN,MAX, "
+                        "normal:MEAN,STDDEV, lognormal:MEDIAN,SIGMA, exponential:MEAN (секунды)")
+    parser.add_argument("--rate-404", type=float, default=0.0, help="доля ответов 404 для eligible адресов")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="доля ответов 5xx")
+    parser.add_argument("--retry-after", type=float, default=DEFAULT_RETRY_AFTER, help="Retry-After для 429, секунд")
+    parser.add_argument("--api-seed", type=int, default=0, help="seed генератора задержек и ошибок")
+
+def from_args(args: argparse.Namespace, proofs: Dict[str, Tuple[int, List[str]]], port: int = 0) -> MockProofApi:
+    """
+    Создает сервер по аргументам из add_arguments()
+    """
+    return MockProofApi(
+        proofs,
+        latency=parse_latency(args.latency),
+        rate_404=args.rate_404,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.api_seed,
+        port=port
+    )
+
+def make_proofs(wallets: List[Tuple[str, str, str, int]]) -> Dict[str, Tuple[int, List[str]]]:
+    """
+    Строит merkle tree для кошельков из bench.wallets.make_wallets
+
+    Returns:
+        Dict[str, Tuple[int, List[str]]]: {адрес: (balance в wei, proof)}
+    """
+    _, proofs = build_tree([(address, amount) for _, address, _, amount in wallets])
+    return {address: (amount, proofs[address]) for _, address, _, amount in wallets}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Локальный mock API KernelDAO с merkle proof")
+    parser.add_argument("--wallets", type=int, default=100, help="количество кошельков в дереве")
+    parser.add_argument("--seed", default="bench", help="строка для генерации ключей (как у bench.run)")
+    parser.add_argument("--port", type=int, default=8080, help="порт сервера")
+    parser.add_argument("--wallets-file", help="записать сюда wallets.txt для этих кошельков")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    wallets = make_wallets(args.wallets, args.seed)
+    if args.wallets_file:
+        with open(args.wallets_file, "w") as f:
+            for key, _, exchange, _ in wallets:
+                f.write(f"{key},{exchange}\n")
+
+    api = from_args(args, make_proofs(wallets), port=args.port)
+    print(f"Mock API для {len(wallets)} кошельков: API_URL={api.url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server.server_close()
+        print(f"Ответы по статусам: {dict(api.stats)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк клейма и отправки токенов на локальной цепочке (eth-tester).
+
+Разворачивает контракт дропа с тем же ABI, что и у настоящего, ERC-20
+токен и Multicall3, строит merkle tree для N синтетических кошельков
+и прогоняет claim_for_all и send_tokens_for_all из main.py целиком
+через HTTP JSON-RPC. Сеть и настоящие ключи не нужны.
+
+С --api перед клеймом выполняется check_eligibility_for_all против
+локального mock API (bench/mock_api.py) с заданными задержкой и долей
+ошибок; без него proof сразу записываются в кэш eligibility.
+
+Запуск из корня репозитория:
+    pip install -r requirements.txt -r bench/requirements.txt
+    python -m bench.run --wallets 200
+    python -m bench.run --wallets 200 --api --latency lognormal:0.1,0.5 --rate-429 0.05 --rate-5xx 0.02
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+from web3 import Web3
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from bench import mock_api
+from bench.chain import BenchChain, RpcBridge
+from bench.merkle import build_tree
+from bench.wallets import make_wallets
+
+# Константы
+# ETH на газ для каждого кошелька
+WALLET_FUNDING_ETH = 1
+
+def setup_chain(wallets: List[Tuple[str, str, str, int]]) -> Tuple[BenchChain, Dict[str, Any]]:
+    """
+    Разворачивает контракты. ETH на газ кошельки получают в genesis-блоке
+
+    Returns:
+        Tuple[BenchChain, Dict[str, Any]]: (цепочка, {"token", "drop", "multicall": контракт})
+    """
+    funding = Web3.to_wei(WALLET_FUNDING_ETH, "ether")
+    chain = BenchChain({address: funding for _, address, _, _ in wallets})
+    total = sum(amount for *_, amount in wallets)
+
+    token = chain.deploy("BenchToken", "Bench Kernel", "bKERNEL", total)
+    drop = chain.deploy("MerkleDrop", token.address)
+    multicall = chain.deploy("Multicall3")
+    return chain, {"token": token, "drop": drop, "multicall": multicall}
+
+def publish_drop(
+    chain: BenchChain,
+    contracts: Dict[str, Any],
+    wallets: List[Tuple[str, str, str, int]],
+    claim_index: int
+) -> Dict[str, List[str]]:
+    """
+    Публикует merkle root под индексом, который клеймит бот, и переводит
+    токены на контракт дропа
+
+    Returns:
+        Dict[str, List[str]]: {адрес: proof}
+    """
+    root, proofs = build_tree([(address, amount) for _, address, _, amount in wallets])
+    chain.transact(contracts["drop"].functions.setMerkleRoot(claim_index, root))
+    chain.transact(contracts["token"].functions.transfer(contracts["drop"].address, sum(amount for *_, amount in wallets)))
+    return proofs
+
+def prepare_workdir(workdir: str, wallets: List[Tuple[str, str, str, int]], proofs: Optional[Dict[str, List[str]]]) -> None:
+    """
+    Записывает wallets.txt и, если переданы proofs, кэш eligibility (вместо запросов к API)
+    """
+    from api_checker import CAMPAIGN
+    from eligibility_cache import EligibilityCache
+
+    with open(os.path.join(workdir, "wallets.txt"), "w") as f:
+        for key, _, exchange, _ in wallets:
+            f.write(f"{key},{exchange}\n")
+    if proofs is None:
+        return
+
+    cache = EligibilityCache(os.path.join(workdir, "eligibility_cache.json"))
+    for _, address, _, amount in wallets:
+        cache.put_eligible(CAMPAIGN, address, {"balance": str(amount), "proof": proofs[address]})
+    cache.save()
+
+def run_stage(name: str, func, total: int) -> float:
+    """
+    Выполняет этап бота и возвращает время в секундах
+    """
+    print(f"{name}: {total} кошельков...")
+    started = time.perf_counter()
+    func(total)
+    return time.perf_counter() - started
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк клейма и отправки на локальной цепочке")
+    parser.add_argument("--wallets", type=int, default=100, help="количество кошельков")
+    parser.add_argument("--seed", default="bench", help="строка для генерации ключей")
+    parser.add_argument("--workdir", help="рабочая директория (по умолчанию временная)")
+    parser.add_argument("--api", action="store_true", help="проверять eligibility через локальный mock API")
+    mock_api.add_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="kernel-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    logging.basicConfig(filename=os.path.join(workdir, "bench.log"), level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    print(f"Подготовка цепочки для {args.wallets} кошельков...")
+    wallets = make_wallets(args.wallets, args.seed)
+    chain, contracts = setup_chain(wallets)
+    addresses = {name: contract.address for name, contract in contracts.items()}
+    bridge = RpcBridge(chain)
+    bridge.start()
+    api = None
+    if args.api:
+        api = mock_api.from_args(args, mock_api.make_proofs(wallets))
+        api.start()
+
+    # Бот читает настройки при импорте модулей, поэтому окружение задается до импорта
+    os.environ.update({
+        "ETH_RPC_URLS": bridge.url,
+        "TOKEN_ADDRESS": addresses["token"],
+        "DROP_CONTRACT": addresses["drop"],
+        "MULTICALL3_ADDRESS": addresses["multicall"],
+        "DROP_START_BLOCK": "0",
+        "ELIGIBILITY_CACHE_FILE": os.path.join(workdir, "eligibility_cache.json"),
+        "CLAIM_INDEX_FILE": os.path.join(workdir, "claim_index.json"),
+        "JOURNAL_FILE": os.path.join(workdir, "journal.sqlite3"),
+        "WALLET_CACHE_FILE": os.path.join(workdir, ".wallet_cache.json"),
+        "SIGNATURE_CACHE_FILE": "",
+        # Блок появляется сразу после транзакции, лимиты провайдера не нужны
+        "RECEIPT_POLL_INTERVAL": "0.05",
+        "RPC_READ_RATE_LIMIT": "0",
+        "RPC_CALL_RATE_LIMIT": "0",
+        "RPC_SEND_RATE_LIMIT": "0",
+    })
+    if api:
+        os.environ["API_URL"] = api.url
+    os.chdir(workdir)
+
+    from rich.console import Console
+    import main as bot
+    from api_checker import CAMPAIGN
+    from claimer import CLAIM_INDEX, DROP_CONTRACT_ABI
+    from eligibility_cache import get_eligibility_cache
+    from sender import TOKEN_ABI
+
+    proofs = publish_drop(chain, contracts, wallets, CLAIM_INDEX)
+    prepare_workdir(workdir, wallets, None if api else proofs)
+
+    # Подтверждения в меню бота отвечаем автоматически; кошельки, которые
+    # API не признал eligible (инжектированные 404), из wallets.txt не удаляем
+    bot.console = Console(quiet=True)
+    bot.console.input = lambda prompt="", **kwargs: "n" if "Удалить" in prompt else "y"
+
+    def count_eligible() -> int:
+        cache = get_eligibility_cache()
+        return sum(cache.get(CAMPAIGN, address)[1] is not None for _, address, _, _ in wallets)
+
+    if api:
+        eligibility_seconds = run_stage("Eligibility", bot.check_eligibility_for_all, len(wallets))
+        checked = count_eligible()
+    claim_seconds = run_stage("Клейм", bot.claim_for_all, len(wallets))
+    send_seconds = run_stage("Отправка", bot.send_tokens_for_all, len(wallets))
+
+    token = chain.web3.eth.contract(address=addresses["token"], abi=TOKEN_ABI)
+    drop = chain.web3.eth.contract(address=addresses["drop"], abi=DROP_CONTRACT_ABI)
+    claimed = sum(drop.functions.isClaimed(CLAIM_INDEX, address).call() for _, address, _, _ in wallets)
+    delivered = sum(token.functions.balanceOf(exchange).call() == amount for _, _, exchange, amount in wallets)
+    # Адреса, на которых проверка упала с ошибкой (5xx), клейм запрашивает у API повторно
+    eligible = count_eligible()
+    bridge.stop()
+    if api:
+        api.stop()
+
+    print()
+    print(f"Кошельков:           {len(wallets)}")
+    if api:
+        print(f"Eligibility:         {checked} за {eligibility_seconds:.1f} с, "
+              f"{len(wallets) / eligibility_seconds:.2f} кошельков/с")
+        print(f"Ответы mock API:     {dict(sorted(api.stats.items()))}")
+    print(f"Клейм:               {claimed} за {claim_seconds:.1f} с, {claimed / claim_seconds:.2f} кошельков/с")
+    print(f"Отправка:            {delivered} за {send_seconds:.1f} с, {delivered / send_seconds:.2f} кошельков/с")
+    print(f"RPC-запросов:        {bridge.requests}")
+    print(f"Рабочая директория:  {workdir}")
+    return 0 if claimed == delivered == eligible else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
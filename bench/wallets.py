@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import List, Tuple
+from eth_account import Account
+from eth_utils import keccak
+
+# Константы
+TOKEN_DECIMALS = 18
+
+def make_wallets(count: int, seed: str) -> List[Tuple[str, str, str, int]]:
+    """
+    Генерирует детерминированные кошельки
+
+    Args:
+        count (int): Количество кошельков
+        seed (str): Строка, от которой зависят ключи
+
+    Returns:
+        List[Tuple[str, str, str, int]]: (приватный ключ, адрес, адрес биржи, сумма дропа в wei)
+    """
+    wallets = []
+    for i in range(count):
+        key = keccak(text=f"{seed}:wallet:{i}")
+        exchange = Account.from_key(keccak(text=f"{seed}:exchange:{i}")).address
+        amount = (1 + i % 1000) * 10 ** TOKEN_DECIMALS
+        wallets.append((key.hex(), Account.from_key(key).address, exchange, amount))
+    return wallets
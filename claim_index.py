@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import logging
+import threading
+from typing import Dict, Optional
+from web3 import Web3
+from eth_utils import event_abi_to_log_topic
+from dotenv import load_dotenv
+
+from rpc_provider import get_web3_provider
+from claimer import DROP_CONTRACT_ADDRESS, DROP_CONTRACT_ABI, CLAIM_INDEX
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+CLAIM_INDEX_FILE = os.getenv("CLAIM_INDEX_FILE", "claim_index.json")
+# Блок, с которого начинается первое сканирование событий контракта дропа.
+# Если не задан, берется блок развертывания контракта (ищется по eth_getCode)
+DROP_START_BLOCK = os.getenv("DROP_START_BLOCK")
+# Начальный размер диапазона блоков для одного eth_getLogs
+LOG_CHUNK_SIZE = int(os.getenv("LOG_CHUNK_SIZE", "10000"))
+# Последние блоки сканируются повторно при следующем запуске на случай реорга
+REORG_DEPTH = 12
+
+# Формат события Claimed не сверен с верифицированным контрактом дропа: если он
+# неверен, события не найдутся. Поэтому индекс - только положительная подсказка,
+# для адресов, которых в нем нет, источник истины - isClaimed (одним Multicall3
+# на пачку кошельков, см. async_claimer.prefetch_claimed)
+CLAIMED_EVENT_ABI = next(item for item in DROP_CONTRACT_ABI if item["type"] == "event" and item["name"] == "Claimed")
+CLAIMED_EVENT_TOPIC = Web3.to_hex(event_abi_to_log_topic(CLAIMED_EVENT_ABI))
+
+def find_deployment_block(web3: Web3, address: str, latest_block: int) -> int:
+    """
+    Находит блок развертывания контракта бинарным поиском по eth_getCode
+    (около 25 запросов; нужна нода с историческим состоянием)
+
+    Args:
+        web3 (Web3): Объект Web3
+        address (str): Адрес контракта
+        latest_block (int): Текущий блок
+
+    Returns:
+        int: Номер блока, в котором у адреса появился код
+    """
+    low, high = 0, latest_block
+    while low < high:
+        middle = (low + high) // 2
+        if web3.eth.get_code(address, middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+class ClaimIndex:
+    """
+    Индекс выполненных клеймов, построенный по событиям Claimed контракта дропа.
+    Хранит последний просканированный блок и при следующих запусках
+    догружает только новые блоки. Адрес из индекса точно заклеймил дроп,
+    отсутствие адреса ничего не доказывает - его нужно проверить через isClaimed.
+    """
+
+    def __init__(self, file_path: str = CLAIM_INDEX_FILE, contract_address: str = DROP_CONTRACT_ADDRESS):
+        self.file_path = file_path
+        self.contract_address = Web3.to_checksum_address(contract_address)
+        # None - индекс еще не сканировался, стартовый блок определит refresh()
+        self.last_block: Optional[int] = int(DROP_START_BLOCK) - 1 if DROP_START_BLOCK else None
+        # {index: {адрес в нижнем регистре: блок события или None для отметок mark_claimed}}
+        self.claimed: Dict[int, Dict[str, Optional[int]]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """
+        Загружает индекс из файла, если он существует и относится к тому же контракту
+        """
+        logger = logging.getLogger("claimer")
+
+        if not os.path.exists(self.file_path):
+            return
+
+        try:
+            with open(self.file_path, "r") as f:
+                data = json.load(f)
+
+            if data.get("contract", "").lower() != self.contract_address.lower():
+                logger.warning(f"Индекс клеймов в {self.file_path} построен для другого контракта, игнорируем")
+                return
+
+            if any(isinstance(addresses, list) for addresses in data["claimed"].values()):
+                # Старый формат без номеров блоков: реорг-окно не отделить, строим заново
+                logger.info(f"Индекс клеймов в {self.file_path} в старом формате, сканируем заново")
+                return
+
+            self.last_block = data["last_block"]
+            self.claimed = {int(index): dict(addresses) for index, addresses in data["claimed"].items()}
+            logger.info(f"Загружен индекс клеймов: блок {self.last_block}, "
+                        f"{sum(len(a) for a in self.claimed.values())} клеймов")
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке индекса клеймов: {str(e)}")
+
+    def save(self) -> None:
+        """
+        Сохраняет индекс в файл (через временный файл, чтобы не повредить его при сбое)
+        """
+        with self._lock:
+            data = {
+                "contract": self.contract_address,
+                "last_block": self.last_block,
+                "claimed": {str(index): dict(sorted(addresses.items())) for index, addresses in self.claimed.items()}
+            }
+
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.file_path)
+
+    def refresh(self, chunk_size: int = LOG_CHUNK_SIZE) -> int:
+        """
+        Догружает события Claimed с последнего просканированного блока до текущего.
+        Диапазон eth_getLogs уменьшается вдвое, если провайдер отклоняет запрос
+        (слишком много событий или слишком большой диапазон). Записи из
+        повторно сканируемого реорг-окна и отметки mark_claimed перед
+        сканированием удаляются: подтвержденные события найдутся снова.
+
+        Args:
+            chunk_size (int): Начальный размер диапазона блоков
+
+        Returns:
+            int: Количество найденных событий
+        """
+        logger = logging.getLogger("claimer")
+        web3 = get_web3_provider()
+        contract = web3.eth.contract(address=self.contract_address, abi=DROP_CONTRACT_ABI)
+        claimed_event = contract.events.Claimed()
+
+        latest_block = web3.eth.block_number
+        if self.last_block is None:
+            self.last_block = self._start_block(web3, latest_block) - 1
+        from_block = self.last_block + 1
+        max_chunk_size = chunk_size
+        found = 0
+
+        with self._lock:
+            for addresses in self.claimed.values():
+                for address in [a for a, block in addresses.items() if block is None or block >= from_block]:
+                    del addresses[address]
+
+        logger.info(f"Сканирование событий Claimed: блоки {from_block}-{latest_block}")
+
+        while from_block <= latest_block:
+            to_block = min(from_block + chunk_size - 1, latest_block)
+            try:
+                logs = web3.eth.get_logs({
+                    "address": self.contract_address,
+                    "topics": [CLAIMED_EVENT_TOPIC],
+                    "fromBlock": from_block,
+                    "toBlock": to_block
+                })
+            except Exception as e:
+                if chunk_size == 1:
+                    raise
+                chunk_size = max(1, chunk_size // 2)
+                logger.debug(f"eth_getLogs отклонен ({str(e)}), уменьшаем диапазон до {chunk_size} блоков")
+                continue
+
+            with self._lock:
+                for log in logs:
+                    event = claimed_event.process_log(log)
+                    index = event["args"]["index"]
+                    self.claimed.setdefault(index, {})[event["args"]["account"].lower()] = log["blockNumber"]
+                # Последние блоки оставляем на повторное сканирование
+                self.last_block = max(self.last_block, min(to_block, latest_block - REORG_DEPTH))
+
+            found += len(logs)
+            from_block = to_block + 1
+            # После успешного запроса постепенно возвращаемся к исходному диапазону
+            chunk_size = min(max_chunk_size, chunk_size * 2)
+
+        logger.info(f"Индекс клеймов обновлен: найдено {found} новых событий")
+        return found
+
+    def _start_block(self, web3: Web3, latest_block: int) -> int:
+        """
+        Блок развертывания контракта дропа. Если нода не отдает историческое
+        состояние, индекс ведется с текущего блока: пропущенные клеймы
+        проверит isClaimed
+        """
+        logger = logging.getLogger("claimer")
+        try:
+            start_block = find_deployment_block(web3, self.contract_address, latest_block)
+            logger.info(f"Контракт дропа развернут в блоке {start_block}")
+            return start_block
+        except Exception as e:
+            logger.warning(f"Не удалось найти блок развертывания контракта дропа: {str(e)}. "
+                           f"Индекс клеймов ведется с блока {latest_block}")
+            return latest_block
+
+    def is_claimed(self, address: str, index: int = CLAIM_INDEX) -> bool:
+        """
+        Проверяет по индексу, был ли уже выполнен клейм для адреса.
+        False не означает, что клейма не было (см. CLAIMED_EVENT_ABI)
+
+        Args:
+            address (str): Адрес для проверки
+            index (int): Индекс в merkle tree (CLAIM_INDEX для KernelDAO)
+
+        Returns:
+            bool: True если адрес уже клеймил дроп
+        """
+        with self._lock:
+            return address.lower() in self.claimed.get(index, {})
+
+    def mark_claimed(self, address: str, index: int = CLAIM_INDEX) -> None:
+        """
+        Отмечает адрес как заклеймивший (после подтвержденной транзакции)
+
+        Args:
+            address (str): Адрес
+            index (int): Индекс в merkle tree
+        """
+        with self._lock:
+            self.claimed.setdefault(index, {}).setdefault(address.lower(), None)
+
+def load_claim_index(file_path: str = CLAIM_INDEX_FILE) -> Optional[ClaimIndex]:
+    """
+    Загружает индекс клеймов и догружает новые события
+
+    Args:
+        file_path (str): Путь к файлу индекса
+
+    Returns:
+        Optional[ClaimIndex]: Актуальный индекс или None, если обновить его не удалось
+    """
+    logger = logging.getLogger("claimer")
+
+    try:
+        claim_index = ClaimIndex(file_path)
+        claim_index.refresh()
+        claim_index.save()
+        return claim_index
+    except Exception as e:
+        logger.error(f"Не удалось обновить индекс клеймов: {str(e)}")
+        return None
@@ -4,19 +4,32 @@
 import os
 import logging
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from web3 import Web3
 from web3.exceptions import ContractLogicError
 from eth_account import Account
 from dotenv import load_dotenv
 
+from rpc_provider import get_web3_provider
+from wallet_loader import Wallet, local_account
+from gas_oracle import estimate_fees
+from nonce_manager import send_with_nonce
+from tx_replacer import get_tx_replacer
+from gas_estimates import get_gas_estimate_cache, gas_key, GAS_LIMIT_MULTIPLIER
+from deadlines import deadline, without_deadline, with_time_budget
+from journal import get_journal, STAGE_CLAIM, STATUS_PENDING, STATUS_DONE, STATUS_FAILED
+
 # Загружаем переменные окружения
 load_dotenv()
 
 # Константы
-DROP_CONTRACT_ADDRESS = "0x68b55c20a2634b25a50a219b632f22854d810bf5"
+DROP_CONTRACT_ADDRESS = os.getenv("DROP_CONTRACT", "0x68b55c20a2634b25a50a219b632f22854d810bf5")
+# Индекс merkle root дропа KernelDAO
+CLAIM_INDEX = 8
 DEFAULT_GAS_LIMIT = 200000
 DEFAULT_GAS_PRICE_GWEI = 30
+# Максимальное время оценки gasLimit, секунд
+ESTIMATE_GAS_TIMEOUT = 15
 
 # ABI контракта - обновленная версия на основе имплементации
 DROP_CONTRACT_ABI = [
@@ -53,35 +66,26 @@ DROP_CONTRACT_ABI = [
         ],
         "stateMutability": "view",
         "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed":False,"internalType":"uint256","name":"index","type":"uint256"},
+            {"indexed":True,"internalType":"address","name":"account","type":"address"},
+            {"indexed":False,"internalType":"uint256","name":"amount","type":"uint256"}
+        ],
+        "name": "Claimed",
+        "type": "event"
     }
 ]
 
-def get_web3_provider() -> Web3:
-    """
-    Получает объект Web3 на основе RPC URL из .env файла или использует дефолтный
-    
-    Returns:
-        Web3: Объект Web3 с подключенным провайдером
-    """
-    # Получаем RPC URL из переменных окружения или используем дефолтный
-    rpc_url = os.getenv("ETH_RPC_URL", "https://eth.llamarpc.com")
-    
-    # Создаем Web3 объект с таймаутом
-    web3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 30}))
-    
-    # Проверяем подключение
-    if not web3.is_connected():
-        raise ConnectionError(f"Не удалось подключиться к RPC провайдеру: {rpc_url}")
-        
-    return web3
-
-def is_already_claimed(address: str, index: int = 8) -> bool:
+def is_already_claimed(address: str, index: int = CLAIM_INDEX) -> bool:
     """
     Проверяет, был ли уже выполнен клейм для указанного адреса
     
     Args:
         address (str): Адрес для проверки
-        index (int): Индекс в merkle tree (всегда 8 для KernelDAO)
+        index (int): Индекс в merkle tree (CLAIM_INDEX для KernelDAO)
         
     Returns:
         bool: True если адрес уже клеймил дроп, иначе False
@@ -108,24 +112,32 @@ def is_already_claimed(address: str, index: int = 8) -> bool:
         logger.error(f"Ошибка при проверке статуса клейма для {address}: {str(e)}")
         return False
 
+@with_time_budget()
 def claim_tokens(
-    private_key: str,
-    index: int = 8,
+    private_key: Union[str, Wallet],
+    index: int = CLAIM_INDEX,
     account: str = None,
     amount: str = None,
     proof: List[str] = None,
-    use_direct_api: bool = False  # Оставлен для совместимости
+    use_direct_api: bool = False,  # Оставлен для совместимости
+    nonce: Optional[int] = None,
+    check_claimed: bool = True,
+    fee_speed: Optional[str] = None
 ) -> Optional[str]:
     """
     Вызывает функцию claim() в контракте дропа
     
     Args:
-        private_key (str): Приватный ключ для подписи транзакции
-        index (int): Индекс в merkle tree (всегда 8 для KernelDAO)
-        account (str): Адрес получателя
+        private_key (Union[str, Wallet]): Приватный ключ для подписи транзакции или кошелек из wallet_loader
+        index (int): Индекс в merkle tree (CLAIM_INDEX для KernelDAO)
+        account (str): Адрес получателя (None - адрес самого кошелька)
         amount (str): Сумма в wei (строка)
         proof (List[str]): Merkle proof в виде списка bytes32
         use_direct_api (bool): Параметр оставлен для совместимости
+        nonce (Optional[int]): Явно заданный nonce (по умолчанию выдается локальным NonceManager)
+        check_claimed (bool): Проверять ли isClaimed перед клеймом (False, если
+                              вызывающий код уже проверил статус по индексу клеймов)
+        fee_speed (Optional[str]): Скорость включения "slow", "normal" или "fast" (по умолчанию FEE_SPEED)
         
     Returns:
         Optional[str]: Хеш транзакции или None в случае ошибки
@@ -133,17 +145,14 @@ def claim_tokens(
     logger = logging.getLogger("claimer")
     
     try:
-        # Проверяем формат приватного ключа
-        if private_key.startswith("0x"):
-            private_key = private_key[2:]
-            
         logger.info("Инициализация Web3-провайдера...")
         web3 = get_web3_provider()
         
-        # Создаем аккаунт из приватного ключа
+        # Для Wallet аккаунт и checksum-адрес уже вычислены при загрузке
         logger.info("Создание объекта аккаунта...")
-        account_obj = Account.from_key(private_key)
+        account_obj = local_account(private_key)
         address = account_obj.address
+        recipient = address if account is None or account == address else web3.to_checksum_address(account)
         
         # Всегда используем index=8 для KernelDAO
         index = 8
@@ -153,10 +162,11 @@ def claim_tokens(
         amount_int = int(amount) if isinstance(amount, str) else amount
         
         # Проверяем, был ли уже выполнен клейм для этого адреса
-        logger.info(f"Проверка, был ли уже выполнен клейм для {address}...")
-        if is_already_claimed(address, index):
-            logger.info(f"Адрес {address} уже клеймил дроп (index={index}), пропуск")
-            return None
+        if check_claimed:
+            logger.info(f"Проверка, был ли уже выполнен клейм для {address}...")
+            if is_already_claimed(address, index):
+                logger.info(f"Адрес {address} уже клеймил дроп (index={index}), пропуск")
+                return None
             
         # Создаем объект контракта
         logger.info("Создание объекта контракта...")
@@ -165,89 +175,84 @@ def claim_tokens(
             abi=DROP_CONTRACT_ABI
         )
         
-        # Получаем nonce
-        logger.info(f"Получение nonce для {address}...")
-        nonce = web3.eth.get_transaction_count(address)
-        logger.info(f"Получен nonce: {nonce}")
+        # EIP-1559: priority fee по eth_feeHistory, maxFee с запасом на рост base fee
+        logger.info("Получение цены газа...")
+        fees = estimate_fees(fee_speed)
+        base_fee = fees["base_fee_wei"]
+        priority_fee = fees["priority_fee_wei"]
+        max_fee = fees["max_fee_wei"]
+        logger.info(f"Базовая цена газа: {web3.from_wei(base_fee, 'gwei'):.2f} Gwei, " +
+                   f"перцентиль priority fee: {fees['percentile']}")
         
-        # EIP-1559: Получаем базовый fee из последнего блока
-        logger.info("Получение цены газа из последнего блока...")
-        try:
-            latest_block = web3.eth.get_block('latest')
-            base_fee = latest_block['baseFeePerGas']
-            logger.info(f"Базовая цена газа: {web3.from_wei(base_fee, 'gwei'):.2f} Gwei")
-        except Exception as e:
-            logger.error(f"Ошибка при получении цены газа: {str(e)}")
-            # Устанавливаем значение по умолчанию
-            base_fee = web3.to_wei(25, 'gwei')
-            logger.info(f"Используем цену газа по умолчанию: 25 Gwei")
+        # Пытаемся оценить gasLimit для транзакции. Получатель дропа получает
+        # токен впервые, поэтому вызов считается записью в новый слот
+        gas_limit = DEFAULT_GAS_LIMIT  # Значение по умолчанию
+        gas_estimates = get_gas_estimate_cache()
+        claim_gas_key = gas_key(DROP_CONTRACT_ADDRESS, "claim", len(proof), recipient_is_new=True)
+        cached_estimate = gas_estimates.get(claim_gas_key)
+        if cached_estimate is not None:
+            gas_limit = int(cached_estimate * GAS_LIMIT_MULTIPLIER)
+            logger.info(f"gasLimit по сохраненным оценкам: {gas_limit}")
+        else:
+            logger.info("Оценка gasLimit для транзакции...")
+            try:
+                # Ограничиваем estimate_gas, чтобы избежать зависания; срок
+                # работает в любом потоке и не превышает бюджет кошелька
+                with deadline(ESTIMATE_GAS_TIMEOUT):
+                    estimated = contract.functions.claim(
+                        index,
+                        recipient,
+                        amount_int,
+                        proof
+                    ).estimate_gas({
+                        'from': address
+                    })
+                
+                gas_estimates.add(claim_gas_key, estimated)
+                # Добавляем небольшой запас для надежности
+                gas_limit = int(estimated * GAS_LIMIT_MULTIPLIER)
+                logger.info(f"Рассчитанный gasLimit: {gas_limit}")
+            except TimeoutError:
+                logger.warning("Таймаут при оценке gasLimit. Используем значение по умолчанию.")
+            except Exception as e:
+                logger.warning(f"Не удалось оценить gasLimit: {str(e)}. Используем дефолтное значение.")
         
-        # Устанавливаем минимальную приоритетную комиссию
-        priority_fee = web3.to_wei(0.1, 'gwei')
+        chain_id = web3.eth.chain_id
         
-        # Используем базовую цену газа как максимальную с небольшим запасом
-        max_fee = int(base_fee * 1.2)
+        # Последняя собранная транзакция - по ней TxReplacer соберет замену
+        sent_tx = {}
         
-        # Пытаемся оценить gasLimit для транзакции
-        gas_limit = DEFAULT_GAS_LIMIT  # Значение по умолчанию
-        logger.info("Оценка gasLimit для транзакции...")
-        try:
-            # Установим таймаут для estimate_gas, чтобы избежать зависания
-            import signal
-            
-            def timeout_handler(signum, frame):
-                raise TimeoutError("Timeout in estimate_gas")
-            
-            # Устанавливаем таймаут в 15 секунд
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(15)
-            
-            gas_limit = contract.functions.claim(
+        def build_signed(tx_nonce: int) -> bytes:
+            # Подготавливаем транзакцию с EIP-1559 параметрами
+            logger.info("Подготовка транзакции...")
+            claim_tx = contract.functions.claim(
                 index,
-                web3.to_checksum_address(account),
+                recipient,
                 amount_int,
                 proof
-            ).estimate_gas({
-                'from': address
+            ).build_transaction({
+                'from': address,
+                'gas': gas_limit,
+                'maxFeePerGas': max_fee,
+                'maxPriorityFeePerGas': priority_fee,
+                'nonce': tx_nonce,
+                'chainId': chain_id
             })
             
-            # Отключаем таймаут
-            signal.alarm(0)
-            
-            # Добавляем небольшой запас для надежности
-            gas_limit = int(gas_limit * 1.2)
-            logger.info(f"Рассчитанный gasLimit: {gas_limit}")
-        except TimeoutError:
-            logger.warning("Таймаут при оценке gasLimit. Используем значение по умолчанию.")
-        except Exception as e:
-            logger.warning(f"Не удалось оценить gasLimit: {str(e)}. Используем дефолтное значение.")
+            # Подписываем транзакцию
+            logger.info("Подписание транзакции...")
+            sent_tx.update(claim_tx)
+            return account_obj.sign_transaction(claim_tx).rawTransaction
         
-        # Подготавливаем транзакцию с EIP-1559 параметрами
-        logger.info("Подготовка транзакции...")
-        claim_tx = contract.functions.claim(
-            index,
-            web3.to_checksum_address(account),
-            amount_int,
-            proof
-        ).build_transaction({
-            'from': address,
-            'gas': gas_limit,
-            'maxFeePerGas': max_fee,
-            'maxPriorityFeePerGas': priority_fee,
-            'nonce': nonce,
-            'chainId': web3.eth.chain_id
-        })
-        
-        # Подписываем транзакцию
-        logger.info("Подписание транзакции...")
-        signed_tx = web3.eth.account.sign_transaction(claim_tx, private_key)
-        
-        # Отправляем транзакцию
+        # Отправляем транзакцию; nonce выдает локальный NonceManager
         logger.info("Отправка транзакции в сеть...")
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        tx_hash = send_with_nonce(web3, address, build_signed, nonce)
         tx_hash_hex = web3.to_hex(tx_hash)
         
         logger.info(f"Транзакция отправлена: {tx_hash_hex}")
+        journal = get_journal()
+        # Записи журнала ведутся по отправителю: по его nonce resume() сверяет транзакции
+        journal.record(address, STAGE_CLAIM, STATUS_PENDING, tx_hash_hex, sent_tx['nonce'], amount_int)
         logger.info(f"Параметры газа: gasLimit={gas_limit}, " +
                    f"baseFee={web3.from_wei(base_fee, 'gwei'):.2f} gwei, " +
                    f"priorityFee={web3.from_wei(priority_fee, 'gwei'):.2f} gwei, " +
@@ -256,14 +261,27 @@ def claim_tokens(
         # Ждем подтверждения
         logger.info(f"Ожидание подтверждения транзакции...")
         try:
-            # Ждем не более 60 секунд
-            receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
+            # Подтверждение ждет общий трекер receipts; зависшая транзакция
+            # ускоряется заменой с тем же nonce и повышенными комиссиями
+            # Ожидание ограничено таймаутами трекера, а не бюджетом кошелька
+            with without_deadline():
+                receipt = get_tx_replacer().wait_for(account_obj, sent_tx, tx_hash_hex)
+            if receipt is None:
+                logger.warning(f"Транзакция не подтверждена: {tx_hash_hex}")
+                logger.info("Возвращаем хеш транзакции, но её статус неизвестен")
+                return tx_hash_hex
             
+            # Подтвердиться могла одна из замен
+            tx_hash_hex = receipt['transactionHash']
             if receipt['status'] == 1:
                 logger.info(f"Транзакция успешно подтверждена: {tx_hash_hex}")
+                journal.record(address, STAGE_CLAIM, STATUS_DONE, tx_hash_hex)
                 return tx_hash_hex
             else:
                 logger.error(f"Транзакция не удалась: {tx_hash_hex}")
+                journal.record(address, STAGE_CLAIM, STATUS_FAILED, tx_hash_hex)
+                # Откат или нехватка газа: оценки этого вида вызова собираем заново
+                gas_estimates.invalidate(claim_gas_key)
                 return None
         except Exception as e:
             logger.warning(f"Не удалось дождаться подтверждения транзакции: {str(e)}")
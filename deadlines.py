@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Iterator, Callable
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+# Бюджет времени на подготовку и отправку транзакции одного кошелька, секунд
+WALLET_TIME_BUDGET = float(os.getenv("WALLET_TIME_BUDGET", "120"))
+
+# Крайний срок текущего потока или asyncio-задачи (time.monotonic()).
+# ContextVar, в отличие от signal.alarm, работает в любом потоке, а каждая
+# asyncio-задача получает собственную копию значения
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """Истек бюджет времени операции"""
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Ограничивает время всех RPC-вызовов внутри блока. Вложенный срок
+    не может быть позже внешнего.
+
+    Args:
+        seconds (Optional[float]): Время на блок в секундах; None - без ограничения
+                                   (действует только внешний срок)
+    """
+    current = _deadline.get()
+    new = current
+    if seconds is not None:
+        candidate = time.monotonic() + seconds
+        new = candidate if current is None else min(current, candidate)
+    token = _deadline.set(new)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+@contextmanager
+def without_deadline() -> Iterator[None]:
+    """
+    Снимает срок внутри блока (например, на ожидание подтверждения,
+    которое ограничено собственным таймаутом)
+    """
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def with_time_budget(seconds: float = WALLET_TIME_BUDGET) -> Callable:
+    """
+    Декоратор: весь вызов функции выполняется с бюджетом времени seconds
+
+    Args:
+        seconds (float): Бюджет в секундах
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with deadline(seconds):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def remaining() -> Optional[float]:
+    """
+    Возвращает остаток времени до срока
+
+    Returns:
+        Optional[float]: Секунды до срока (может быть отрицательным) или None, если срока нет
+    """
+    current = _deadline.get()
+    if current is None:
+        return None
+    return current - time.monotonic()
+
+def is_expired() -> bool:
+    """
+    Проверяет, истек ли текущий срок
+    """
+    left = remaining()
+    return left is not None and left <= 0
+
+def transport_timeout(default: Optional[float]) -> Optional[float]:
+    """
+    Возвращает таймаут HTTP-запроса: обычный таймаут, но не больше остатка срока
+
+    Args:
+        default (Optional[float]): Обычный таймаут транспорта
+
+    Returns:
+        Optional[float]: Таймаут для запроса
+
+    Raises:
+        DeadlineExceeded: Если срок уже истек
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Истек бюджет времени до отправки запроса")
+    return left if default is None else min(default, left)
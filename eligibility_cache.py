@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple, List
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+ELIGIBILITY_CACHE_FILE = os.getenv("ELIGIBILITY_CACHE_FILE", "eligibility_cache.json")
+# Сколько секунд хранить ответ "не eligible" (proof и balance eligible-адресов
+# не меняются в течение кампании и хранятся до явной очистки)
+NEGATIVE_TTL = int(os.getenv("ELIGIBILITY_NEGATIVE_TTL", str(6 * 3600)))
+# Через сколько новых записей кэш автоматически сохраняется на диск
+AUTOSAVE_EVERY = 100
+
+class EligibilityCache:
+    """
+    Кэш результатов check_eligibility на диске, с ключом (кампания, адрес).
+
+    Формат файла:
+        {"eligible": {кампания: {адрес: [balance, proof]}},
+         "not_eligible": {кампания: {адрес: время записи}}}
+    где proof хранится одной hex-строкой из склеенных 32-байтных узлов.
+    """
+
+    def __init__(self, file_path: str = ELIGIBILITY_CACHE_FILE, negative_ttl: int = NEGATIVE_TTL):
+        self.file_path = file_path
+        self.negative_ttl = negative_ttl
+        self.eligible: Dict[str, Dict[str, List[str]]] = {}
+        self.not_eligible: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        # Сохранения идут по одному: автосохранение из потока проверки не должно
+        # пересечься с сохранением из основного потока на общем временном файле
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+        self.load()
+
+    def load(self) -> None:
+        """
+        Загружает кэш из файла, если он существует
+        """
+        logger = logging.getLogger("api_checker")
+
+        if not os.path.exists(self.file_path):
+            return
+
+        try:
+            with open(self.file_path, "r") as f:
+                data = json.load(f)
+            self.eligible = data.get("eligible", {})
+            self.not_eligible = data.get("not_eligible", {})
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке кэша eligibility: {str(e)}")
+
+    def save(self) -> None:
+        """
+        Сохраняет кэш в файл (через временный файл, чтобы не повредить его при сбое)
+        """
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps({"eligible": self.eligible, "not_eligible": self.not_eligible})
+                self._unsaved = 0
+
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.file_path)
+
+    def get(self, campaign: str, address: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Ищет результат проверки в кэше
+
+        Args:
+            campaign (str): Идентификатор кампании
+            address (str): Адрес кошелька
+
+        Returns:
+            Tuple[bool, Optional[Dict[str, Any]]]: (найден ли результат, данные eligibility
+                                                   или None для не eligible адреса)
+        """
+        key = address.lower()
+        with self._lock:
+            entry = self.eligible.get(campaign, {}).get(key)
+            if entry is not None:
+                balance, packed_proof = entry
+                proof = ["0x" + packed_proof[i:i + 64] for i in range(0, len(packed_proof), 64)]
+                return True, {"balance": balance, "proof": proof}
+
+            cached_at = self.not_eligible.get(campaign, {}).get(key)
+            if cached_at is not None and time.time() - cached_at < self.negative_ttl:
+                return True, None
+
+        return False, None
+
+    def put_eligible(self, campaign: str, address: str, data: Dict[str, Any]) -> None:
+        """
+        Сохраняет proof и balance eligible-адреса
+
+        Args:
+            campaign (str): Идентификатор кампании
+            address (str): Адрес кошелька
+            data (Dict[str, Any]): Данные eligibility из API (balance, proof)
+        """
+        packed_proof = "".join(node[2:] if node.startswith("0x") else node for node in data["proof"])
+        with self._lock:
+            self.eligible.setdefault(campaign, {})[address.lower()] = [str(data["balance"]), packed_proof]
+            self.not_eligible.get(campaign, {}).pop(address.lower(), None)
+        self._after_write()
+
+    def put_not_eligible(self, campaign: str, address: str) -> None:
+        """
+        Запоминает, что адрес не eligible (запись устаревает через negative_ttl)
+
+        Args:
+            campaign (str): Идентификатор кампании
+            address (str): Адрес кошелька
+        """
+        with self._lock:
+            self.not_eligible.setdefault(campaign, {})[address.lower()] = time.time()
+        self._after_write()
+
+    def invalidate(self, campaign: Optional[str] = None) -> int:
+        """
+        Очищает кэш целиком или для одной кампании
+
+        Args:
+            campaign (Optional[str]): Кампания или None для очистки всего кэша
+
+        Returns:
+            int: Количество удаленных записей
+        """
+        with self._lock:
+            if campaign is None:
+                removed = sum(len(v) for v in self.eligible.values()) + sum(len(v) for v in self.not_eligible.values())
+                self.eligible, self.not_eligible = {}, {}
+            else:
+                removed = len(self.eligible.pop(campaign, {})) + len(self.not_eligible.pop(campaign, {}))
+        self.save()
+        return removed
+
+    def _after_write(self) -> None:
+        with self._lock:
+            self._unsaved += 1
+            should_save = self._unsaved >= AUTOSAVE_EVERY
+        if should_save:
+            self.save()
+
+# Общий для процесса экземпляр кэша
+_cache_lock = threading.Lock()
+_cache: Optional[EligibilityCache] = None
+
+def get_eligibility_cache() -> EligibilityCache:
+    """
+    Возвращает общий для процесса кэш eligibility, загружая его при первом вызове
+
+    Returns:
+        EligibilityCache: Кэш
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EligibilityCache()
+        return _cache
+
+if __name__ == "__main__":
+    # Очистка кэша из командной строки: python eligibility_cache.py --clear [кампания]
+    if len(sys.argv) > 1 and sys.argv[1] == "--clear":
+        campaign = sys.argv[2] if len(sys.argv) > 2 else None
+        removed = get_eligibility_cache().invalidate(campaign)
+        print(f"Удалено {removed} записей из кэша eligibility")
+    else:
+        print("Использование: python eligibility_cache.py --clear [кампания]")
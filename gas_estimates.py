@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import math
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+# Сколько реальных оценок estimate_gas собрать для вызова одного вида
+GAS_ESTIMATE_SAMPLES = int(os.getenv("GAS_ESTIMATE_SAMPLES", "5"))
+# Перцентиль собранных оценок, который используется вместо нового estimate_gas
+GAS_ESTIMATE_PERCENTILE = float(os.getenv("GAS_ESTIMATE_PERCENTILE", "90"))
+# Запас поверх оценки estimate_gas (или перцентиля собранных оценок) для gasLimit
+GAS_LIMIT_MULTIPLIER = 1.2
+
+# Вид вызова: (контракт, функция, длина proof, получатель новый)
+GasKey = Tuple[str, str, int, bool]
+
+def gas_key(contract_address: str, function: str, proof_length: int = 0, recipient_is_new: bool = True) -> GasKey:
+    """
+    Формирует ключ кэша оценок газа
+
+    Args:
+        contract_address (str): Адрес контракта
+        function (str): Имя функции
+        proof_length (int): Длина merkle proof (0 для вызовов без proof)
+        recipient_is_new (bool): Баланс получателя нулевой (запись в новый слот
+                                 хранилища стоит дороже)
+
+    Returns:
+        GasKey: Ключ кэша
+    """
+    return (contract_address.lower(), function, proof_length, recipient_is_new)
+
+class GasEstimateCache:
+    """
+    Кэш оценок gasLimit по виду вызова. Для вызовов одного вида расход газа
+    почти одинаков, поэтому после GAS_ESTIMATE_SAMPLES реальных оценок
+    estimate_gas больше не вызывается, а используется перцентиль собранных
+    оценок (запас GAS_LIMIT_MULTIPLIER поверх него добавляет вызывающий код).
+
+    Перевод на адрес с нулевым балансом токена дороже, поэтому оценки
+    переводов хранятся отдельно по этому признаку. Он берется из реального
+    баланса получателя (set_recipient_balances перед отправкой), а не
+    угадывается: иначе оценка дешевого перевода попадет к дорогим.
+
+    Если транзакция с оценкой из кэша откатилась или ей не хватило газа,
+    оценки этого вида сбрасываются и собираются заново.
+    """
+
+    def __init__(self, samples: int = GAS_ESTIMATE_SAMPLES, percentile: float = GAS_ESTIMATE_PERCENTILE):
+        self.samples = max(1, samples)
+        self.percentile = percentile
+        self._lock = threading.Lock()
+        self._estimates: Dict[GasKey, List[int]] = {}
+        # {получатель в нижнем регистре: есть ли у него токены} по проверенным балансам
+        self._recipient_has_balance: Dict[str, bool] = {}
+
+    def get(self, key: GasKey) -> Optional[int]:
+        """
+        Возвращает оценку газа для вида вызова
+
+        Args:
+            key (GasKey): Ключ из gas_key()
+
+        Returns:
+            Optional[int]: Оценка (без запаса) или None, если оценок еще недостаточно
+        """
+        with self._lock:
+            estimates = sorted(self._estimates.get(key, []))
+        if len(estimates) < self.samples:
+            return None
+        index = max(math.ceil(self.percentile / 100 * len(estimates)) - 1, 0)
+        return estimates[index]
+
+    def add(self, key: GasKey, estimate: int) -> None:
+        """
+        Добавляет реальную оценку estimate_gas
+
+        Args:
+            key (GasKey): Ключ из gas_key()
+            estimate (int): Результат estimate_gas
+        """
+        with self._lock:
+            estimates = self._estimates.setdefault(key, [])
+            if len(estimates) < self.samples:
+                estimates.append(estimate)
+
+    def set_recipient_balances(self, balances: Dict[str, Optional[int]]) -> None:
+        """
+        Запоминает балансы токена получателей (например, из multicall перед отправкой)
+
+        Args:
+            balances (Dict[str, Optional[int]]): {адрес: баланс токена}; None - баланс не получен
+        """
+        with self._lock:
+            for address, balance in balances.items():
+                if balance is not None:
+                    self._recipient_has_balance[address.lower()] = balance > 0
+
+    def is_new_recipient(self, address: str) -> Optional[bool]:
+        """
+        Проверяет по известному балансу, нулевой ли баланс токена у получателя
+
+        Args:
+            address (str): Адрес получателя
+
+        Returns:
+            Optional[bool]: True - баланс нулевой, False - нет, None - баланс неизвестен
+                            (его нужно проверить до выбора ключа оценок)
+        """
+        with self._lock:
+            has_balance = self._recipient_has_balance.get(address.lower())
+        return None if has_balance is None else not has_balance
+
+    def mark_funded(self, address: str) -> None:
+        """
+        Запоминает, что адрес получил токены
+
+        Args:
+            address (str): Адрес получателя
+        """
+        with self._lock:
+            self._recipient_has_balance[address.lower()] = True
+
+    def invalidate(self, key: GasKey) -> None:
+        """
+        Сбрасывает оценки вида вызова (после отката или нехватки газа)
+
+        Args:
+            key (GasKey): Ключ из gas_key()
+        """
+        logger = logging.getLogger("main")
+        with self._lock:
+            if self._estimates.pop(key, None) is not None:
+                logger.info(f"Оценки газа для {key[1]} ({key[0]}) сброшены, собираем заново")
+
+# Общий для процесса экземпляр
+_cache_lock = threading.Lock()
+_cache: Optional[GasEstimateCache] = None
+
+def get_gas_estimate_cache() -> GasEstimateCache:
+    """
+    Возвращает общий для процесса кэш оценок газа
+
+    Returns:
+        GasEstimateCache: Кэш оценок
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GasEstimateCache()
+        return _cache
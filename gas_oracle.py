@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import math
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, List
+from web3 import Web3
+from dotenv import load_dotenv
+
+from rpc_provider import get_web3_provider
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+# Средний интервал между блоками: раньше этого срока новый блок не запрашивается
+BLOCK_TIME = float(os.getenv("GAS_ORACLE_BLOCK_TIME", "12"))
+# Базовая цена газа, если ее не удалось получить ни разу
+FALLBACK_BASE_FEE_GWEI = float(os.getenv("FALLBACK_BASE_FEE_GWEI", "25"))
+# Сколько секунд можно использовать последнюю полученную цену, если RPC недоступен
+MAX_STALE_SECONDS = 300
+# Приоритетная комиссия, если eth_feeHistory недоступен, и ее нижняя граница
+PRIORITY_FEE_GWEI = float(os.getenv("PRIORITY_FEE_GWEI", "0.1"))
+
+# Скорость включения в блок: перцентиль вознаграждений из eth_feeHistory,
+# который берется как priority fee
+FEE_SPEED_PERCENTILES = {"slow": 10, "normal": 50, "fast": 90}
+FEE_SPEED = os.getenv("FEE_SPEED", "normal")
+# Явно заданный перцентиль важнее FEE_SPEED
+FEE_PERCENTILE = os.getenv("FEE_PERCENTILE")
+# Количество последних блоков для eth_feeHistory
+FEE_HISTORY_BLOCKS = int(os.getenv("FEE_HISTORY_BLOCKS", "20"))
+# На сколько блоков вперед maxFee должен покрывать рост base fee
+FEE_PROJECTION_BLOCKS = int(os.getenv("FEE_PROJECTION_BLOCKS", "3"))
+# Максимальный рост base fee за блок по EIP-1559
+MAX_BASE_FEE_CHANGE = 0.125
+
+class GasOracle:
+    """
+    Общий для процесса источник цен газа. Последний блок запрашивается
+    не чаще одного раза за блок, все вызывающие получают одни и те же данные.
+
+    Политика при ошибке RPC одна для всех модулей: сначала используется
+    последняя полученная цена (не старше MAX_STALE_SECONDS), затем
+    FALLBACK_BASE_FEE_GWEI.
+    """
+
+    def __init__(self, block_time: float = BLOCK_TIME):
+        self.block_time = block_time
+        self._lock = threading.Lock()
+        # Условие на self._lock: ждут вызывающие, пока нет ни одной цены
+        self._refreshed = threading.Condition(self._lock)
+        self._fee_data: Optional[Dict[str, Any]] = None
+        # Время последней попытки проверить номер блока (в том числе неудачной)
+        self._checked_at = 0.0
+        # Последняя попытка завершилась ошибкой RPC
+        self._failed = False
+        # Цену обновляет один вызывающий, остальные не ждут его
+        self._refreshing = False
+        # Ответ eth_feeHistory и блок, для которого он получен
+        self._history_lock = threading.Lock()
+        self._history: Optional[Dict[str, Any]] = None
+        self._history_block: Optional[int] = None
+
+    def _fetch(self) -> Dict[str, Any]:
+        """
+        Получает базовую цену газа. Если номер блока не изменился с
+        прошлого раза, блок целиком заново не запрашивается.
+        """
+        web3 = get_web3_provider()
+
+        if self._fee_data is not None:
+            block_number = web3.eth.block_number
+            if block_number == self._fee_data["block_number"]:
+                return self._fee_data
+
+        latest_block = web3.eth.get_block('latest')
+        return {
+            "block_number": latest_block["number"],
+            "base_fee_wei": latest_block["baseFeePerGas"],
+            "fetched_at": time.time(),
+            "is_fallback": False
+        }
+
+    def get_fee_data(self) -> Dict[str, Any]:
+        """
+        Возвращает данные о цене газа для текущего блока. Запрос к RPC
+        выполняет один вызывающий вне блокировки, остальные тем временем
+        получают последнюю цену. После ошибки RPC следующая попытка
+        делается не раньше, чем через block_time.
+
+        Returns:
+            Dict[str, Any]: {"block_number", "base_fee_wei", "fetched_at", "is_fallback"};
+                            block_number равен None для цены по умолчанию
+        """
+        logger = logging.getLogger("gas_oracle")
+
+        with self._lock:
+            now = time.time()
+            due = now - self._checked_at >= self.block_time
+            if not due and not self._failed and self._fee_data is not None:
+                return self._fee_data
+            refresh = due and not self._refreshing
+            if refresh:
+                self._refreshing = True
+            elif self._refreshing and self._fee_data is None:
+                # Цены еще нет ни одной: ждем первый ответ вместо цены по умолчанию
+                self._refreshed.wait_for(lambda: not self._refreshing)
+                if not self._failed:
+                    return self._fee_data
+
+        if refresh:
+            fee_data = None
+            try:
+                fee_data = self._fetch()
+                if fee_data is not self._fee_data:
+                    logger.debug(f"Блок {fee_data['block_number']}: base fee "
+                                 f"{Web3.from_wei(fee_data['base_fee_wei'], 'gwei'):.2f} gwei")
+            except Exception as e:
+                logger.error(f"Ошибка при получении цены газа: {str(e)}")
+
+            with self._lock:
+                # Неудачная попытка тоже откладывает следующую на block_time
+                self._checked_at = now
+                self._failed = fee_data is None
+                if fee_data is not None:
+                    self._fee_data = fee_data
+                self._refreshing = False
+                self._refreshed.notify_all()
+            if fee_data is not None:
+                return fee_data
+
+        return self._stale_or_fallback(now, warn=refresh)
+
+    def _stale_or_fallback(self, now: float, warn: bool) -> Dict[str, Any]:
+        """
+        Цена, когда получить новую не удалось или ее получает другой вызывающий
+
+        Args:
+            now (float): Время вызова
+            warn (bool): Писать предупреждение в лог (только при собственной неудачной попытке)
+        """
+        logger = logging.getLogger("gas_oracle")
+        fee_data = self._fee_data
+
+        # Последняя известная цена лучше значения по умолчанию
+        if fee_data is not None and not fee_data["is_fallback"] \
+                and now - fee_data["fetched_at"] < MAX_STALE_SECONDS:
+            if warn:
+                logger.warning(f"Используем цену газа из блока {fee_data['block_number']}")
+            return fee_data
+
+        if warn:
+            logger.warning(f"Используем цену газа по умолчанию: {FALLBACK_BASE_FEE_GWEI} Gwei")
+        return {
+            "block_number": None,
+            "base_fee_wei": Web3.to_wei(FALLBACK_BASE_FEE_GWEI, 'gwei'),
+            "fetched_at": now,
+            "is_fallback": True
+        }
+
+    def get_fee_history(self) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает eth_feeHistory за FEE_HISTORY_BLOCKS последних блоков
+        с перцентилями всех скоростей. Запрашивается один раз на блок.
+
+        Returns:
+            Optional[Dict[str, Any]]: {"next_base_fee": wei, "rewards": {перцентиль: [wei по блокам]}}
+                                      или None, если получить историю не удалось
+        """
+        logger = logging.getLogger("gas_oracle")
+        fee_data = self.get_fee_data()
+        if fee_data["is_fallback"]:
+            return None
+
+        with self._history_lock:
+            if self._history is not None and self._history_block == fee_data["block_number"]:
+                return self._history
+
+            percentiles = sorted(set(FEE_SPEED_PERCENTILES.values()) | {_get_percentile()})
+            try:
+                web3 = get_web3_provider()
+                history = web3.eth.fee_history(FEE_HISTORY_BLOCKS, fee_data["block_number"], percentiles)
+            except Exception as e:
+                logger.warning(f"eth_feeHistory недоступен: {str(e)}")
+                return None
+
+            rewards = {percentile: [] for percentile in percentiles}
+            for block_rewards in history.get("reward") or []:
+                for percentile, reward in zip(percentiles, block_rewards):
+                    rewards[percentile].append(reward)
+
+            self._history = {
+                # Последний элемент baseFeePerGas - base fee следующего блока
+                "next_base_fee": history["baseFeePerGas"][-1],
+                "rewards": rewards
+            }
+            self._history_block = fee_data["block_number"]
+            return self._history
+
+    def estimate_fees(self, speed: Optional[str] = None, projection_blocks: int = FEE_PROJECTION_BLOCKS) -> Dict[str, Any]:
+        """
+        Оценивает EIP-1559 комиссии для новой транзакции.
+
+        priority fee - медиана по последним блокам выбранного перцентиля
+        вознаграждений (пустые блоки не учитываются, нижняя граница
+        PRIORITY_FEE_GWEI). maxFee покрывает максимально возможный рост
+        base fee за projection_blocks блоков, чтобы транзакция оставалась
+        включаемой все это время.
+
+        Args:
+            speed (Optional[str]): "slow", "normal" или "fast" (по умолчанию FEE_SPEED)
+            projection_blocks (int): На сколько блоков вперед рассчитывается base fee
+
+        Returns:
+            Dict[str, Any]: {"base_fee_wei", "priority_fee_wei", "max_fee_wei", "percentile"}
+        """
+        percentile = _get_percentile(speed)
+        min_priority_fee = Web3.to_wei(PRIORITY_FEE_GWEI, 'gwei')
+        history = self.get_fee_history()
+
+        if history is None:
+            base_fee = self.get_fee_data()["base_fee_wei"]
+            priority_fee = min_priority_fee
+        else:
+            base_fee = history["next_base_fee"]
+            rewards = sorted(reward for reward in history["rewards"].get(percentile, []) if reward > 0)
+            priority_fee = max(rewards[len(rewards) // 2], min_priority_fee) if rewards else min_priority_fee
+
+        # base fee следующего блока уже известен, рост возможен в остальных
+        growth = (1 + MAX_BASE_FEE_CHANGE) ** max(projection_blocks - 1, 0)
+        max_fee = math.ceil(base_fee * growth) + priority_fee
+
+        return {
+            "base_fee_wei": base_fee,
+            "priority_fee_wei": priority_fee,
+            "max_fee_wei": max_fee,
+            "percentile": percentile
+        }
+
+    def invalidate(self) -> None:
+        """
+        Сбрасывает кэш, чтобы следующий вызов запросил цену заново
+        """
+        with self._lock:
+            self._checked_at = 0.0
+
+def _get_percentile(speed: Optional[str] = None) -> int:
+    """
+    Возвращает перцентиль вознаграждений для скорости (или FEE_PERCENTILE из .env)
+    """
+    if speed is None and FEE_PERCENTILE:
+        return int(FEE_PERCENTILE)
+    speed = speed or FEE_SPEED
+    if speed not in FEE_SPEED_PERCENTILES:
+        raise ValueError(f"Неизвестная скорость {speed}, допустимо: {', '.join(FEE_SPEED_PERCENTILES)}")
+    return FEE_SPEED_PERCENTILES[speed]
+
+# Общий для процесса экземпляр
+_oracle_lock = threading.Lock()
+_oracle: Optional[GasOracle] = None
+
+def get_gas_oracle() -> GasOracle:
+    """
+    Возвращает общий для процесса GasOracle
+
+    Returns:
+        GasOracle: Оракул цен газа
+    """
+    global _oracle
+    with _oracle_lock:
+        if _oracle is None:
+            _oracle = GasOracle()
+        return _oracle
+
+def get_base_fee() -> int:
+    """
+    Возвращает базовую цену газа текущего блока (или цену по умолчанию)
+
+    Returns:
+        int: Base fee в wei
+    """
+    return get_gas_oracle().get_fee_data()["base_fee_wei"]
+
+def estimate_fees(speed: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Оценивает maxFeePerGas и maxPriorityFeePerGas по eth_feeHistory (см. GasOracle.estimate_fees)
+
+    Args:
+        speed (Optional[str]): "slow", "normal" или "fast" (по умолчанию FEE_SPEED)
+
+    Returns:
+        Dict[str, Any]: {"base_fee_wei", "priority_fee_wei", "max_fee_wei", "percentile"}
+    """
+    return get_gas_oracle().estimate_fees(speed)
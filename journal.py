@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from concurrent.futures import wait
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+
+from rpc_batch import batch_call, get_transaction_counts
+from receipt_tracker import get_receipt_tracker
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+JOURNAL_FILE = os.getenv("JOURNAL_FILE", "journal.sqlite3")
+# Записи done/failed копятся в памяти и пишутся одной транзакцией, когда их набирается
+# JOURNAL_BATCH_SIZE или с первой несохраненной записи прошло JOURNAL_FLUSH_INTERVAL секунд.
+# Запись pending пишется сразу: без нее после сбоя транзакция в сети будет отправлена повторно
+JOURNAL_BATCH_SIZE = int(os.getenv("JOURNAL_BATCH_SIZE", "200"))
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "1"))
+# Сколько адресов читать одним SELECT (лимит переменных SQLite - 999)
+READ_CHUNK_SIZE = 500
+
+# Этапы и статусы
+STAGE_CLAIM = "claim"
+STAGE_SEND = "send"
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallet_state (
+    address TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tx_hash TEXT,
+    nonce INTEGER,
+    amount TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (address, stage)
+)
+"""
+
+# Не переданные поля (None) сохраняют прежние значения
+_UPSERT = """
+INSERT INTO wallet_state (address, stage, status, tx_hash, nonce, amount, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (address, stage) DO UPDATE SET
+    status = excluded.status,
+    tx_hash = COALESCE(excluded.tx_hash, tx_hash),
+    nonce = COALESCE(excluded.nonce, nonce),
+    amount = COALESCE(excluded.amount, amount),
+    updated_at = excluded.updated_at
+"""
+
+class Journal:
+    """
+    Журнал состояния кошельков по этапам (клейм, отправка) в SQLite:
+    статус, хеш и nonce последней транзакции, сумма. По нему повторный
+    запуск пропускает завершенную работу и дожидается транзакций,
+    отправленных до сбоя.
+    """
+
+    def __init__(self, file_path: str = JOURNAL_FILE):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._buffer: List[tuple] = []
+        self._first_buffered_at = 0.0
+        self._conn = sqlite3.connect(file_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def record(
+        self,
+        address: str,
+        stage: str,
+        status: str,
+        tx_hash: Optional[str] = None,
+        nonce: Optional[int] = None,
+        amount: Optional[int] = None
+    ) -> None:
+        """
+        Добавляет запись о состоянии кошелька. Запись pending сохраняется
+        на диск до возврата (вместе с накопленными), done и failed - пачкой
+
+        Args:
+            address (str): Адрес кошелька
+            stage (str): Этап (STAGE_CLAIM, STAGE_SEND)
+            status (str): Статус (STATUS_PENDING, STATUS_DONE, STATUS_FAILED)
+            tx_hash (Optional[str]): Хеш транзакции
+            nonce (Optional[int]): Nonce транзакции
+            amount (Optional[int]): Сумма в wei
+        """
+        row = (address.lower(), stage, status, tx_hash, nonce,
+               str(amount) if amount is not None else None, time.time())
+        with self._lock:
+            if not self._buffer:
+                self._first_buffered_at = row[-1]
+            self._buffer.append(row)
+            should_flush = status == STATUS_PENDING or len(self._buffer) >= JOURNAL_BATCH_SIZE \
+                or row[-1] - self._first_buffered_at >= JOURNAL_FLUSH_INTERVAL
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Записывает накопленные записи одной транзакцией
+        """
+        logger = logging.getLogger("main")
+
+        with self._lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            try:
+                with self._conn:
+                    self._conn.executemany(_UPSERT, rows)
+            except sqlite3.Error as e:
+                # Возвращаем записи в буфер, чтобы не потерять их
+                self._buffer = rows + self._buffer
+                logger.error(f"Ошибка записи журнала: {str(e)}")
+
+    def get_many(self, addresses: List[str], stage: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Читает состояние кошельков на этапе
+
+        Args:
+            addresses (List[str]): Адреса кошельков
+            stage (str): Этап
+
+        Returns:
+            Dict[str, Dict[str, Any]]: {адрес в нижнем регистре: {"status", "tx_hash", "nonce", "amount"}}
+                                       только для адресов, которые есть в журнале
+        """
+        self.flush()
+        keys = [address.lower() for address in addresses]
+        states: Dict[str, Dict[str, Any]] = {}
+
+        with self._lock:
+            for i in range(0, len(keys), READ_CHUNK_SIZE):
+                chunk = keys[i:i + READ_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT address, status, tx_hash, nonce, amount FROM wallet_state "
+                    f"WHERE stage = ? AND address IN ({placeholders})",
+                    [stage] + chunk
+                )
+                for address, status, tx_hash, nonce, amount in cursor:
+                    states[address] = {
+                        "status": status,
+                        "tx_hash": tx_hash,
+                        "nonce": nonce,
+                        "amount": int(amount) if amount is not None else None
+                    }
+        return states
+
+    def forget(self, address: str, stage: str) -> None:
+        """
+        Удаляет запись кошелька на этапе (кошелек будет обработан заново)
+        """
+        self.flush()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM wallet_state WHERE address = ? AND stage = ?", (address.lower(), stage))
+
+    def resume(self, addresses: List[str], stage: str, timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Читает состояние кошельков и разбирает транзакции, оставшиеся в статусе
+        pending после прошлого запуска: receipts запрашиваются одним batch,
+        транзакции, которые еще в mempool, ожидаются через общий трекер,
+        а выпавшие из mempool удаляются из журнала.
+
+        Args:
+            addresses (List[str]): Адреса кошельков
+            stage (str): Этап
+            timeout (Optional[float]): Сколько ждать транзакции из mempool (по умолчанию RECEIPT_TIMEOUT)
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Состояние кошельков после разбора (см. get_many)
+        """
+        logger = logging.getLogger("main")
+        states = self.get_many(addresses, stage)
+        pending = {address: state for address, state in states.items()
+                   if state["status"] == STATUS_PENDING and state["tx_hash"]}
+        if not pending:
+            return states
+
+        logger.info(f"Журнал: {len(pending)} неподтвержденных транзакций этапа {stage} с прошлого запуска")
+        try:
+            receipts = batch_call([("eth_getTransactionReceipt", [state["tx_hash"]]) for state in pending.values()])
+            unresolved = [address for address, receipt in zip(pending, receipts) if receipt is None]
+            latest = get_transaction_counts(unresolved, "latest") if unresolved else {}
+            in_pool = get_transaction_counts(unresolved, "pending") if unresolved else {}
+        except Exception as e:
+            logger.warning(f"Не удалось проверить транзакции из журнала: {str(e)}")
+            return states
+
+        tracker = get_receipt_tracker()
+        waiting = {}
+        for (address, state), receipt in zip(pending.items(), receipts):
+            nonce = state["nonce"]
+            if receipt is not None:
+                self._resolve(address, stage, state, int(receipt["status"], 16) == 1)
+            elif nonce is None or in_pool[address] <= nonce:
+                # Транзакция выпала из mempool: кошелек обрабатывается заново
+                logger.info(f"Журнал: транзакция {state['tx_hash']} для {address} не найдена, повторяем {stage}")
+                self.forget(address, stage)
+                del states[address]
+            elif latest[address] > nonce:
+                # Nonce занят другой версией транзакции (замена): статус проверит сам этап
+                self.forget(address, stage)
+                del states[address]
+            else:
+                waiting[tracker.track(state["tx_hash"], timeout=timeout)] = address
+
+        if waiting:
+            logger.info(f"Журнал: ждем подтверждения {len(waiting)} транзакций из mempool")
+            wait(list(waiting))
+            for future, address in waiting.items():
+                if not future.cancelled() and future.exception() is None:
+                    self._resolve(address, stage, states[address], future.result()["status"] == 1)
+
+        self.flush()
+        return states
+
+    def reconcile(self, address: str, stage: str, state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Разбирает запись pending, которую не разобрал resume() (не удалось проверить
+        транзакции или не дождались подтверждения): сначала receipt, затем nonce
+        отправителя. Запись pending нельзя считать завершенной - транзакция
+        могла выпасть из mempool.
+
+        Args:
+            address (str): Адрес кошелька
+            stage (str): Этап
+            state (Optional[Dict[str, Any]]): Запись журнала (см. get_many)
+
+        Returns:
+            Optional[Dict[str, Any]]: Запись после разбора: done/failed по receipt,
+                pending - транзакция еще в mempool; None - этап нужно повторить
+        """
+        if state is None or state["status"] != STATUS_PENDING:
+            return state
+
+        logger = logging.getLogger("main")
+        nonce = state["nonce"]
+
+        if state["tx_hash"]:
+            calls = [("eth_getTransactionReceipt", [state["tx_hash"]])]
+            if nonce is not None:
+                calls += [("eth_getTransactionCount", [address, "latest"]),
+                          ("eth_getTransactionCount", [address, "pending"])]
+            receipt, *counts = batch_call(calls)
+            if receipt is not None:
+                self._resolve(address, stage, state, int(receipt["status"], 16) == 1)
+                return state
+            if counts:
+                latest, in_pool = (int(count, 16) for count in counts)
+                if latest <= nonce < in_pool:
+                    # Транзакция еще в mempool: запись разберет следующий запуск
+                    logger.info(f"Журнал: транзакция {state['tx_hash']} для {address} еще в mempool")
+                    return state
+
+        # Транзакция выпала из mempool или nonce занят ее заменой: этап повторяется,
+        # его собственные проверки (isClaimed, баланс токена) не дадут выполнить его дважды
+        logger.info(f"Журнал: транзакция {state['tx_hash']} для {address} не подтверждена, повторяем {stage}")
+        self.forget(address, stage)
+        return None
+
+    def _resolve(self, address: str, stage: str, state: Dict[str, Any], success: bool) -> None:
+        state["status"] = STATUS_DONE if success else STATUS_FAILED
+        self.record(address, stage, state["status"])
+
+    def close(self) -> None:
+        """
+        Сохраняет буфер и закрывает базу
+        """
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+# Общий для процесса экземпляр
+_journal_lock = threading.Lock()
+_journal: Optional[Journal] = None
+
+def get_journal() -> Journal:
+    """
+    Возвращает общий для процесса журнал, открывая базу при первом вызове
+
+    Returns:
+        Journal: Журнал
+    """
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = Journal()
+            # Буфер не должен потеряться при обычном завершении процесса
+            atexit.register(_journal.flush)
+        return _journal
@@ -3,34 +3,113 @@
 
 import os
 import sys
+import asyncio
 import logging
-from typing import List, Dict, Any, Tuple
+from itertools import chain
+from typing import List, Dict, Any, Tuple, Iterator
 from rich.console import Console
 from rich.table import Table
 from rich.progress import Progress, TextColumn, BarColumn, SpinnerColumn, TimeElapsedColumn
-from web3 import Web3
 from rich.panel import Panel
 from rich.text import Text
-from eth_account import Account
 from rich.layout import Layout
 from rich.spinner import Spinner
 from rich import box
 
-from wallet_loader import load_wallets
-from signer import generate_signature
-from api_checker import check_eligibility
-from balance_checker import check_gas_balance, check_token_balance, check_gas_requirements
-from claimer import claim_tokens, is_already_claimed
+from wallet_loader import Wallet, iter_wallet_chunks, remove_wallets
+from signer import get_signature, get_signatures, save_signature_cache, SEASON1_MESSAGE
+from api_checker import check_eligibility_many, EligibilityCheckError
+from eligibility_cache import get_eligibility_cache
+from balance_checker import (
+    check_token_balance, check_gas_requirements,
+    check_gas_balances, check_token_balances, get_current_gas_prices, get_balances_multicall
+)
+from claim_index import load_claim_index
+from async_claimer import claim_for_all_async, claim_and_send_all_async
 from sender import send_tokens_to_exchange
 from utils import setup_logging
+from nonce_manager import get_nonce_manager
+from gas_estimates import get_gas_estimate_cache
+from journal import get_journal, STAGE_SEND, STATUS_DONE, STATUS_FAILED
 
 # Константы
-TOKEN_ADDRESS = "0x3f80b1c54ae920be41a77f8b902259d48cf24ccf"
-DROP_CONTRACT = "0x68b55c20a2634b25a50a219b632f22854d810bf5"
-API_URL = "https://common.kerneldao.com/merkle/proofs/kernel_eth"
+TOKEN_ADDRESS = os.getenv("TOKEN_ADDRESS", "0x3f80b1c54ae920be41a77f8b902259d48cf24ccf")
+WALLETS_FILE = "wallets.txt"
 
 console = Console()
 
+def wallet_chunks() -> Iterator[List[Wallet]]:
+    """
+    Читает кошельки из WALLETS_FILE пачками, не загружая весь файл в память
+    """
+    for chunk, _ in iter_wallet_chunks(WALLETS_FILE):
+        yield chunk
+
+def prefetch_gas_balances(wallets: List[Wallet], logger: logging.Logger) -> Dict[str, float]:
+    """
+    Получает балансы ETH всех кошельков через Multicall3 или batch-запросами.
+    При ошибке возвращает пустой словарь, и балансы запрашиваются по одному.
+    """
+    try:
+        return check_gas_balances([wallet.address for wallet in wallets])
+    except Exception as e:
+        logger.warning(f"Не удалось получить балансы пакетно, проверяем по одному: {str(e)}")
+        return {}
+
+def prefetch_nonces(wallets: List[Wallet]) -> None:
+    """
+    Загружает pending nonce кошельков в общий NonceManager batch-запросами.
+    Вызывается каждым режимом меню перед отправкой с кошельков пачки: nonce
+    из сети заменяют оставшиеся от прошлого режима, и дыра от выпавшей
+    транзакции не переживает его. При ошибке используются прежние значения,
+    а неизвестные nonce запрашиваются по одному при первой транзакции кошелька.
+    """
+    get_nonce_manager().seed_many([wallet.address for wallet in wallets])
+
+def prefetch_recipient_balances(wallets: List[Wallet], logger: logging.Logger) -> None:
+    """
+    Получает балансы токена адресов бирж через Multicall3: по ним кэш оценок
+    газа выбирает оценки перевода на новый или уже пополненный адрес.
+    При ошибке балансы запрашиваются по одному перед переводом.
+    """
+    exchange_addresses = list({wallet.exchange_address for wallet in wallets if wallet.exchange_address})
+    if not exchange_addresses:
+        return
+    try:
+        balances = get_balances_multicall(exchange_addresses, TOKEN_ADDRESS, include_eth=False)
+    except Exception as e:
+        logger.warning(f"Не удалось получить балансы адресов бирж пакетно: {str(e)}")
+        return
+    get_gas_estimate_cache().set_recipient_balances({address: entry["token"] for address, entry in balances.items()})
+
+def journal_send_result(wallet: Wallet, state: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    """
+    Строка результата отправки по записи журнала из прошлого запуска
+    """
+    status = "✅ Отправлено (журнал)" if state["status"] == STATUS_DONE else "⏳ Не подтверждена"
+    return (wallet.address, wallet.exchange_address or "Не указан", status, state["tx_hash"] or "-")
+
+def save_eligibility_cache(logger: logging.Logger) -> None:
+    """
+    Сохраняет кэш eligibility и кэш подписей на диск после проверки
+    """
+    try:
+        get_eligibility_cache().save()
+        save_signature_cache()
+    except Exception as e:
+        logger.error(f"Не удалось сохранить кэш eligibility: {str(e)}")
+
+def clear_eligibility_cache():
+    logger = logging.getLogger("eligibility")
+    
+    confirmation = console.input("[bold yellow]Очистить кэш eligibility? Следующая проверка заново запросит API для всех кошельков (y/n): [/bold yellow]")
+    if confirmation.lower() != "y":
+        return
+    
+    removed = get_eligibility_cache().invalidate()
+    logger.info(f"Кэш eligibility очищен, удалено {removed} записей")
+    console.print(f"[bold green]Кэш eligibility очищен, удалено {removed} записей[/bold green]")
+
 def display_menu():
     console.print("[bold green]KernelDAO Airdrop Bot[/bold green]")
     console.print("=" * 50)
@@ -39,6 +118,8 @@ def display_menu():
     console.print("[3] Клеймить дроп")
     console.print("[4] Проверить полученные токены")
     console.print("[5] Отправить токены на биржу")
+    console.print("[6] Очистить кэш eligibility")
+    console.print("[7] Клеймить и сразу отправить на биржу")
     console.print("[0] Выход")
     console.print("=" * 50)
     
@@ -56,15 +137,19 @@ def main():
     logger.info("KernelDAO Airdrop Bot запущен")
     
     try:
-        # Загружаем кошельки
-        wallets = load_wallets()
-        if not wallets:
+        # Проверяем кошельки одним потоковым проходом по файлу; в памяти
+        # их не держим, каждый режим читает файл заново пачками
+        total_wallets = 0
+        wallets_with_exchange = 0
+        for chunk in wallet_chunks():
+            total_wallets += len(chunk)
+            wallets_with_exchange += sum(1 for w in chunk if w.exchange_address)
+        if not total_wallets:
             console.print("[bold red]Ошибка: Не удалось загрузить кошельки из wallets.txt[/bold red]")
             return
             
         # Показываем краткую информацию о загруженных кошельках
-        wallets_with_exchange = sum(1 for w in wallets if "exchange_address" in w and w["exchange_address"])
-        console.print(f"[bold green]✓ Успешно загружено {len(wallets)} кошельков[/bold green]")
+        console.print(f"[bold green]✓ Успешно загружено {total_wallets} кошельков[/bold green]")
         console.print(f"[bold blue]ℹ {wallets_with_exchange} кошельков имеют адрес биржи[/bold blue]")
         
         while True:
@@ -76,19 +161,26 @@ def main():
                 break
                 
             elif choice == "1":
-                check_eligibility_for_all(wallets)
+                # После удаления неподходящих кошельков остальные режимы получают новое количество
+                total_wallets = check_eligibility_for_all(total_wallets)
                 
             elif choice == "2":
-                check_gas_for_all(wallets)
+                check_gas_for_all(total_wallets)
                 
             elif choice == "3":
-                claim_for_all(wallets)
+                claim_for_all(total_wallets)
                 
             elif choice == "4":
-                check_tokens_for_all(wallets)
+                check_tokens_for_all(total_wallets)
                 
             elif choice == "5":
-                send_tokens_for_all(wallets)
+                send_tokens_for_all(total_wallets)
+                
+            elif choice == "6":
+                clear_eligibility_cache()
+                
+            elif choice == "7":
+                claim_and_send_for_all(total_wallets)
                 
             else:
                 console.print("[bold red]Неверный выбор. Попробуйте снова.[/bold red]")
@@ -100,7 +192,13 @@ def main():
         logger.error(f"Неожиданная ошибка: {str(e)}")
         console.print(f"[bold red]Неожиданная ошибка: {str(e)}[/bold red]")
 
-def check_eligibility_for_all(wallets: List[Dict[str, str]]):
+def check_eligibility_for_all(total_wallets: int) -> int:
+    """
+    Проверяет eligibility всех кошельков и предлагает удалить неподходящие
+
+    Returns:
+        int: Количество кошельков в файле после проверки
+    """
     logger = logging.getLogger("eligibility")
     logger.info("Проверка eligibility запущена")
     
@@ -113,10 +211,11 @@ def check_eligibility_for_all(wallets: List[Dict[str, str]]):
     
     confirmation = console.input("[bold yellow]Продолжить проверку? (y/n): [/bold yellow]")
     if confirmation.lower() != "y":
-        return
+        return total_wallets
     
-    results = []
     not_eligible_addresses = []
+    # Кошельки, по которым API не ответил: их не удаляем, а проверяем повторно
+    failed_addresses = []
     
     # Создаем прогресс-бар
     with Progress(
@@ -126,32 +225,62 @@ def check_eligibility_for_all(wallets: List[Dict[str, str]]):
         TextColumn("[bold]{task.completed}/{task.total}"),
         TimeElapsedColumn(),
     ) as progress:
-        task = progress.add_task("[cyan]Проверка eligibility...", total=len(wallets))
+        task = progress.add_task("[cyan]Проверка eligibility...", total=total_wallets)
+        
+        results = []
         
-        for wallet in wallets:
-            address = wallet["address"]
-            private_key = wallet["private_key"]
+        # Кошельки читаем из файла пачками: первая пачка уходит в API,
+        # не дожидаясь чтения всего файла
+        for wallets in wallet_chunks():
+            # Сначала подписываем сообщение для всех кошельков пачки (пакетно, на всех ядрах)
+            rows = {}
+            signed_wallets = []
+            progress.update(task, description="[cyan]Подпись сообщений...")
+            try:
+                signatures = get_signatures(
+                    [wallet.key for wallet in wallets],
+                    SEASON1_MESSAGE,
+                    [wallet.address for wallet in wallets]
+                )
+                signed_wallets = list(zip(wallets, signatures))
+            except Exception as e:
+                logger.warning(f"Пакетная подпись не удалась, подписываем по одному: {str(e)}")
+                for wallet in wallets:
+                    address = wallet.address
+                    try:
+                        signature = get_signature(wallet.private_key, SEASON1_MESSAGE, address)
+                        signed_wallets.append((wallet, signature))
+                    except Exception as e:
+                        rows[address] = (address, f"❌ Ошибка: {str(e)}", "-")
+                        logger.error(f"Ошибка при подписи для {address}: {str(e)}")
+                        progress.advance(task)
             
-            progress.update(task, description=f"[cyan]Проверка адреса {address[:8]}...")
+            # Затем запрашиваем API одновременно для всех подписанных кошельков
+            progress.update(task, description="[cyan]Запросы к API eligibility...")
+            eligibility_results = check_eligibility_many(
+                [(wallet.address, signature) for wallet, signature in signed_wallets],
+                on_done=lambda address, result: progress.advance(task)
+            )
             
-            try:
-                signature = generate_signature(private_key, "Sign message to view your Season 1 points")
-                result = check_eligibility(address, signature)
-                
-                if result and "balance" in result:
+            for (wallet, _), result in zip(signed_wallets, eligibility_results):
+                address = wallet.address
+                if isinstance(result, EligibilityCheckError):
+                    rows[address] = (address, "⚠️ Ошибка API, повторите позже", "-")
+                    logger.warning(f"Не удалось проверить eligibility для {address}: {str(result)}")
+                    failed_addresses.append(address)
+                elif result and "balance" in result:
                     balance_in_kernel = int(result["balance"]) / 10**18
-                    results.append((address, "✅ Eligible", f"{balance_in_kernel:.4f}"))
+                    rows[address] = (address, "✅ Eligible", f"{balance_in_kernel:.4f}")
                     logger.info(f"Адрес {address} eligible для {balance_in_kernel:.4f} KERNEL")
                 else:
-                    results.append((address, "❌ Not eligible", "0"))
+                    rows[address] = (address, "❌ Not eligible", "0")
                     logger.info(f"Адрес {address} не eligible для дропа")
-                    not_eligible_addresses.append(wallet)
-                    
-            except Exception as e:
-                results.append((address, f"❌ Ошибка: {str(e)}", "-"))
-                logger.error(f"Ошибка при проверке {address}: {str(e)}")
+                    not_eligible_addresses.append(address)
             
-            progress.advance(task)
+            # Результаты выводим в порядке кошельков в файле
+            results.extend(rows[wallet.address] for wallet in wallets)
+    
+    save_eligibility_cache(logger)
     
     # Заполняем таблицу результатами
     for address, status, balance in results:
@@ -159,45 +288,26 @@ def check_eligibility_for_all(wallets: List[Dict[str, str]]):
     
     console.print(table)
     
+    if failed_addresses:
+        console.print(f"\n[bold yellow]Не удалось проверить {len(failed_addresses)} кошельков из-за ошибок API. "
+                      f"Они оставлены в файле, запустите проверку повторно позже.[/bold yellow]")
+    
     # Если есть неподходящие кошельки, спрашиваем о их удалении
     if not_eligible_addresses:
         console.print(f"\n[bold yellow]Найдено {len(not_eligible_addresses)} кошельков, не имеющих права на клейм.[/bold yellow]")
         remove_confirmation = console.input("[bold red]Удалить эти кошельки из файла wallets.txt? (y/n): [/bold red]")
         
         if remove_confirmation.lower() == "y":
-            # Загружаем все кошельки из файла
-            wallets_to_keep = []
-            not_eligible_addrs = [w["address"].lower() for w in not_eligible_addresses]
-            
-            with open("wallets.txt", "r") as f:
-                lines = f.readlines()
-                
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                parts = line.split(",")
-                if len(parts) >= 1:
-                    private_key = parts[0].strip()
-                    if private_key.startswith("0x"):
-                        private_key = private_key[2:]
-                    
-                    account = Account.from_key(private_key)
-                    address = account.address.lower()
-                    
-                    if address not in not_eligible_addrs:
-                        wallets_to_keep.append(line)
-            
-            # Сохраняем обновленный список кошельков
-            with open("wallets.txt", "w") as f:
-                for wallet_line in wallets_to_keep:
-                    f.write(f"{wallet_line}\n")
+            # Удаляем строки кошельков из файла (адреса берутся из кэша wallet_loader)
+            kept_count = remove_wallets(not_eligible_addresses, WALLETS_FILE)
             
-            console.print(f"[bold green]Удалено {len(not_eligible_addresses)} неподходящих кошельков. В файле wallets.txt осталось {len(wallets_to_keep)} кошельков.[/bold green]")
+            console.print(f"[bold green]Удалено {len(not_eligible_addresses)} неподходящих кошельков. В файле wallets.txt осталось {kept_count} кошельков.[/bold green]")
             logger.info(f"Удалено {len(not_eligible_addresses)} неподходящих кошельков из файла wallets.txt")
+            return kept_count
+    
+    return total_wallets
 
-def check_gas_for_all(wallets: List[Dict[str, str]]):
+def check_gas_for_all(total_wallets: int):
     logger = logging.getLogger("gas_balance")
     logger.info("Проверка баланса газа запущена")
     
@@ -226,6 +336,9 @@ def check_gas_for_all(wallets: List[Dict[str, str]]):
     
     results = []
     
+    # Цены газа получаем один раз
+    gas_data = get_current_gas_prices()
+    
     # Создаем прогресс-бар
     with Progress(
         SpinnerColumn(),
@@ -234,36 +347,40 @@ def check_gas_for_all(wallets: List[Dict[str, str]]):
         TextColumn("[bold]{task.completed}/{task.total}"),
         TimeElapsedColumn(),
     ) as progress:
-        task = progress.add_task("[cyan]Проверка баланса газа...", total=len(wallets))
+        task = progress.add_task("[cyan]Проверка баланса газа...", total=total_wallets)
         
-        for wallet in wallets:
-            address = wallet["address"]
-            
-            progress.update(task, description=f"[cyan]Проверка адреса {address}...")
+        for wallets in wallet_chunks():
+            # Балансы кошельков пачки получаем пакетно
+            gas_balances = prefetch_gas_balances(wallets, logger)
             
-            try:
-                gas_reqs = check_gas_requirements(address)
+            for wallet in wallets:
+                address = wallet.address
                 
-                results.append((
-                    address, 
-                    f"{gas_reqs['gas_balance']:.6f}",
-                    f"{gas_reqs['current_gas_price']:.2f}",
-                    f"{gas_reqs['claim_cost']:.6f}",
-                    f"{gas_reqs['transfer_cost']:.6f}",
-                    "✅" if gas_reqs['has_enough_for_claim'] else "❌",
-                    "✅" if gas_reqs['has_enough_for_transfer'] else "❌",
-                    "✅" if gas_reqs['has_enough_for_both'] else "❌"
-                ))
+                progress.update(task, description=f"[cyan]Проверка адреса {address}...")
                 
-                logger.info(f"Баланс газа для {address}: {gas_reqs['gas_balance']:.6f} ETH, " +
-                           f"достаточно для клейма: {'✅' if gas_reqs['has_enough_for_claim'] else '❌'}, " +
-                           f"для перевода: {'✅' if gas_reqs['has_enough_for_transfer'] else '❌'}")
+                try:
+                    gas_reqs = check_gas_requirements(address, gas_balances.get(address), gas_data)
+                    
+                    results.append((
+                        address, 
+                        f"{gas_reqs['gas_balance']:.6f}",
+                        f"{gas_reqs['current_gas_price']:.2f}",
+                        f"{gas_reqs['claim_cost']:.6f}",
+                        f"{gas_reqs['transfer_cost']:.6f}",
+                        "✅" if gas_reqs['has_enough_for_claim'] else "❌",
+                        "✅" if gas_reqs['has_enough_for_transfer'] else "❌",
+                        "✅" if gas_reqs['has_enough_for_both'] else "❌"
+                    ))
+                    
+                    logger.info(f"Баланс газа для {address}: {gas_reqs['gas_balance']:.6f} ETH, " +
+                               f"достаточно для клейма: {'✅' if gas_reqs['has_enough_for_claim'] else '❌'}, " +
+                               f"для перевода: {'✅' if gas_reqs['has_enough_for_transfer'] else '❌'}")
                 
-            except Exception as e:
-                results.append((address, f"Ошибка: {str(e)}", "-", "-", "-", "-", "-", "-"))
-                logger.error(f"Ошибка при проверке баланса для {address}: {str(e)}")
-            
-            progress.advance(task)
+                except Exception as e:
+                    results.append((address, f"Ошибка: {str(e)}", "-", "-", "-", "-", "-", "-"))
+                    logger.error(f"Ошибка при проверке баланса для {address}: {str(e)}")
+                
+                progress.advance(task)
     
     # Заполняем таблицу результатами
     for row in results:
@@ -271,7 +388,7 @@ def check_gas_for_all(wallets: List[Dict[str, str]]):
     
     console.print(table)
 
-def claim_for_all(wallets: List[Dict[str, str]]):
+def claim_for_all(total_wallets: int):
     logger = logging.getLogger("claim")
     logger.info("Клейм токенов запущен")
     
@@ -288,7 +405,13 @@ def claim_for_all(wallets: List[Dict[str, str]]):
     if confirmation.lower() != "y":
         return
     
-    results = []
+    # Цены газа получаем один раз
+    gas_data = get_current_gas_prices()
+    
+    # Индекс событий контракта отмечает уже заклеймившие кошельки;
+    # остальные проверяются через isClaimed
+    console.print("[cyan]Обновление индекса клеймов...[/cyan]")
+    claim_index = load_claim_index()
     
     # Создаем прогресс-бар
     with Progress(
@@ -298,75 +421,40 @@ def claim_for_all(wallets: List[Dict[str, str]]):
         TextColumn("[bold]{task.completed}/{task.total}"),
         TimeElapsedColumn(),
     ) as progress:
-        task = progress.add_task("[cyan]Выполнение клейма токенов...", total=len(wallets))
+        task = progress.add_task("[cyan]Выполнение клейма токенов...", total=total_wallets)
         
-        for wallet in wallets:
-            address = wallet["address"]
-            private_key = wallet["private_key"]
-            
-            progress.update(task, description=f"[cyan]Проверка и клейм для {address[:8]}...")
+        results = []
+        
+        for wallets in wallet_chunks():
+            # Балансы и nonce кошельков пачки получаем пакетно
+            gas_balances = prefetch_gas_balances(wallets, logger)
+            prefetch_nonces(wallets)
             
+            # Кошельки пачки обрабатываются одновременно асинхронным движком клейма
             try:
-                # Проверяем баланс ETH
-                gas_reqs = check_gas_requirements(address)
-                if not gas_reqs['has_enough_for_claim']:
-                    results.append((
-                        address, 
-                        "❌ Недостаточно ETH", 
-                        "-", 
-                        "-", 
-                        f"{gas_reqs['gas_balance']:.6f}"
-                    ))
-                    logger.warning(f"Недостаточно ETH для клейма на адресе {address}: {gas_reqs['gas_balance']:.6f} ETH (требуется ~{gas_reqs['claim_cost']:.6f} ETH)")
-                    progress.advance(task)
-                    continue
-                    
-                # Сначала проверяем eligibility
-                progress.update(task, description=f"[cyan]Проверка eligibility для {address[:8]}...")
-                signature = generate_signature(private_key, "Sign message to view your Season 1 points")
-                eligibility_data = check_eligibility(address, signature)
-                
-                if not eligibility_data or "balance" not in eligibility_data or int(eligibility_data["balance"]) == 0:
-                    results.append((address, "❌ Not eligible", "-", "0", f"{gas_reqs['gas_balance']:.6f}"))
-                    logger.info(f"Адрес {address} не eligible для клейма")
-                    progress.advance(task)
-                    continue
-                
-                balance = int(eligibility_data["balance"])
-                balance_in_kernel = balance / 10**18
-                
-                # Если already claimed, пропускаем
-                progress.update(task, description=f"[cyan]Проверка предыдущих клеймов для {address[:8]}...")
-                if is_already_claimed(address, 8):
-                    results.append((address, "⚠️ Already claimed", "-", f"{balance_in_kernel:.4f}", f"{gas_reqs['gas_balance']:.6f}"))
-                    logger.info(f"Адрес {address} уже выполнил клейм ранее")
-                    progress.advance(task)
-                    continue
-                
-                # Если eligible и есть достаточно ETH, делаем клейм
-                progress.update(task, description=f"[cyan]Отправка транзакции клейма для {address[:8]}...")
-                tx_hash = claim_tokens(
-                    private_key,
-                    8,  # используем фиксированный index=8 для всех кошельков
-                    address,
-                    eligibility_data["balance"],
-                    eligibility_data["proof"],
-                    True  # Используем прямой API для получения точных данных
-                )
-                
-                if tx_hash:
-                    progress.update(task, description=f"[cyan]Транзакция отправлена для {address[:8]}, ожидание подтверждения...")
-                    results.append((address, "✅ Claimed", tx_hash, f"{balance_in_kernel:.4f}", f"{gas_reqs['gas_balance']:.6f}"))
-                    logger.info(f"Успешный клейм для {address}, tx: {tx_hash}, amount: {balance_in_kernel:.4f} KERNEL")
-                else:
-                    results.append((address, "❌ Failed", "-", f"{balance_in_kernel:.4f}", f"{gas_reqs['gas_balance']:.6f}"))
-                    logger.error(f"Не удалось выполнить клейм для {address}")
-                    
+                results.extend(asyncio.run(claim_for_all_async(
+                    wallets,
+                    gas_balances,
+                    gas_data,
+                    claim_index,
+                    on_status=lambda address, description: progress.update(task, description=f"[cyan]{description}"),
+                    on_done=lambda result: progress.advance(task)
+                )))
             except Exception as e:
-                results.append((address, f"❌ Ошибка: {str(e)}", "-", "-", "-"))
-                logger.error(f"Ошибка при клейме для {address}: {str(e)}")
-            
-            progress.advance(task)
+                # Результаты уже обработанных пачек сохраняем и выводим ниже
+                logger.error(f"Ошибка движка клейма: {str(e)}")
+                console.print(f"[bold red]Ошибка при клейме: {str(e)}[/bold red]")
+                break
+    
+    save_eligibility_cache(logger)
+    get_journal().flush()
+    
+    # Сохраняем индекс с отметками о новых клеймах
+    if claim_index:
+        try:
+            claim_index.save()
+        except Exception as e:
+            logger.error(f"Не удалось сохранить индекс клеймов: {str(e)}")
     
     # Заполняем таблицу результатами
     for row in results:
@@ -374,7 +462,78 @@ def claim_for_all(wallets: List[Dict[str, str]]):
     
     console.print(table)
 
-def check_tokens_for_all(wallets: List[Dict[str, str]]):
+def claim_and_send_for_all(total_wallets: int):
+    logger = logging.getLogger("claim")
+    logger.info("Клейм с отправкой на биржу запущен")
+    
+    console.print("[bold cyan]Клейм токенов и отправка на биржу для всех кошельков...[/bold cyan]")
+    
+    table = Table(title="Результаты клейма и отправки")
+    table.add_column("Адрес", style="cyan")
+    table.add_column("Клейм", style="green")
+    table.add_column("Tx клейма", style="yellow")
+    table.add_column("Amount (KERNEL)", style="yellow")
+    table.add_column("Баланс ETH", style="yellow")
+    table.add_column("Отправка", style="green")
+    table.add_column("Tx отправки", style="blue")
+    
+    confirmation = console.input("[bold yellow]Заклеймить токены и сразу отправить их на адреса бирж? (y/n): [/bold yellow]")
+    if confirmation.lower() != "y":
+        return
+    
+    gas_data = get_current_gas_prices()
+    
+    console.print("[cyan]Обновление индекса клеймов...[/cyan]")
+    claim_index = load_claim_index()
+    
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[bold blue]{task.description}"),
+        BarColumn(),
+        TextColumn("[bold]{task.completed}/{task.total}"),
+        TimeElapsedColumn(),
+    ) as progress:
+        task = progress.add_task("[cyan]Клейм и отправка токенов...", total=total_wallets)
+        
+        results = []
+        
+        for wallets in wallet_chunks():
+            gas_balances = prefetch_gas_balances(wallets, logger)
+            prefetch_nonces(wallets)
+            prefetch_recipient_balances(wallets, logger)
+            
+            # Отправка с кошелька начинается сразу после подтверждения его клейма
+            # и идет параллельно с клеймами остальных кошельков пачки
+            try:
+                results.extend(asyncio.run(claim_and_send_all_async(
+                    wallets,
+                    gas_balances,
+                    gas_data,
+                    claim_index,
+                    token_address=TOKEN_ADDRESS,
+                    on_status=lambda address, description: progress.update(task, description=f"[cyan]{description}"),
+                    on_done=lambda result: progress.advance(task)
+                )))
+            except Exception as e:
+                logger.error(f"Ошибка движка клейма: {str(e)}")
+                console.print(f"[bold red]Ошибка при клейме: {str(e)}[/bold red]")
+                break
+    
+    save_eligibility_cache(logger)
+    get_journal().flush()
+    
+    if claim_index:
+        try:
+            claim_index.save()
+        except Exception as e:
+            logger.error(f"Не удалось сохранить индекс клеймов: {str(e)}")
+    
+    for row in results:
+        table.add_row(*row)
+    
+    console.print(table)
+
+def check_tokens_for_all(total_wallets: int):
     logger = logging.getLogger("token_balance")
     logger.info("Проверка баланса токенов запущена")
     
@@ -398,23 +557,33 @@ def check_tokens_for_all(wallets: List[Dict[str, str]]):
         TextColumn("[bold]{task.completed}/{task.total}"),
         TimeElapsedColumn(),
     ) as progress:
-        task = progress.add_task("[cyan]Проверка баланса токенов...", total=len(wallets))
+        task = progress.add_task("[cyan]Проверка баланса токенов...", total=total_wallets)
         
-        for wallet in wallets:
-            address = wallet["address"]
-            
-            progress.update(task, description=f"[cyan]Проверка баланса KERNEL для {address[:8]}...")
-            
+        for wallets in wallet_chunks():
+            # Балансы кошельков пачки получаем через Multicall3
             try:
-                balance = check_token_balance(address, TOKEN_ADDRESS)
-                results.append((address, f"{balance:.4f}"))
-                logger.info(f"Баланс KERNEL для {address}: {balance:.4f}")
-                
+                token_balances = check_token_balances([wallet.address for wallet in wallets], TOKEN_ADDRESS)
             except Exception as e:
-                results.append((address, f"Ошибка: {str(e)}"))
-                logger.error(f"Ошибка при проверке баланса KERNEL для {address}: {str(e)}")
+                logger.warning(f"Не удалось получить балансы через Multicall3, проверяем по одному: {str(e)}")
+                token_balances = {}
             
-            progress.advance(task)
+            for wallet in wallets:
+                address = wallet.address
+                
+                progress.update(task, description=f"[cyan]Проверка баланса KERNEL для {address[:8]}...")
+                
+                try:
+                    balance = token_balances.get(address)
+                    if balance is None:
+                        balance = check_token_balance(address, TOKEN_ADDRESS)
+                    results.append((address, f"{balance:.4f}"))
+                    logger.info(f"Баланс KERNEL для {address}: {balance:.4f}")
+                    
+                except Exception as e:
+                    results.append((address, f"Ошибка: {str(e)}"))
+                    logger.error(f"Ошибка при проверке баланса KERNEL для {address}: {str(e)}")
+                
+                progress.advance(task)
     
     # Заполняем таблицу результатами
     for row in results:
@@ -422,13 +591,13 @@ def check_tokens_for_all(wallets: List[Dict[str, str]]):
     
     console.print(table)
 
-def send_tokens_for_all(wallets: List[Dict[str, str]]):
+def send_tokens_for_all(total_wallets: int):
     logger = logging.getLogger("token_sender")
     logger.info("Отправка токенов на биржу запущена")
     
     console.print("[bold cyan]Отправка токенов на биржу для всех кошельков...[/bold cyan]")
     
-    if not wallets:
+    if not total_wallets:
         console.print("[bold red]Нет доступных кошельков[/bold red]")
         return
     
@@ -445,25 +614,43 @@ def send_tokens_for_all(wallets: List[Dict[str, str]]):
     
     results = []
     
+    # Кошельки читаем из файла пачками, nonce кошельков пачки получаем batch-запросами
+    chunks = wallet_chunks()
+    wallets = next(chunks, [])
+    if not wallets:
+        console.print("[bold red]Нет доступных кошельков[/bold red]")
+        return
+    prefetch_nonces(wallets)
+    prefetch_recipient_balances(wallets, logger)
+    
+    # Отправки из прошлого запуска берем из журнала: завершенные не повторяем,
+    # неподтвержденные дожидаемся, а выпавшие из mempool повторяем
+    journal = get_journal()
+    send_states = journal.resume([wallet.address for wallet in wallets], STAGE_SEND)
+    
     # Сначала отправляем с первого кошелька
     first_wallet = wallets[0]
-    first_address = first_wallet["address"]
-    first_private_key = first_wallet["private_key"]
-    first_exchange_address = first_wallet.get("exchange_address")
+    first_address = first_wallet.address
+    first_exchange_address = first_wallet.exchange_address
+    first_state = send_states.get(first_address.lower())
     
     console.print(f"[bold cyan]Отправка с первого кошелька {first_address}...[/bold cyan]")
     
     first_result = None
     
     try:
+        first_state = journal.reconcile(first_address, STAGE_SEND, first_state)
+        if first_state and first_state["status"] != STATUS_FAILED:
+            first_result = journal_send_result(first_wallet, first_state)
+            logger.info(f"Отправка с первого адреса {first_address} уже выполнена, tx: {first_state['tx_hash']}")
         # Проверяем наличие адреса биржи для первого кошелька
-        if not first_exchange_address:
+        elif not first_exchange_address:
             first_result = (first_address, "Не указан", "❌ Нет адреса биржи", "-")
             logger.warning(f"Не указан адрес биржи для первого кошелька {first_address}")
         else:
             # Отправляем токены с первого кошелька
             tx_hash = send_tokens_to_exchange(
-                private_key=first_private_key,
+                private_key=first_wallet,
                 exchange_address=first_exchange_address,
                 token_address=TOKEN_ADDRESS,
                 amount=None  # Отправляем весь баланс
@@ -493,8 +680,8 @@ def send_tokens_for_all(wallets: List[Dict[str, str]]):
     console.print(temp_table)
     
     # Если кошельков больше одного, запрашиваем подтверждение для остальных
-    if len(wallets) > 1:
-        remaining_confirmation = console.input(f"[bold yellow]Отправить токены с остальных {len(wallets) - 1} кошельков? (y/n): [/bold yellow]")
+    if total_wallets > 1:
+        remaining_confirmation = console.input(f"[bold yellow]Отправить токены с остальных {total_wallets - 1} кошельков? (y/n): [/bold yellow]")
         if remaining_confirmation.lower() != "y":
             # Если пользователь отказался, выводим только результат по первому кошельку
             console.print(temp_table)
@@ -508,44 +695,57 @@ def send_tokens_for_all(wallets: List[Dict[str, str]]):
             TextColumn("[bold]{task.completed}/{task.total}"),
             TimeElapsedColumn(),
         ) as progress:
-            task = progress.add_task("[cyan]Отправка токенов...", total=len(wallets) - 1)
+            task = progress.add_task("[cyan]Отправка токенов...", total=total_wallets - 1)
             
-            # Обрабатываем оставшиеся кошельки начиная со второго (индекс 1)
-            for wallet in wallets[1:]:
-                address = wallet["address"]
-                private_key = wallet["private_key"]
-                exchange_address = wallet.get("exchange_address")
-                
-                progress.update(task, description=f"[cyan]Отправка с адреса {address[:8]}...")
+            # Обрабатываем оставшиеся кошельки: остаток первой пачки, затем следующие пачки
+            for chunk_number, chunk in enumerate(chain([wallets[1:]], chunks)):
+                if chunk_number:
+                    prefetch_nonces(chunk)
+                    prefetch_recipient_balances(chunk, logger)
+                    send_states = journal.resume([wallet.address for wallet in chunk], STAGE_SEND)
                 
-                try:
-                    # Проверяем наличие адреса биржи
-                    if not exchange_address:
-                        results.append((address, "Не указан", "❌ Нет адреса биржи", "-"))
-                        logger.warning(f"Не указан адрес биржи для кошелька {address}")
-                        progress.advance(task)
-                        continue
+                for wallet in chunk:
+                    address = wallet.address
+                    exchange_address = wallet.exchange_address
                     
-                    # Отправляем токены
-                    tx_hash = send_tokens_to_exchange(
-                        private_key=private_key,
-                        exchange_address=exchange_address,
-                        token_address=TOKEN_ADDRESS,
-                        amount=None  # Отправляем весь баланс
-                    )
+                    progress.update(task, description=f"[cyan]Отправка с адреса {address[:8]}...")
                     
-                    if tx_hash:
-                        results.append((address, exchange_address, "✅ Отправлено", tx_hash))
-                        logger.info(f"Токены успешно отправлены с адреса {address} на {exchange_address}. Хеш: {tx_hash}")
-                    else:
-                        results.append((address, exchange_address, "❌ Ошибка", "-"))
-                        logger.error(f"Не удалось отправить токены с адреса {address}")
+                    try:
+                        state = journal.reconcile(address, STAGE_SEND, send_states.get(address.lower()))
+                        if state and state["status"] != STATUS_FAILED:
+                            results.append(journal_send_result(wallet, state))
+                            progress.advance(task)
+                            continue
+                        
+                        # Проверяем наличие адреса биржи
+                        if not exchange_address:
+                            results.append((address, "Не указан", "❌ Нет адреса биржи", "-"))
+                            logger.warning(f"Не указан адрес биржи для кошелька {address}")
+                            progress.advance(task)
+                            continue
+                        
+                        # Отправляем токены
+                        tx_hash = send_tokens_to_exchange(
+                            private_key=wallet,
+                            exchange_address=exchange_address,
+                            token_address=TOKEN_ADDRESS,
+                            amount=None  # Отправляем весь баланс
+                        )
+                        
+                        if tx_hash:
+                            results.append((address, exchange_address, "✅ Отправлено", tx_hash))
+                            logger.info(f"Токены успешно отправлены с адреса {address} на {exchange_address}. Хеш: {tx_hash}")
+                        else:
+                            results.append((address, exchange_address, "❌ Ошибка", "-"))
+                            logger.error(f"Не удалось отправить токены с адреса {address}")
+                        
+                    except Exception as e:
+                        results.append((address, exchange_address if exchange_address else "Не указан", f"❌ Ошибка: {str(e)}", "-"))
+                        logger.error(f"Ошибка при отправке токенов с адреса {address}: {str(e)}")
                     
-                except Exception as e:
-                    results.append((address, exchange_address if exchange_address else "Не указан", f"❌ Ошибка: {str(e)}", "-"))
-                    logger.error(f"Ошибка при отправке токенов с адреса {address}: {str(e)}")
-                
-                progress.advance(task)
+                    progress.advance(task)
+    
+    journal.flush()
     
     # Заполняем итоговую таблицу результатами
     for row in results:
@@ -553,24 +753,5 @@ def send_tokens_for_all(wallets: List[Dict[str, str]]):
     
     console.print(table)
 
-def get_web3_provider() -> Web3:
-    """
-    Получает объект Web3 на основе RPC URL из .env файла
-    
-    Returns:
-        Web3: Объект Web3 с подключенным провайдером
-    """
-    # Получаем RPC URL из переменных окружения
-    rpc_url = os.getenv("RPC_URL") or os.getenv("ETH_RPC_URL", "https://eth.llamarpc.com")
-    
-    # Создаем Web3 объект
-    web3 = Web3(Web3.HTTPProvider(rpc_url))
-    
-    # Проверяем подключение
-    if not web3.is_connected():
-        raise ConnectionError(f"Не удалось подключиться к RPC провайдеру: {rpc_url}")
-        
-    return web3
-
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from typing import Dict, List, Set, Optional, Callable
+from web3 import Web3
+
+from rpc_provider import get_web3_provider
+from rpc_batch import batch_call, get_transaction_counts
+
+# Фрагменты сообщений нод об ошибках nonce (geth, erigon, nethermind и др.)
+NONCE_TOO_LOW_MESSAGES = ("nonce too low", "already known", "oldnonce", "nonce has already been used")
+
+def is_nonce_too_low_error(error: Exception) -> bool:
+    """
+    Проверяет, отклонила ли нода транзакцию из-за уже использованного nonce
+
+    Args:
+        error (Exception): Ошибка send_raw_transaction
+
+    Returns:
+        bool: True для ошибок вида "nonce too low"
+    """
+    message = str(error).lower()
+    return any(fragment in message for fragment in NONCE_TOO_LOW_MESSAGES)
+
+class NonceManager:
+    """
+    Локальная выдача nonce по адресам. Начальное значение берется из
+    pending nonce ноды, дальше nonce выдаются без запросов к RPC, поэтому
+    несколько транзакций одного кошелька можно отправить подряд, не
+    дожидаясь подтверждения предыдущих.
+
+    Если транзакция с выданным nonce не была отправлена, nonce возвращается
+    через release() и выдается повторно первым, чтобы не оставить дыру,
+    из-за которой застрянут следующие транзакции.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {адрес в нижнем регистре: следующий nonce}
+        self._next: Dict[str, int] = {}
+        # {адрес в нижнем регистре: nonce, возвращенные без отправки}
+        self._gaps: Dict[str, Set[int]] = {}
+
+    def _fetch_pending(self, address: str) -> int:
+        web3 = get_web3_provider()
+        return web3.eth.get_transaction_count(address, "pending")
+
+    def seed_many(self, addresses: List[str]) -> None:
+        """
+        Получает pending nonce для адресов одним batch-запросом. Вызывается
+        перед отправкой транзакций с этих адресов: значения из сети заменяют
+        локальные, поэтому дыра от выпавшей из mempool транзакции прошлого
+        запуска или прошлого режима меню закрывается.
+
+        Args:
+            addresses (List[str]): Адреса кошельков
+        """
+        logger = logging.getLogger("main")
+        if not addresses:
+            return
+
+        try:
+            counts = get_transaction_counts(addresses, "pending")
+        except Exception as e:
+            logger.warning(f"Не удалось получить nonce batch-запросом, они будут запрошены по одному: {str(e)}")
+            return
+
+        with self._lock:
+            for address, count in counts.items():
+                key = address.lower()
+                self._next[key] = count
+                self._gaps.pop(key, None)
+
+    def next_nonce(self, address: str) -> int:
+        """
+        Выдает следующий nonce для адреса
+
+        Args:
+            address (str): Адрес кошелька
+
+        Returns:
+            int: Nonce для новой транзакции
+        """
+        key = address.lower()
+
+        with self._lock:
+            known = key in self._next
+        if not known:
+            pending = self._fetch_pending(address)
+            with self._lock:
+                self._next.setdefault(key, pending)
+
+        with self._lock:
+            gaps = self._gaps.get(key)
+            if gaps:
+                nonce = min(gaps)
+                gaps.discard(nonce)
+                return nonce
+            nonce = self._next[key]
+            self._next[key] = nonce + 1
+            return nonce
+
+    def release(self, address: str, nonce: int) -> None:
+        """
+        Возвращает nonce, транзакция с которым не была отправлена
+
+        Args:
+            address (str): Адрес кошелька
+            nonce (int): Неиспользованный nonce
+        """
+        key = address.lower()
+        with self._lock:
+            if key not in self._next:
+                return
+            if nonce == self._next[key] - 1:
+                self._next[key] = nonce
+                # Вместе с последним nonce закрываем и примыкающие к нему дыры
+                gaps = self._gaps.get(key, set())
+                while self._next[key] - 1 in gaps:
+                    self._next[key] -= 1
+                    gaps.discard(self._next[key])
+            elif nonce < self._next[key]:
+                self._gaps.setdefault(key, set()).add(nonce)
+
+    def resync(self, address: str, trust_chain: bool = False) -> int:
+        """
+        Заново получает pending nonce адреса, например после "nonce too low",
+        когда транзакции отправлялись в обход бота
+
+        Args:
+            address (str): Адрес кошелька
+            trust_chain (bool): Взять nonce из сети, даже если он меньше локального
+                                (транзакции бота выпали из mempool и образовали дыру)
+
+        Returns:
+            int: Новый следующий nonce
+        """
+        logger = logging.getLogger("main")
+        key = address.lower()
+        pending = self._fetch_pending(address)
+
+        with self._lock:
+            local_next = self._next.get(key, pending)
+            if trust_chain:
+                self._next[key] = pending
+                self._gaps[key] = set()
+            else:
+                self._next[key] = max(pending, local_next)
+                # Дыры ниже pending nonce уже заняты транзакциями в сети
+                self._gaps[key] = {nonce for nonce in self._gaps.get(key, set()) if nonce >= pending}
+            logger.info(f"Nonce для {address} синхронизирован с сетью: {self._next[key]}")
+            return self._next[key]
+
+    def recover_gap(self, address: str, nonce: int) -> bool:
+        """
+        Проверяет транзакцию, которую не дождались: если ее nonce не занят
+        ни в блоке (latest), ни в mempool (pending), транзакция выпала и
+        все следующие nonce адреса застрянут за дырой. Тогда nonce берется
+        из сети (resync с trust_chain=True).
+
+        Args:
+            address (str): Адрес отправителя
+            nonce (int): Nonce неподтвержденной транзакции
+
+        Returns:
+            bool: True, если дыра найдена и nonce синхронизирован
+        """
+        logger = logging.getLogger("main")
+        latest, pending = (int(count, 16) for count in batch_call([
+            ("eth_getTransactionCount", [address, "latest"]),
+            ("eth_getTransactionCount", [address, "pending"])
+        ]))
+        if nonce < latest or nonce < pending:
+            # Nonce занят: транзакция (или ее замена) в блоке или еще в mempool
+            return False
+
+        logger.warning(f"Транзакция {address} с nonce {nonce} выпала из mempool "
+                       f"(latest {latest}, pending {pending}), nonce берется из сети")
+        self.resync(address, trust_chain=True)
+        return True
+
+    def reset(self) -> None:
+        """
+        Забывает все nonce (следующий вызов заново запросит их у ноды)
+        """
+        with self._lock:
+            self._next.clear()
+            self._gaps.clear()
+
+# Общий для процесса экземпляр
+_manager_lock = threading.Lock()
+_manager: Optional[NonceManager] = None
+
+def get_nonce_manager() -> NonceManager:
+    """
+    Возвращает общий для процесса NonceManager
+
+    Returns:
+        NonceManager: Менеджер nonce
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = NonceManager()
+        return _manager
+
+def send_with_nonce(
+    web3: Web3,
+    address: str,
+    build_signed: Callable[[int], bytes],
+    nonce: Optional[int] = None
+) -> bytes:
+    """
+    Отправляет транзакцию с nonce из общего NonceManager.
+    При "nonce too low" nonce синхронизируется с сетью и транзакция
+    один раз пересобирается с новым nonce; при другой ошибке отправки
+    nonce возвращается менеджеру.
+
+    Args:
+        web3 (Web3): Объект Web3
+        address (str): Адрес отправителя
+        build_signed: Функция (nonce) -> подписанная raw-транзакция
+        nonce (Optional[int]): Явно заданный nonce (менеджер при этом не используется)
+
+    Returns:
+        bytes: Хеш отправленной транзакции
+    """
+    logger = logging.getLogger("main")
+
+    if nonce is not None:
+        return web3.eth.send_raw_transaction(build_signed(nonce))
+
+    manager = get_nonce_manager()
+    for attempt in range(2):
+        nonce = manager.next_nonce(address)
+        logger.info(f"Используем nonce: {nonce}")
+        try:
+            return web3.eth.send_raw_transaction(build_signed(nonce))
+        except Exception as e:
+            if is_nonce_too_low_error(e) and attempt == 0:
+                logger.warning(f"Nonce {nonce} для {address} уже использован, синхронизируем с сетью")
+                manager.resync(address)
+                continue
+            manager.release(address, nonce)
+            raise
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Callable, List, Set
+from dotenv import load_dotenv
+
+from rpc_batch import batch_call
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+# Сколько блоков (включая блок транзакции) нужно для подтверждения
+RECEIPT_CONFIRMATIONS = int(os.getenv("RECEIPT_CONFIRMATIONS", "1"))
+# Как часто проверять номер последнего блока, секунд
+RECEIPT_POLL_INTERVAL = float(os.getenv("RECEIPT_POLL_INTERVAL", "2"))
+# Сколько секунд ждать подтверждения одной транзакции
+RECEIPT_TIMEOUT = float(os.getenv("RECEIPT_TIMEOUT", "60"))
+
+# Поля receipt, которые приводятся из hex к int
+_INT_FIELDS = ("status", "blockNumber", "gasUsed", "cumulativeGasUsed", "effectiveGasPrice", "transactionIndex", "type")
+
+class ReceiptTimeout(TimeoutError):
+    """Транзакция не подтвердилась за отведенное время"""
+
+def _normalize_receipt(receipt: Dict[str, Any]) -> Dict[str, Any]:
+    normalized = dict(receipt)
+    for field in _INT_FIELDS:
+        if isinstance(normalized.get(field), str):
+            normalized[field] = int(normalized[field], 16)
+    return normalized
+
+class ReceiptTracker:
+    """
+    Отслеживает подтверждение многих транзакций одним фоновым потоком.
+    На каждый новый блок receipts всех ожидающих транзакций запрашиваются
+    одним batch-запросом eth_getTransactionReceipt, а вызывающий код
+    получает Future и не блокируется на опросе своей транзакции.
+    Новые транзакции проверяются на ближайшем круге, не дожидаясь
+    следующего блока: они могли попасть в уже известный блок.
+
+    Receipt повторно запрашивается, пока не наберется нужная глубина
+    подтверждений, поэтому транзакция, выпавшая из блока при реорге,
+    снова считается ожидающей.
+
+    Каждый вызов track() получает свой Future со своим сроком ожидания:
+    одну транзакцию могут ждать несколько потребителей (журнал, TxReplacer),
+    и таймаут или отмена одного не затрагивает остальных.
+    """
+
+    def __init__(
+        self,
+        confirmations: int = RECEIPT_CONFIRMATIONS,
+        poll_interval: float = RECEIPT_POLL_INTERVAL,
+        timeout: float = RECEIPT_TIMEOUT
+    ):
+        self.confirmations = max(1, confirmations)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # {хеш в нижнем регистре: {Future ожидающего: крайний срок}}
+        self._pending: Dict[str, Dict[Future, float]] = {}
+        # Хеши, receipt которых еще ни разу не запрашивался
+        self._unchecked: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._last_block: Optional[int] = None
+
+    def track(
+        self,
+        tx_hash: str,
+        callback: Optional[Callable[[Future], None]] = None,
+        timeout: Optional[float] = None
+    ) -> Future:
+        """
+        Регистрирует транзакцию для отслеживания
+
+        Args:
+            tx_hash (str): Хеш транзакции в формате hex
+            callback: Функция, вызываемая с Future после подтверждения или ошибки
+            timeout (Optional[float]): Время ожидания в секундах (по умолчанию self.timeout)
+
+        Returns:
+            Future: Результат - receipt (dict, числовые поля приведены к int);
+                    исключение ReceiptTimeout, если транзакция не подтвердилась вовремя.
+                    Future принадлежит только этому вызову
+        """
+        key = tx_hash.lower()
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        future = Future()
+
+        with self._lock:
+            if key not in self._pending:
+                self._pending[key] = {}
+                self._unchecked.add(key)
+            self._pending[key][future] = deadline
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="receipt-tracker", daemon=True)
+                self._thread.start()
+
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def untrack(self, tx_hash: str, future: Future) -> None:
+        """
+        Прекращает ожидание транзакции одним потребителем (например, замененной
+        другой транзакцией с тем же nonce): отменяется только его Future, другие
+        ожидающие той же транзакции продолжают ждать. Транзакция перестает
+        опрашиваться, когда ожидающих не остается
+
+        Args:
+            tx_hash (str): Хеш транзакции
+            future (Future): Future, полученный этим потребителем от track()
+        """
+        key = tx_hash.lower()
+        with self._lock:
+            waiters = self._pending.get(key)
+            if waiters is not None:
+                waiters.pop(future, None)
+                if not waiters:
+                    del self._pending[key]
+                    self._unchecked.discard(key)
+        future.cancel()
+
+    def wait(self, tx_hash: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Блокирующее ожидание подтверждения одной транзакции
+
+        Args:
+            tx_hash (str): Хеш транзакции
+            timeout (Optional[float]): Время ожидания в секундах
+
+        Returns:
+            Dict[str, Any]: Receipt транзакции
+
+        Raises:
+            ReceiptTimeout: Если транзакция не подтвердилась вовремя
+        """
+        return self.track(tx_hash, timeout=timeout).result()
+
+    def _run(self) -> None:
+        logger = logging.getLogger("main")
+
+        while True:
+            with self._lock:
+                if not self._pending:
+                    # Поток завершается, track() запустит новый при необходимости
+                    self._thread = None
+                    self._unchecked.clear()
+                    return
+                pending = list(self._pending.keys())
+
+            try:
+                self._poll(pending)
+            except Exception as e:
+                logger.warning(f"Ошибка при проверке подтверждений транзакций: {str(e)}")
+
+            self._expire()
+            time.sleep(self.poll_interval)
+
+    def _poll(self, pending: List[str]) -> None:
+        """
+        Запрашивает номер блока и receipts ожидающих транзакций: всех, если
+        блок новый, иначе только еще не проверенных
+        """
+        block_number = int(batch_call([("eth_blockNumber", [])])[0], 16)
+        if block_number == self._last_block:
+            with self._lock:
+                pending = [tx_hash for tx_hash in pending if tx_hash in self._unchecked]
+            if not pending:
+                return
+
+        receipts = batch_call([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in pending])
+        # Блок запоминается только после успешного запроса, иначе повторим на следующем круге
+        self._last_block = block_number
+        with self._lock:
+            self._unchecked.difference_update(pending)
+
+        for tx_hash, receipt in zip(pending, receipts):
+            if receipt is None or receipt.get("blockNumber") is None:
+                continue
+            receipt = _normalize_receipt(receipt)
+            if block_number - receipt["blockNumber"] + 1 < self.confirmations:
+                continue
+            with self._lock:
+                waiters = self._pending.pop(tx_hash, {})
+            for future in waiters:
+                if not future.done():
+                    future.set_result(receipt)
+
+    def _expire(self) -> None:
+        """
+        Завершает с ReceiptTimeout транзакции, у которых истек срок ожидания
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for tx_hash, waiters in list(self._pending.items()):
+                for future, deadline in list(waiters.items()):
+                    if deadline <= now:
+                        del waiters[future]
+                        expired.append((tx_hash, future))
+                if not waiters:
+                    del self._pending[tx_hash]
+                    self._unchecked.discard(tx_hash)
+
+        for tx_hash, future in expired:
+            if not future.done():
+                future.set_exception(ReceiptTimeout(f"Транзакция {tx_hash} не подтверждена вовремя"))
+
+# Общий для процесса экземпляр
+_tracker_lock = threading.Lock()
+_tracker: Optional[ReceiptTracker] = None
+
+def get_receipt_tracker() -> ReceiptTracker:
+    """
+    Возвращает общий для процесса ReceiptTracker
+
+    Returns:
+        ReceiptTracker: Трекер подтверждений
+    """
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = ReceiptTracker()
+        return _tracker
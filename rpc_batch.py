@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import logging
+import threading
+from typing import List, Dict, Any, Tuple, Union
+import requests
+from dotenv import load_dotenv
+
+from rpc_provider import post_batch
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+DEFAULT_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "100"))
+
+# Размер batch, который провайдер фактически принимает. Уменьшается,
+# если провайдер отклоняет слишком большие batch-запросы
+_batch_size_lock = threading.Lock()
+_effective_batch_size = DEFAULT_BATCH_SIZE
+
+class BatchRejectedError(Exception):
+    """Провайдер отклонил batch целиком (слишком большой или не поддерживается)"""
+
+def _get_batch_size() -> int:
+    with _batch_size_lock:
+        return _effective_batch_size
+
+def _shrink_batch_size(rejected_size: int) -> int:
+    """
+    Уменьшает размер batch вдвое после отказа провайдера
+
+    Args:
+        rejected_size (int): Размер batch, который был отклонен
+
+    Returns:
+        int: Новый размер batch
+    """
+    global _effective_batch_size
+    with _batch_size_lock:
+        _effective_batch_size = max(1, min(_effective_batch_size, rejected_size // 2))
+        return _effective_batch_size
+
+def _execute_chunk(calls: List[Tuple[str, list]]) -> List[Dict[str, Any]]:
+    """
+    Выполняет один batch-запрос и возвращает ответы в порядке запросов
+
+    Args:
+        calls (List[Tuple[str, list]]): Список пар (метод, параметры)
+
+    Returns:
+        List[Dict[str, Any]]: JSON-RPC ответы в порядке запросов
+
+    Raises:
+        BatchRejectedError: Если провайдер отклонил batch из-за размера
+        requests.HTTPError: Если провайдер вернул другой ошибочный HTTP-статус
+        ValueError: Если провайдер вернул одну ошибку вместо ответов
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+
+    try:
+        response = post_batch(payload)
+    except requests.HTTPError as e:
+        # Размер batch виноват только в 413 Payload Too Large; 5xx и 429 уже
+        # прошли через переключение endpoint в rpc_provider, уменьшать batch незачем
+        if e.response is not None and e.response.status_code == 413:
+            raise BatchRejectedError(str(e))
+        raise
+
+    # Некоторые провайдеры вместо списка возвращают один объект с ошибкой
+    if not isinstance(response, list):
+        error = response.get("error") if isinstance(response, dict) else None
+        if _is_batch_limit_error(error):
+            raise BatchRejectedError(f"Превышен лимит размера batch: {error}")
+        raise ValueError(f"Неожиданный ответ на batch-запрос: {response}")
+
+    by_id = {item.get("id"): item for item in response if isinstance(item, dict)}
+
+    # Часть провайдеров принимает batch, но отвечает только на первые N запросов
+    # или возвращает ошибку лимита на лишние
+    if any(i not in by_id for i in range(len(calls))):
+        raise BatchRejectedError(f"Провайдер ответил на {len(by_id)} из {len(calls)} запросов")
+    if len(calls) > 1 and any(_is_batch_limit_error(item.get("error")) for item in by_id.values()):
+        raise BatchRejectedError("Превышен лимит размера batch")
+
+    return [by_id[i] for i in range(len(calls))]
+
+def _is_batch_limit_error(error: Any) -> bool:
+    # Код -32005 ("limit exceeded") провайдеры отдают и при лимите частоты,
+    # поэтому о размере batch судим только по тексту ошибки
+    if not isinstance(error, dict):
+        return False
+    return "batch" in str(error.get("message", "")).lower()
+
+def batch_call(calls: List[Tuple[str, list]], batch_size: int = None) -> List[Any]:
+    """
+    Выполняет произвольные JSON-RPC вызовы пачками по batch_size.
+    Если провайдер отклоняет batch из-за размера (413 или ошибка лимита
+    batch), размер уменьшается вдвое и запомненный размер используется
+    для следующих вызовов.
+
+    Args:
+        calls (List[Tuple[str, list]]): Список пар (метод, параметры)
+        batch_size (int): Максимальный размер batch (по умолчанию RPC_BATCH_SIZE)
+
+    Returns:
+        List[Any]: Поле result каждого ответа в порядке запросов
+
+    Raises:
+        ValueError: Если один из вызовов вернул ошибку
+        requests.RequestException: Если не ответил ни один endpoint
+    """
+    logger = logging.getLogger("main")
+
+    results: List[Any] = [None] * len(calls)
+    pending = list(range(len(calls)))
+    size = min(batch_size or DEFAULT_BATCH_SIZE, _get_batch_size())
+
+    while pending:
+        chunk = pending[:size]
+        try:
+            responses = _execute_chunk([calls[i] for i in chunk])
+        except BatchRejectedError as e:
+            if size == 1:
+                raise ValueError(f"Провайдер отклонил JSON-RPC запрос: {str(e)}")
+            size = _shrink_batch_size(len(chunk))
+            logger.warning(f"Провайдер отклонил batch из {len(chunk)} запросов, уменьшаем до {size}")
+            continue
+
+        for index, response in zip(chunk, responses):
+            if "error" in response:
+                method, params = calls[index]
+                raise ValueError(f"Ошибка {method}({params}): {response['error']}")
+            results[index] = response.get("result")
+
+        pending = pending[len(chunk):]
+
+    return results
+
+def get_balances(addresses: List[str], block_identifier: Union[str, int] = "latest",
+                 batch_size: int = None) -> Dict[str, int]:
+    """
+    Получает балансы ETH для списка адресов через eth_getBalance в batch-режиме
+
+    Args:
+        addresses (List[str]): Список адресов
+        block_identifier (Union[str, int]): Блок, на котором читается баланс
+        batch_size (int): Максимальный размер batch
+
+    Returns:
+        Dict[str, int]: Словарь {адрес: баланс в wei}
+    """
+    block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+    calls = [("eth_getBalance", [address, block]) for address in addresses]
+    results = batch_call(calls, batch_size)
+    return {address: int(result, 16) for address, result in zip(addresses, results)}
+
+def get_transaction_counts(addresses: List[str], block_identifier: Union[str, int] = "latest",
+                           batch_size: int = None) -> Dict[str, int]:
+    """
+    Получает nonce для списка адресов через eth_getTransactionCount в batch-режиме
+
+    Args:
+        addresses (List[str]): Список адресов
+        block_identifier (Union[str, int]): Блок ("latest", "pending" или номер)
+        batch_size (int): Максимальный размер batch
+
+    Returns:
+        Dict[str, int]: Словарь {адрес: nonce}
+    """
+    block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+    calls = [("eth_getTransactionCount", [address, block]) for address in addresses]
+    results = batch_call(calls, batch_size)
+    return {address: int(result, 16) for address, result in zip(addresses, results)}
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+import threading
+from typing import List, Optional
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+DEFAULT_RPC_URL = "https://eth.llamarpc.com"
+# Вес нового замера в скользящем среднем (EWMA) задержки и доли ошибок
+EWMA_ALPHA = float(os.getenv("RPC_EWMA_ALPHA", "0.3"))
+# Начальная оценка задержки нового endpoint, секунд
+INITIAL_LATENCY = 0.5
+# Во сколько раз доля ошибок 100% ухудшает оценку endpoint
+ERROR_PENALTY = 10
+# Endpoint исключается после стольких ошибок подряд...
+EJECT_AFTER_FAILURES = int(os.getenv("RPC_EJECT_FAILURES", "3"))
+# ...или когда скользящая доля ошибок превышает порог. Доля учитывается только
+# после EJECT_MIN_SAMPLES запросов: иначе при EWMA_ALPHA=0.3 ее поднимают выше
+# 0.5 уже две ошибки, раньше правила EJECT_AFTER_FAILURES
+EJECT_ERROR_RATE = float(os.getenv("RPC_EJECT_ERROR_RATE", "0.5"))
+EJECT_MIN_SAMPLES = int(os.getenv("RPC_EJECT_MIN_SAMPLES", "10"))
+# На сколько секунд исключается endpoint (удваивается при повторных исключениях)
+EJECT_SECONDS = float(os.getenv("RPC_EJECT_SECONDS", "30"))
+MAX_EJECT_SECONDS = 600
+
+def get_rpc_urls() -> List[str]:
+    """
+    Возвращает список RPC URL: ETH_RPC_URLS через запятую, иначе один
+    RPC_URL / ETH_RPC_URL или дефолтный
+
+    Returns:
+        List[str]: RPC URL в порядке приоритета
+    """
+    urls = [url.strip() for url in os.getenv("ETH_RPC_URLS", "").split(",") if url.strip()]
+    if urls:
+        return urls
+    return [os.getenv("RPC_URL") or os.getenv("ETH_RPC_URL", DEFAULT_RPC_URL)]
+
+class Endpoint:
+    """
+    Состояние одного RPC endpoint: скользящие задержка и доля ошибок,
+    количество запросов с начала работы (или возврата после исключения),
+    счетчик ошибок подряд и время, до которого он исключен
+    """
+
+    __slots__ = ("url", "latency", "error_rate", "samples", "failures", "ejections", "ejected_until")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = INITIAL_LATENCY
+        self.error_rate = 0.0
+        self.samples = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def score(self) -> float:
+        """
+        Оценка endpoint: чем меньше, тем лучше
+        """
+        return self.latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.url}, latency={self.latency:.3f}s, errors={self.error_rate:.0%})"
+
+class EndpointPool:
+    """
+    Набор RPC endpoint с выбором лучшего для каждого запроса. После каждого
+    запроса обновляются скользящие задержка и доля ошибок; endpoint с
+    несколькими ошибками подряд исключается на время и затем возвращается
+    в работу с начальной оценкой ошибок.
+    """
+
+    def __init__(self, urls: Optional[List[str]] = None):
+        self.endpoints = [Endpoint(url) for url in (urls or get_rpc_urls())]
+        self._lock = threading.Lock()
+
+    def choose(self, exclude: Optional[List[Endpoint]] = None) -> Endpoint:
+        """
+        Выбирает endpoint с лучшей оценкой среди работающих
+
+        Args:
+            exclude (Optional[List[Endpoint]]): Endpoint, уже не ответившие на этот запрос
+
+        Returns:
+            Endpoint: Лучший доступный endpoint. Если исключены все, возвращается
+                      тот, что вернется в работу раньше остальных
+        """
+        logger = logging.getLogger("main")
+        exclude = exclude or []
+        now = time.monotonic()
+
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude] or self.endpoints
+            active = []
+            for endpoint in candidates:
+                if endpoint.ejected_until and endpoint.ejected_until <= now:
+                    # Возвращаем endpoint в работу; старые ошибки не должны сразу исключить его снова
+                    endpoint.ejected_until = 0.0
+                    endpoint.failures = 0
+                    endpoint.samples = 0
+                    endpoint.error_rate = EJECT_ERROR_RATE / 2
+                    logger.info(f"RPC {endpoint.url} снова используется")
+                if not endpoint.ejected_until:
+                    active.append(endpoint)
+
+            if active:
+                return min(active, key=lambda endpoint: endpoint.score())
+            return min(candidates, key=lambda endpoint: endpoint.ejected_until)
+
+    def report(self, endpoint: Endpoint, latency: float, ok: bool) -> None:
+        """
+        Учитывает результат запроса к endpoint
+
+        Args:
+            endpoint (Endpoint): Endpoint, который обслужил запрос
+            latency (float): Время запроса в секундах
+            ok (bool): False для сетевой ошибки, таймаута, 429 или 5xx
+        """
+        logger = logging.getLogger("main")
+
+        with self._lock:
+            endpoint.latency += EWMA_ALPHA * (latency - endpoint.latency)
+            endpoint.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - endpoint.error_rate)
+            endpoint.samples += 1
+            if ok:
+                endpoint.failures = 0
+                endpoint.ejections = 0
+                return
+
+            endpoint.failures += 1
+            if endpoint.ejected_until or len(self.endpoints) == 1:
+                return
+            if endpoint.failures >= EJECT_AFTER_FAILURES \
+                    or (endpoint.samples >= EJECT_MIN_SAMPLES and endpoint.error_rate > EJECT_ERROR_RATE):
+                seconds = min(EJECT_SECONDS * 2 ** endpoint.ejections, MAX_EJECT_SECONDS)
+                endpoint.ejections += 1
+                endpoint.ejected_until = time.monotonic() + seconds
+                logger.warning(f"RPC {endpoint.url} исключен на {seconds:.0f} с: "
+                               f"{endpoint.failures} ошибок подряд, доля ошибок {endpoint.error_rate:.0%}")
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+# Общий для процесса экземпляр
+_pool_lock = threading.Lock()
+_pool: Optional[EndpointPool] = None
+
+def get_endpoint_pool() -> EndpointPool:
+    """
+    Возвращает общий для процесса набор RPC endpoint
+
+    Returns:
+        EndpointPool: Набор endpoint
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EndpointPool()
+        return _pool
+
+def reset_endpoint_pool() -> None:
+    """
+    Сбрасывает набор endpoint (например, после смены ETH_RPC_URLS)
+    """
+    global _pool
+    with _pool_lock:
+        _pool = None
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from utils import TokenBucket
+from deadlines import remaining, DeadlineExceeded
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Классы методов с отдельными лимитами
+METHOD_READ = "read"
+METHOD_CALL = "call"
+METHOD_SEND = "send"
+
+_CALL_METHODS = {"eth_call", "eth_estimateGas"}
+_SEND_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction"}
+
+# Константы
+# Лимиты запросов в секунду к одному endpoint по классам методов (0 - без ограничения)
+READ_RATE_LIMIT = float(os.getenv("RPC_READ_RATE_LIMIT", "25"))
+CALL_RATE_LIMIT = float(os.getenv("RPC_CALL_RATE_LIMIT", "25"))
+SEND_RATE_LIMIT = float(os.getenv("RPC_SEND_RATE_LIMIT", "10"))
+# Пауза после 429, если провайдер не прислал Retry-After
+DEFAULT_RETRY_AFTER = 1.0
+# Сколько раз повторять запрос, если все endpoint ответили 429
+MAX_RATE_LIMIT_RETRIES = int(os.getenv("RPC_MAX_RATE_LIMIT_RETRIES", "10"))
+
+def method_class(method: str) -> str:
+    """
+    Определяет класс JSON-RPC метода для лимитов
+
+    Args:
+        method (str): Имя метода
+
+    Returns:
+        str: METHOD_SEND, METHOD_CALL или METHOD_READ
+    """
+    if method in _SEND_METHODS:
+        return METHOD_SEND
+    if method in _CALL_METHODS:
+        return METHOD_CALL
+    return METHOD_READ
+
+class RpcRateLimiter:
+    """
+    Общий для процесса ограничитель частоты RPC-запросов: отдельный
+    token bucket на каждую пару (endpoint, класс методов). Запрос ждет
+    свободных токенов вместо того, чтобы получить 429; запрос из batch
+    расходует токен своего класса. После 429 выдача токенов endpoint
+    приостанавливается на время из Retry-After.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, float]] = None):
+        self.limits = limits or {
+            METHOD_READ: READ_RATE_LIMIT,
+            METHOD_CALL: CALL_RATE_LIMIT,
+            METHOD_SEND: SEND_RATE_LIMIT
+        }
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def _bucket(self, url: str, klass: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get((url, klass))
+            if bucket is None:
+                bucket = self._buckets[(url, klass)] = TokenBucket(self.limits.get(klass, 0))
+            return bucket
+
+    def _demand(self, url: str, methods: List[str]) -> List[Tuple[TokenBucket, int]]:
+        return [(self._bucket(url, klass), count) for klass, count in Counter(map(method_class, methods)).items()]
+
+    @staticmethod
+    def _take(bucket: TokenBucket, count: int) -> Tuple[int, float]:
+        """
+        Пытается забрать до capacity токенов из нужных count
+
+        Returns:
+            Tuple[int, float]: (сколько токенов получено, сколько ждать до следующей попытки)
+        """
+        piece = count if bucket.rate <= 0 else min(count, int(bucket.capacity) or 1)
+        wait = bucket.try_acquire(piece)
+        if wait > 0:
+            left = remaining()
+            if left is not None and wait >= left:
+                raise DeadlineExceeded(f"Лимит RPC-запросов не позволяет уложиться в бюджет времени ({wait:.1f} с)")
+            return 0, wait
+        return piece, 0.0
+
+    def acquire(self, url: str, methods: List[str]) -> float:
+        """
+        Ждет, пока лимиты endpoint позволят выполнить запрос
+
+        Args:
+            url (str): URL endpoint
+            methods (List[str]): Методы запроса (несколько - для batch)
+
+        Returns:
+            float: Время ожидания в секундах
+
+        Raises:
+            DeadlineExceeded: Если ожидание не укладывается в бюджет времени
+        """
+        waited = 0.0
+        for bucket, count in self._demand(url, methods):
+            while count > 0:
+                taken, wait = self._take(bucket, count)
+                count -= taken
+                if wait:
+                    time.sleep(wait)
+                    waited += wait
+        return waited
+
+    async def acquire_async(self, url: str, methods: List[str]) -> float:
+        """
+        Асинхронный вариант acquire(): ожидание не блокирует event loop
+        """
+        waited = 0.0
+        for bucket, count in self._demand(url, methods):
+            while count > 0:
+                taken, wait = self._take(bucket, count)
+                count -= taken
+                if wait:
+                    await asyncio.sleep(wait)
+                    waited += wait
+        return waited
+
+    def throttle(self, url: str, seconds: float) -> None:
+        """
+        Приостанавливает запросы всех классов к endpoint (после ответа 429)
+
+        Args:
+            url (str): URL endpoint
+            seconds (float): Длительность паузы
+        """
+        logger = logging.getLogger("main")
+        logger.warning(f"RPC {url} ограничил частоту запросов (429), пауза {seconds:.1f} с")
+        for klass in self.limits:
+            self._bucket(url, klass).pause(seconds)
+
+# Общий для процесса экземпляр
+_limiter_lock = threading.Lock()
+_limiter: Optional[RpcRateLimiter] = None
+
+def get_rpc_limiter() -> RpcRateLimiter:
+    """
+    Возвращает общий для процесса ограничитель частоты RPC-запросов
+
+    Returns:
+        RpcRateLimiter: Ограничитель
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RpcRateLimiter()
+        return _limiter
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, AsyncIterator
+import aiohttp
+import requests
+from urllib3.exceptions import NewConnectionError
+import asyncio
+from web3 import Web3, HTTPProvider, AsyncHTTPProvider
+from web3.eth import AsyncEth
+from dotenv import load_dotenv
+
+from utils import create_http_session, parse_retry_after
+from deadlines import transport_timeout, is_expired, DeadlineExceeded
+from rpc_endpoints import get_rpc_urls, get_endpoint_pool, reset_endpoint_pool
+from rpc_limiter import get_rpc_limiter, method_class, METHOD_SEND, DEFAULT_RETRY_AFTER, MAX_RATE_LIMIT_RETRIES
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+RPC_TIMEOUT = 30
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "32"))
+_HEADERS = {"Content-Type": "application/json"}
+
+# Общий для всего процесса объект Web3 и его состояние
+_lock = threading.Lock()
+_web3: Optional[Web3] = None
+_session: Optional[requests.Session] = None
+_healthy = False
+
+def get_rpc_url() -> str:
+    """
+    Возвращает основной RPC URL (первый из ETH_RPC_URLS, иначе RPC_URL / ETH_RPC_URL или дефолтный)
+
+    Returns:
+        str: RPC URL
+    """
+    return get_rpc_urls()[0]
+
+def _get_session() -> requests.Session:
+    """
+    Возвращает общую для процесса HTTP-сессию, создавая ее при первом вызове
+    """
+    global _session
+    if _session is None:
+        _session = create_http_session(RPC_POOL_SIZE)
+    return _session
+
+def _is_endpoint_failure(status: int) -> bool:
+    # 429 и 5xx говорят о состоянии endpoint, остальные 4xx - о самом запросе
+    return status == 429 or status >= 500
+
+def _is_connection_refused(error: Exception) -> bool:
+    # requests.ConnectionError оборачивает MaxRetryError, а тот - причину ошибки
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+
+def _is_retryable(methods: List[str]) -> bool:
+    # Отправку транзакции нельзя повторять на другом endpoint после таймаута:
+    # первый мог ее принять. Повтор допустим, только если запрос точно не дошел
+    return all(method_class(method) != METHOD_SEND for method in methods)
+
+def _post(data: bytes, methods: List[str]) -> requests.Response:
+    """
+    Отправляет JSON-RPC запрос лучшему endpoint из общего набора. Перед
+    отправкой запрос ждет токенов в лимитах endpoint (rpc_limiter). При сетевой
+    ошибке, таймауте, 429 или 5xx endpoint получает штраф, и запрос повторяется
+    на следующем endpoint; если 429 ответили все, запрос ждет окончания паузы
+    и повторяется. Таймаут не превышает остаток срока из deadlines.
+
+    Args:
+        data (bytes): Тело запроса
+        methods (List[str]): Методы запроса (несколько - для batch)
+
+    Returns:
+        requests.Response: Ответ endpoint
+
+    Raises:
+        requests.RequestException: Если не ответил ни один endpoint
+        DeadlineExceeded: Если истек бюджет времени
+    """
+    logger = logging.getLogger("main")
+    pool = get_endpoint_pool()
+    limiter = get_rpc_limiter()
+    session = _get_session()
+    retryable = _is_retryable(methods)
+    tried = []
+    rate_limited = 0
+
+    while True:
+        endpoint = pool.choose(exclude=tried)
+        limiter.acquire(endpoint.url, methods)
+        started = time.monotonic()
+        try:
+            response = session.post(endpoint.url, data=data, headers=_HEADERS, timeout=transport_timeout(RPC_TIMEOUT))
+            if _is_endpoint_failure(response.status_code):
+                response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            pool.report(endpoint, time.monotonic() - started, ok=False)
+            tried.append(endpoint)
+            if is_expired():
+                raise DeadlineExceeded(f"Истек бюджет времени на запрос к {endpoint.url}") from e
+            throttled = isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code == 429
+            if throttled:
+                rate_limited += 1
+                limiter.throttle(endpoint.url, parse_retry_after(e.response.headers.get("Retry-After"), DEFAULT_RETRY_AFTER))
+            # Запрос, который точно не был обработан, можно повторить всегда
+            not_delivered = throttled or isinstance(e, requests.ConnectTimeout) or _is_connection_refused(e)
+            if not (retryable or not_delivered):
+                raise
+            if len(tried) >= len(pool):
+                # 429 от всех endpoint - ждем окончания паузы вместо ошибки
+                if not throttled or rate_limited > MAX_RATE_LIMIT_RETRIES:
+                    raise
+                tried = []
+            logger.warning(f"RPC {endpoint.url} не ответил: {str(e)}. Пробуем другой endpoint")
+            continue
+
+        pool.report(endpoint, time.monotonic() - started, ok=True)
+        response.raise_for_status()
+        return response
+
+async def _async_post(session: aiohttp.ClientSession, data: bytes, methods: List[str]) -> bytes:
+    """
+    Асинхронный вариант _post() для aiohttp-сессии
+
+    Returns:
+        bytes: Тело ответа
+    """
+    logger = logging.getLogger("main")
+    pool = get_endpoint_pool()
+    limiter = get_rpc_limiter()
+    retryable = _is_retryable(methods)
+    tried = []
+    rate_limited = 0
+
+    while True:
+        endpoint = pool.choose(exclude=tried)
+        await limiter.acquire_async(endpoint.url, methods)
+        started = time.monotonic()
+        try:
+            timeout = aiohttp.ClientTimeout(total=transport_timeout(RPC_TIMEOUT))
+            async with session.post(endpoint.url, data=data, headers=_HEADERS, timeout=timeout) as response:
+                if _is_endpoint_failure(response.status):
+                    response.raise_for_status()
+                status = response.status
+                content = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            pool.report(endpoint, time.monotonic() - started, ok=False)
+            tried.append(endpoint)
+            if is_expired():
+                raise DeadlineExceeded(f"Истек бюджет времени на запрос к {endpoint.url}") from e
+            throttled = isinstance(e, aiohttp.ClientResponseError) and e.status == 429
+            if throttled:
+                rate_limited += 1
+                retry_after = e.headers.get("Retry-After") if e.headers else None
+                limiter.throttle(endpoint.url, parse_retry_after(retry_after, DEFAULT_RETRY_AFTER))
+            not_delivered = throttled or isinstance(e, aiohttp.ClientConnectorError)
+            if not (retryable or not_delivered):
+                raise
+            if len(tried) >= len(pool):
+                if not throttled or rate_limited > MAX_RATE_LIMIT_RETRIES:
+                    raise
+                tried = []
+            logger.warning(f"RPC {endpoint.url} не ответил: {str(e) or type(e).__name__}. Пробуем другой endpoint")
+            continue
+
+        pool.report(endpoint, time.monotonic() - started, ok=True)
+        if status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=status, message=content[:200].decode(errors="replace"))
+        return content
+
+class FailoverHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider, который отправляет каждый запрос лучшему endpoint из
+    ETH_RPC_URLS (см. rpc_endpoints) с таймаутом из остатка срока deadlines
+    """
+
+    def __init__(self):
+        super().__init__(get_rpc_url())
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        response = _post(request_data, [method])
+        return self.decode_rpc_response(response.content)
+
+class FailoverAsyncHTTPProvider(AsyncHTTPProvider):
+    """
+    Асинхронный вариант FailoverHTTPProvider поверх aiohttp-сессии
+    """
+
+    def __init__(self, session: aiohttp.ClientSession):
+        super().__init__(get_rpc_url())
+        self._http_session = session
+
+    async def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        content = await _async_post(self._http_session, request_data, [method])
+        return self.decode_rpc_response(content)
+
+def _health_middleware(make_request, web3):
+    """
+    Middleware, помечающее провайдер как нездоровый при сетевой ошибке,
+    чтобы следующий вызов get_web3_provider() заново проверил подключение
+    """
+    def middleware(method, params):
+        global _healthy
+        try:
+            return make_request(method, params)
+        except (requests.ConnectionError, requests.Timeout):
+            _healthy = False
+            raise
+    return middleware
+
+def get_web3_provider() -> Web3:
+    """
+    Возвращает общий для процесса объект Web3 с пулом HTTP-соединений.
+    Проверка подключения выполняется один раз и повторяется только
+    после сетевой ошибки.
+
+    Returns:
+        Web3: Объект Web3 с подключенным провайдером
+    """
+    global _web3, _healthy
+    logger = logging.getLogger("main")
+
+    with _lock:
+        if _web3 is None:
+            _get_session()
+            _web3 = Web3(FailoverHTTPProvider())
+            _web3.middleware_onion.add(_health_middleware, "health_check")
+            logger.debug(f"Создан общий Web3-провайдер для {', '.join(get_rpc_urls())}")
+
+        if not _healthy:
+            # Проверяем подключение
+            if not _web3.is_connected():
+                raise ConnectionError(f"Не удалось подключиться ни к одному RPC провайдеру: {', '.join(get_rpc_urls())}")
+            _healthy = True
+
+        return _web3
+
+@asynccontextmanager
+async def async_web3_provider(pool_size: int = RPC_POOL_SIZE) -> AsyncIterator[Web3]:
+    """
+    Создает асинхронный объект Web3 с собственным пулом aiohttp-соединений.
+    Сессия привязана к текущему event loop и закрывается при выходе из контекста.
+
+    Args:
+        pool_size (int): Максимальное количество одновременных соединений
+
+    Yields:
+        Web3: Объект Web3 с AsyncHTTPProvider и модулем AsyncEth
+    """
+    timeout = aiohttp.ClientTimeout(total=RPC_TIMEOUT)
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size), timeout=timeout)
+
+    try:
+        provider = FailoverAsyncHTTPProvider(session)
+        web3 = Web3(provider, modules={"eth": (AsyncEth,)}, middlewares=[])
+
+        # Проверяем подключение
+        if not await provider.is_connected():
+            raise ConnectionError(f"Не удалось подключиться ни к одному RPC провайдеру: {', '.join(get_rpc_urls())}")
+
+        yield web3
+    finally:
+        await session.close()
+
+def reset_web3_provider() -> None:
+    """
+    Сбрасывает общий провайдер и состояние endpoint (например, после смены RPC URL)
+    """
+    global _web3, _healthy
+    with _lock:
+        _web3 = None
+        _healthy = False
+    reset_endpoint_pool()
+
+def post_batch(payload: List[Dict[str, Any]]) -> Any:
+    """
+    Отправляет JSON-RPC batch (список запросов) одним HTTP-запросом
+    через общую сессию
+
+    Args:
+        payload (List[Dict[str, Any]]): Список JSON-RPC запросов
+
+    Returns:
+        Any: Декодированный JSON ответа (обычно список ответов)
+
+    Raises:
+        requests.HTTPError: Если провайдер вернул ошибочный HTTP-статус
+    """
+    with _lock:
+        _get_session()
+
+    return _post(json.dumps(payload).encode(), [request["method"] for request in payload]).json()
@@ -3,22 +3,34 @@
 
 import os
 import logging
-from typing import Optional
+from typing import Optional, Union
 from web3 import Web3
 from web3.exceptions import ContractLogicError
 from eth_account import Account
 from dotenv import load_dotenv
-import signal
 import time
 from prettytable import PrettyTable
 
+from rpc_provider import get_web3_provider
+from wallet_loader import Wallet, local_account
+from gas_oracle import estimate_fees
+from nonce_manager import send_with_nonce
+from tx_replacer import get_tx_replacer
+from gas_estimates import get_gas_estimate_cache, gas_key, GAS_LIMIT_MULTIPLIER
+from deadlines import deadline, without_deadline, with_time_budget
+from journal import get_journal, STAGE_SEND, STATUS_PENDING, STATUS_DONE, STATUS_FAILED
+
 # Загружаем переменные окружения
 load_dotenv()
 
 # Константы
-TOKEN_ADDRESS = "0x3f80b1c54ae920be41a77f8b902259d48cf24ccf"
+TOKEN_ADDRESS = os.getenv("TOKEN_ADDRESS", "0x3f80b1c54ae920be41a77f8b902259d48cf24ccf")
 DEFAULT_GAS_LIMIT = 100000
 DEFAULT_GAS_PRICE_GWEI = 30
+# Максимальное время отдельных вызовов, секунд
+DECIMALS_TIMEOUT = 15
+BALANCE_TIMEOUT = 20
+ESTIMATE_GAS_TIMEOUT = 15
 
 # ABI для функции transfer из ERC20 контракта
 TOKEN_ABI = [
@@ -54,39 +66,25 @@ TOKEN_ABI = [
     }
 ]
 
-def get_web3_provider() -> Web3:
-    """
-    Получает объект Web3 на основе RPC URL из .env файла или использует дефолтный
-    
-    Returns:
-        Web3: Объект Web3 с подключенным провайдером
-    """
-    # Получаем RPC URL из переменных окружения или используем дефолтный
-    rpc_url = os.getenv("ETH_RPC_URL", "https://eth.llamarpc.com")
-    
-    # Создаем Web3 объект с таймаутом
-    web3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 30}))
-    
-    # Проверяем подключение
-    if not web3.is_connected():
-        raise ConnectionError(f"Не удалось подключиться к RPC провайдеру: {rpc_url}")
-        
-    return web3
-
+@with_time_budget()
 def send_tokens_to_exchange(
-    private_key: str,
-    exchange_address: str,
+    private_key: Union[str, Wallet],
+    exchange_address: Optional[str],
     token_address: str = TOKEN_ADDRESS,
-    amount: float = None
+    amount: float = None,
+    nonce: Optional[int] = None,
+    fee_speed: Optional[str] = None
 ) -> Optional[str]:
     """
     Отправляет токены на биржевой адрес
     
     Args:
-        private_key (str): Приватный ключ отправителя
-        exchange_address (str): Адрес биржи для отправки
+        private_key (Union[str, Wallet]): Приватный ключ отправителя или кошелек из wallet_loader
+        exchange_address (Optional[str]): Адрес биржи для отправки (None - адрес биржи кошелька)
         token_address (str): Адрес токена для отправки
         amount (float): Количество токенов для отправки, None для отправки всего баланса
+        nonce (Optional[int]): Явно заданный nonce (по умолчанию выдается локальным NonceManager)
+        fee_speed (Optional[str]): Скорость включения "slow", "normal" или "fast" (по умолчанию FEE_SPEED)
         
     Returns:
         Optional[str]: Хеш транзакции или None в случае ошибки
@@ -94,17 +92,19 @@ def send_tokens_to_exchange(
     logger = logging.getLogger("sender")
     
     try:
-        # Проверяем формат приватного ключа
-        if private_key.startswith("0x"):
-            private_key = private_key[2:]
-        
         logger.info("Инициализация Web3-провайдера...")    
         web3 = get_web3_provider()
         
-        # Создаем аккаунт из приватного ключа
+        # Для Wallet аккаунт и checksum-адреса уже вычислены при загрузке
         logger.info("Создание объекта аккаунта...")
-        account_obj = Account.from_key(private_key)
+        account_obj = local_account(private_key)
         address = account_obj.address
+        if isinstance(private_key, Wallet) and (exchange_address is None or exchange_address == private_key.exchange_address):
+            exchange_address = private_key.exchange_address
+        elif exchange_address:
+            exchange_address = web3.to_checksum_address(exchange_address)
+        if not exchange_address:
+            raise ValueError(f"Не указан адрес биржи для {address}")
         
         # Выводим информацию об отправке в виде таблицы
         table = PrettyTable()
@@ -127,17 +127,9 @@ def send_tokens_to_exchange(
         # Получаем количество десятичных знаков токена
         logger.info("Получение decimals токена...")
         try:
-            # Используем таймаут для вызова decimals()
-            def timeout_handler(signum, frame):
-                raise TimeoutError("Timeout in decimals call")
-                
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(15)
-            
-            decimals = token_contract.functions.decimals().call()
-            
-            # Отключаем таймаут
-            signal.alarm(0)
+            # Ограничиваем вызов decimals(); срок работает в любом потоке
+            with deadline(DECIMALS_TIMEOUT):
+                decimals = token_contract.functions.decimals().call()
             
             logger.info(f"Decimals: {decimals}")
         except TimeoutError:
@@ -151,18 +143,10 @@ def send_tokens_to_exchange(
         # Проверяем баланс токена
         logger.info(f"Проверка баланса токенов для {address}...")
         try:
-            # Используем таймаут для вызова balanceOf()
-            def timeout_handler(signum, frame):
-                raise TimeoutError("Timeout in balanceOf call")
-                
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(20)  # Даём больше времени на проверку баланса
-            
+            # Даём больше времени на проверку баланса
             logger.info("Выполняется запрос balanceOf...")
-            balance_raw = token_contract.functions.balanceOf(address).call()
-            
-            # Отключаем таймаут
-            signal.alarm(0)
+            with deadline(BALANCE_TIMEOUT):
+                balance_raw = token_contract.functions.balanceOf(address).call()
             
             balance = balance_raw / (10 ** decimals)
             logger.info(f"Баланс токенов: {balance}")
@@ -185,88 +169,95 @@ def send_tokens_to_exchange(
         if amount > balance:
             logger.warning(f"Сумма для отправки больше баланса, отправляем весь баланс")
             amount = balance
-            
+        
         # Конвертируем сумму в wei
         amount_wei = int(amount * (10 ** decimals))
         logger.info(f"Сумма для отправки: {amount} токенов ({amount_wei} wei)")
         
-        # Получаем nonce
-        logger.info(f"Получение nonce для {address}...")
-        nonce = web3.eth.get_transaction_count(address)
-        logger.info(f"Nonce: {nonce}")
-        
-        # EIP-1559: Получаем базовый fee из последнего блока
+        # EIP-1559: priority fee по eth_feeHistory, maxFee с запасом на рост base fee
         logger.info("Получение цены газа...")
-        try:
-            latest_block = web3.eth.get_block('latest')
-            base_fee = latest_block['baseFeePerGas']
-            logger.info(f"Базовая цена газа: {web3.from_wei(base_fee, 'gwei'):.2f} Gwei")
-        except Exception as e:
-            logger.error(f"Ошибка при получении цены газа: {str(e)}")
-            # Устанавливаем значение по умолчанию
-            base_fee = web3.to_wei(30, 'gwei')
-            logger.info(f"Используем цену газа по умолчанию: 30 Gwei")
+        fees = estimate_fees(fee_speed)
+        base_fee = fees["base_fee_wei"]
+        priority_fee = fees["priority_fee_wei"]
+        max_fee = fees["max_fee_wei"]
+        logger.info(f"Базовая цена газа: {web3.from_wei(base_fee, 'gwei'):.2f} Gwei, " +
+                   f"перцентиль priority fee: {fees['percentile']}")
         
-        # Устанавливаем минимальную приоритетную комиссию (почти нулевую)
-        priority_fee = web3.to_wei(0.1, 'gwei')
+        # Пытаемся оценить gasLimit для транзакции. Перевод на адрес с нулевым
+        # балансом дороже, поэтому оценки хранятся отдельно по реальному балансу
+        # получателя; если его не удалось узнать, кэш оценок не используется
+        gas_limit = DEFAULT_GAS_LIMIT
+        gas_estimates = get_gas_estimate_cache()
+        recipient_is_new = gas_estimates.is_new_recipient(exchange_address)
+        if recipient_is_new is None:
+            try:
+                with deadline(BALANCE_TIMEOUT):
+                    recipient_balance = token_contract.functions.balanceOf(exchange_address).call()
+                gas_estimates.set_recipient_balances({exchange_address: recipient_balance})
+                recipient_is_new = recipient_balance == 0
+            except Exception as e:
+                logger.warning(f"Не удалось проверить баланс получателя {exchange_address}: {str(e)}")
+        transfer_gas_key = gas_key(token_address, "transfer", recipient_is_new=recipient_is_new) \
+            if recipient_is_new is not None else None
+        cached_estimate = gas_estimates.get(transfer_gas_key) if transfer_gas_key else None
+        if cached_estimate is not None:
+            gas_limit = int(cached_estimate * GAS_LIMIT_MULTIPLIER)
+            logger.info(f"gasLimit по сохраненным оценкам: {gas_limit}")
+        else:
+            logger.info("Оценка gasLimit для транзакции...")
+            try:
+                # Ограничиваем estimate_gas, чтобы избежать зависания
+                with deadline(ESTIMATE_GAS_TIMEOUT):
+                    estimated = token_contract.functions.transfer(
+                        exchange_address,
+                        amount_wei
+                    ).estimate_gas({
+                        'from': address
+                    })
+                
+                if transfer_gas_key:
+                    gas_estimates.add(transfer_gas_key, estimated)
+                # Добавляем небольшой запас для надежности
+                gas_limit = int(estimated * GAS_LIMIT_MULTIPLIER)
+                logger.info(f"Рассчитанный gasLimit: {gas_limit}")
+            except TimeoutError:
+                logger.warning("Таймаут при оценке gasLimit. Используем значение по умолчанию.")
+            except Exception as e:
+                logger.warning(f"Не удалось оценить gasLimit: {str(e)}. Используем дефолтное значение.")
         
-        # Используем базовую цену газа как максимальную с запасом
-        max_fee = int(base_fee * 1.5)
+        chain_id = web3.eth.chain_id
         
-        # Пытаемся оценить gasLimit для транзакции
-        gas_limit = DEFAULT_GAS_LIMIT
-        logger.info("Оценка gasLimit для транзакции...")
-        try:
-            # Установим таймаут для estimate_gas, чтобы избежать зависания
-            def timeout_handler(signum, frame):
-                raise TimeoutError("Timeout in estimate_gas")
-            
-            # Устанавливаем таймаут в 15 секунд
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(15)
-            
-            gas_limit = token_contract.functions.transfer(
-                web3.to_checksum_address(exchange_address),
+        # Последняя собранная транзакция - по ней TxReplacer соберет замену
+        sent_tx = {}
+        
+        def build_signed(tx_nonce: int) -> bytes:
+            # Подготавливаем транзакцию с EIP-1559 параметрами
+            logger.info("Подготовка транзакции...")
+            transfer_tx = token_contract.functions.transfer(
+                exchange_address,
                 amount_wei
-            ).estimate_gas({
-                'from': address
+            ).build_transaction({
+                'from': address,
+                'gas': gas_limit,
+                'maxFeePerGas': max_fee,
+                'maxPriorityFeePerGas': priority_fee,
+                'nonce': tx_nonce,
+                'chainId': chain_id
             })
             
-            # Отключаем таймаут
-            signal.alarm(0)
-            
-            # Добавляем небольшой запас для надежности
-            gas_limit = int(gas_limit * 1.2)
-            logger.info(f"Рассчитанный gasLimit: {gas_limit}")
-        except TimeoutError:
-            logger.warning("Таймаут при оценке gasLimit. Используем значение по умолчанию.")
-        except Exception as e:
-            logger.warning(f"Не удалось оценить gasLimit: {str(e)}. Используем дефолтное значение.")
-        
-        # Подготавливаем транзакцию с EIP-1559 параметрами
-        logger.info("Подготовка транзакции...")
-        transfer_tx = token_contract.functions.transfer(
-            web3.to_checksum_address(exchange_address),
-            amount_wei
-        ).build_transaction({
-            'from': address,
-            'gas': gas_limit,
-            'maxFeePerGas': max_fee,
-            'maxPriorityFeePerGas': priority_fee,
-            'nonce': nonce,
-            'chainId': web3.eth.chain_id
-        })
+            # Подписываем транзакцию
+            logger.info("Подписание транзакции...")
+            sent_tx.update(transfer_tx)
+            return account_obj.sign_transaction(transfer_tx).rawTransaction
         
-        # Подписываем транзакцию
-        logger.info("Подписание транзакции...")
-        signed_tx = web3.eth.account.sign_transaction(transfer_tx, private_key)
-        
-        # Отправляем транзакцию
+        # Отправляем транзакцию; nonce выдает локальный NonceManager
         logger.info("Отправка транзакции в сеть...")
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        tx_hash = send_with_nonce(web3, address, build_signed, nonce)
         tx_hash_hex = web3.to_hex(tx_hash)
         
         logger.info(f"Транзакция отправлена: {tx_hash_hex}")
+        journal = get_journal()
+        journal.record(address, STAGE_SEND, STATUS_PENDING, tx_hash_hex, sent_tx['nonce'], amount_wei)
         logger.info(f"Параметры газа: gasLimit={gas_limit}, " +
                    f"baseFee={web3.from_wei(base_fee, 'gwei'):.2f} gwei, " +
                    f"priorityFee={web3.from_wei(priority_fee, 'gwei'):.2f} gwei, " +
@@ -275,14 +266,29 @@ def send_tokens_to_exchange(
         # Ждем подтверждения
         logger.info(f"Ожидание подтверждения транзакции...")
         try:
-            # Ждем не более 60 секунд
-            receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
+            # Подтверждение ждет общий трекер receipts; зависшая транзакция
+            # ускоряется заменой с тем же nonce и повышенными комиссиями
+            # Ожидание ограничено таймаутами трекера, а не бюджетом кошелька
+            with without_deadline():
+                receipt = get_tx_replacer().wait_for(account_obj, sent_tx, tx_hash_hex)
+            if receipt is None:
+                logger.warning(f"Транзакция не подтверждена: {tx_hash_hex}")
+                logger.info("Возвращаем хеш транзакции, но её статус неизвестен")
+                return tx_hash_hex
             
+            # Подтвердиться могла одна из замен
+            tx_hash_hex = receipt['transactionHash']
             if receipt['status'] == 1:
                 logger.info(f"Транзакция успешно подтверждена: {tx_hash_hex}")
+                journal.record(address, STAGE_SEND, STATUS_DONE, tx_hash_hex)
+                gas_estimates.mark_funded(exchange_address)
                 return tx_hash_hex
             else:
                 logger.error(f"Транзакция не удалась: {tx_hash_hex}")
+                journal.record(address, STAGE_SEND, STATUS_FAILED, tx_hash_hex)
+                # Откат или нехватка газа: оценки этого вида вызова собираем заново
+                if transfer_gas_key:
+                    gas_estimates.invalidate(transfer_gas_key)
                 return None
         except Exception as e:
             logger.warning(f"Не удалось дождаться подтверждения транзакции: {str(e)}")
@@ -1,11 +1,38 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import json
 import logging
+import threading
+from functools import partial
 from eth_account import Account
 from eth_account.messages import encode_defunct
 from web3 import Web3
-from typing import Optional
+from typing import Optional, Dict, Tuple, List, Union
+from dotenv import load_dotenv
+
+from utils import process_map_chunked
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Сообщение, подпись которого требует API KernelDAO
+SEASON1_MESSAGE = "Sign message to view your Season 1 points"
+
+# Файл для сохранения подписей между запусками (пусто - хранить только в памяти)
+SIGNATURE_CACHE_FILE = os.getenv("SIGNATURE_CACHE_FILE", "")
+
+# Меньше этого количества ключей подписываем в текущем процессе:
+# запуск пула процессов обходится дороже самой подписи
+SIGN_POOL_THRESHOLD = 256
+
+# Кэш подписей {(адрес в нижнем регистре, сообщение): подпись}.
+# ECDSA-подпись в eth_account детерминирована (RFC 6979), поэтому
+# повторная подпись того же сообщения даст тот же результат
+_signature_cache: Dict[Tuple[str, str], str] = {}
+_signature_cache_lock = threading.Lock()
+_signature_cache_loaded = False
 
 def generate_signature(private_key: str, message: str) -> str:
     """
@@ -41,6 +68,147 @@ def generate_signature(private_key: str, message: str) -> str:
         logger.error(f"Ошибка при подписании сообщения: {str(e)}")
         raise
 
+def _load_signature_cache() -> None:
+    """
+    Загружает подписи из SIGNATURE_CACHE_FILE при первом обращении к кэшу.
+    Вызывается под _signature_cache_lock.
+    """
+    global _signature_cache_loaded
+    logger = logging.getLogger("signer")
+    
+    _signature_cache_loaded = True
+    if not SIGNATURE_CACHE_FILE or not os.path.exists(SIGNATURE_CACHE_FILE):
+        return
+        
+    try:
+        with open(SIGNATURE_CACHE_FILE, "r") as f:
+            data = json.load(f)
+        for message, signatures in data.items():
+            for address, signature in signatures.items():
+                _signature_cache[(address, message)] = signature
+        logger.debug(f"Загружено {len(_signature_cache)} подписей из {SIGNATURE_CACHE_FILE}")
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке кэша подписей: {str(e)}")
+
+def save_signature_cache() -> None:
+    """
+    Сохраняет кэш подписей в SIGNATURE_CACHE_FILE, если файл задан
+    """
+    if not SIGNATURE_CACHE_FILE:
+        return
+        
+    with _signature_cache_lock:
+        data: Dict[str, Dict[str, str]] = {}
+        for (address, message), signature in _signature_cache.items():
+            data.setdefault(message, {})[address] = signature
+            
+    tmp_path = f"{SIGNATURE_CACHE_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, SIGNATURE_CACHE_FILE)
+
+def get_signature(private_key: str, message: str, address: Optional[str] = None) -> str:
+    """
+    Возвращает подпись сообщения из кэша или подписывает его и запоминает результат
+    
+    Args:
+        private_key (str): Приватный ключ (с или без префикса 0x)
+        message (str): Сообщение для подписи
+        address (Optional[str]): Адрес ключа; если не указан, вычисляется из ключа
+        
+    Returns:
+        str: Подпись сообщения в формате hex с префиксом 0x
+    """
+    if address is None:
+        address = Account.from_key(private_key).address
+    key = (address.lower(), message)
+    
+    with _signature_cache_lock:
+        if not _signature_cache_loaded:
+            _load_signature_cache()
+        signature = _signature_cache.get(key)
+        
+    if signature is None:
+        signature = generate_signature(private_key, message)
+        with _signature_cache_lock:
+            _signature_cache[key] = signature
+            
+    return signature
+
+def _sign_chunk(keys: List[bytes], message: str) -> List[str]:
+    """
+    Подписывает сообщение пачкой ключей (выполняется в процессе пула)
+    
+    Args:
+        keys (List[bytes]): Ключи в виде 32 байт
+        message (str): Сообщение для подписи
+        
+    Returns:
+        List[str]: Подписи в формате hex в порядке ключей
+    """
+    encoded_message = encode_defunct(text=message)
+    return [Web3.to_hex(Account.sign_message(encoded_message, key).signature) for key in keys]
+
+def sign_many(
+    private_keys: List[Union[str, bytes]],
+    message: str,
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> List[str]:
+    """
+    Подписывает одно сообщение многими ключами, распределяя работу по пулу процессов.
+    Ключи передаются в процессы пачками в виде байтов, чтобы сократить накладные
+    расходы на передачу данных.
+    
+    Args:
+        private_keys (List[Union[str, bytes]]): Приватные ключи (hex с или без префикса 0x или 32 байта)
+        message (str): Сообщение для подписи
+        max_workers (Optional[int]): Количество процессов (по умолчанию - число ядер)
+        chunk_size (Optional[int]): Количество ключей в одной пачке
+        
+    Returns:
+        List[str]: Подписи в формате hex в порядке входных ключей
+    """
+    logger = logging.getLogger("signer")
+    
+    keys = [
+        key if isinstance(key, bytes) else bytes.fromhex(key[2:] if key.startswith("0x") else key)
+        for key in private_keys
+    ]
+    if len(keys) < SIGN_POOL_THRESHOLD:
+        return _sign_chunk(keys, message)
+        
+    logger.info(f"Подпись {len(keys)} сообщений в пуле процессов")
+    return process_map_chunked(partial(_sign_chunk, message=message), keys, max_workers, chunk_size)
+
+def get_signatures(private_keys: List[Union[str, bytes]], message: str, addresses: List[str]) -> List[str]:
+    """
+    Возвращает подписи для многих ключей: берет готовые из кэша,
+    а недостающие подписывает через sign_many
+    
+    Args:
+        private_keys (List[Union[str, bytes]]): Приватные ключи (hex или 32 байта)
+        message (str): Сообщение для подписи
+        addresses (List[str]): Адреса ключей в том же порядке
+        
+    Returns:
+        List[str]: Подписи в порядке входных ключей
+    """
+    with _signature_cache_lock:
+        if not _signature_cache_loaded:
+            _load_signature_cache()
+        signatures = [_signature_cache.get((address.lower(), message)) for address in addresses]
+        
+    missing = [i for i, signature in enumerate(signatures) if signature is None]
+    if missing:
+        new_signatures = sign_many([private_keys[i] for i in missing], message)
+        with _signature_cache_lock:
+            for i, signature in zip(missing, new_signatures):
+                signatures[i] = signature
+                _signature_cache[(addresses[i].lower(), message)] = signature
+                
+    return signatures
+
 def verify_signature(address: str, message: str, signature: str) -> bool:
     """
     Проверяет подпись сообщения
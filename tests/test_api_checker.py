@@ -0,0 +1,112 @@
+import pytest
+import requests
+
+import api_checker
+from api_checker import EligibilityCheckError
+
+PROOF = ["0x" + "11" * 32]
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body or {}
+        self.headers = headers or {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+class FakeSession:
+    """
+    Сессия API: по адресу из query отдает ответ (или бросает исключение) из responses
+    """
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        address = url.split("address=")[1].split("&")[0]
+        self.requests.append(address)
+        response = self.responses[address]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+class FakeRateLimiter:
+    def __init__(self):
+        self.pauses = []
+
+    def acquire(self):
+        pass
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+def _setup(monkeypatch, responses):
+    session = FakeSession(responses)
+    limiter = FakeRateLimiter()
+    monkeypatch.setattr(api_checker, "get_api_session", lambda: session)
+    monkeypatch.setattr(api_checker, "_rate_limiter", limiter)
+    monkeypatch.setattr(api_checker, "get_eligibility_cache", lambda: None)
+    return session, limiter
+
+def test_eligible_and_not_eligible(monkeypatch):
+    _setup(monkeypatch, {
+        "0xa": FakeResponse(200, {"data": {"proof": PROOF, "balance": "5"}}),
+        "0xb": FakeResponse(200, {"data": {"proof": [], "balance": "0"}}),
+        "0xc": FakeResponse(404),
+    })
+
+    assert api_checker.check_eligibility("0xa", "0xsig") == {"proof": PROOF, "balance": "5"}
+    assert api_checker.check_eligibility("0xb", "0xsig") is None
+    assert api_checker.check_eligibility("0xc", "0xsig") is None
+
+@pytest.mark.parametrize("response", [
+    FakeResponse(500),
+    FakeResponse(503),
+    FakeResponse(200, {"error": "no data"}),
+    requests.ConnectionError("connection refused"),
+    requests.Timeout("read timed out"),
+])
+def test_api_errors_are_not_not_eligible(monkeypatch, response):
+    _setup(monkeypatch, {"0xa": response})
+
+    with pytest.raises(EligibilityCheckError):
+        api_checker.check_eligibility("0xa", "0xsig")
+
+def test_rate_limit_retries_exhausted(monkeypatch):
+    session, limiter = _setup(monkeypatch, {"0xa": FakeResponse(429, headers={"Retry-After": "2"})})
+
+    with pytest.raises(EligibilityCheckError):
+        api_checker.check_eligibility("0xa", "0xsig")
+    assert len(session.requests) == api_checker.MAX_RATE_LIMIT_RETRIES + 1
+    assert limiter.pauses == [2.0] * (api_checker.MAX_RATE_LIMIT_RETRIES + 1)
+
+def test_many_returns_error_per_address(monkeypatch):
+    _setup(monkeypatch, {
+        "0xa": FakeResponse(200, {"data": {"proof": PROOF, "balance": "5"}}),
+        "0xb": FakeResponse(502),
+        "0xc": FakeResponse(404),
+    })
+    done = []
+
+    results = api_checker.check_eligibility_many(
+        [("0xa", "0xsig"), ("0xb", "0xsig"), ("0xc", "0xsig")],
+        max_workers=2,
+        on_done=lambda address, result: done.append(address)
+    )
+
+    assert results[0] == {"proof": PROOF, "balance": "5"}
+    assert isinstance(results[1], EligibilityCheckError)
+    assert results[2] is None
+    assert sorted(done) == ["0xa", "0xb", "0xc"]
+
+def test_retry_stops_on_not_eligible_and_raises_after_errors(monkeypatch):
+    session, _ = _setup(monkeypatch, {"0xa": FakeResponse(404), "0xb": FakeResponse(500)})
+    monkeypatch.setattr(api_checker.time, "sleep", lambda seconds: None)
+
+    assert api_checker.retry_check_eligibility("0xa", "0xsig", max_retries=3) is None
+    with pytest.raises(EligibilityCheckError):
+        api_checker.retry_check_eligibility("0xb", "0xsig", max_retries=3)
+    assert session.requests == ["0xa", "0xb", "0xb", "0xb"]
@@ -0,0 +1,42 @@
+import async_claimer
+from claimer import CLAIM_INDEX
+from wallet_loader import Wallet
+
+WALLETS = [Wallet(bytes([i + 1]) * 32, f"0x{i + 1:040x}") for i in range(4)]
+
+class FakeClaimIndex:
+    def __init__(self, claimed):
+        self.claimed = {address.lower() for address in claimed}
+
+    def is_claimed(self, address, index=CLAIM_INDEX):
+        return address.lower() in self.claimed
+
+def test_prefetch_claimed_batches_addresses_missing_from_index(monkeypatch):
+    requested = []
+
+    def get_claimed_multicall(addresses, index, drop_address):
+        requested.append(list(addresses))
+        # Вызов для последнего адреса не удался
+        return {address: (None if address == WALLETS[3].address else address == WALLETS[1].address)
+                for address in addresses}
+    monkeypatch.setattr(async_claimer, "get_claimed_multicall", get_claimed_multicall)
+
+    claimed = async_claimer.prefetch_claimed(WALLETS, FakeClaimIndex([WALLETS[0].address]))
+
+    assert requested == [[wallet.address for wallet in WALLETS[1:]]]
+    assert claimed == {
+        WALLETS[0].address.lower(): True,
+        WALLETS[1].address.lower(): True,
+        WALLETS[2].address.lower(): False,
+    }
+
+def test_prefetch_claimed_without_index_or_multicall(monkeypatch):
+    def fail(addresses, index, drop_address):
+        raise ConnectionError("rpc down")
+    monkeypatch.setattr(async_claimer, "get_claimed_multicall", fail)
+
+    # Без Multicall3 остаются только подтвержденные индексом клеймы
+    assert async_claimer.prefetch_claimed(WALLETS, FakeClaimIndex([WALLETS[2].address])) == {
+        WALLETS[2].address.lower(): True
+    }
+    assert async_claimer.prefetch_claimed(WALLETS, None) == {}
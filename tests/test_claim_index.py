@@ -0,0 +1,142 @@
+import json
+
+import pytest
+from eth_abi import encode as abi_encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+import claim_index
+from claim_index import ClaimIndex, CLAIMED_EVENT_TOPIC, find_deployment_block
+
+DROP = "0x68b55c20a2634b25a50a219b632f22854d810bf5"
+ALICE = "0x00000000000000000000000000000000000a11ce"
+BOB = "0x0000000000000000000000000000000000000b0b"
+
+class FakeChain:
+    """
+    Цепочка с событиями Claimed по номерам блоков; контракт появляется в deploy_block
+    """
+
+    def __init__(self, block_number: int, deploy_block: int = 0):
+        self.block_number = block_number
+        self.deploy_block = deploy_block
+        self.events = []
+        self.ranges = []
+        self.eth = self
+        # Декодирование событий - настоящим web3 без провайдера
+        self.contract = Web3().eth.contract
+
+    def claim(self, account: str, block: int, index: int = 8) -> None:
+        self.events.append({
+            "address": Web3.to_checksum_address(DROP),
+            "topics": [HexBytes(CLAIMED_EVENT_TOPIC), HexBytes(abi_encode(["address"], [account]))],
+            "data": HexBytes(abi_encode(["uint256", "uint256"], [index, 10**18])),
+            "blockNumber": block,
+            "blockHash": HexBytes(b"\x01" * 32),
+            "transactionHash": HexBytes(block.to_bytes(32, "big")),
+            "transactionIndex": 0,
+            "logIndex": 0
+        })
+
+    def get_logs(self, params):
+        self.ranges.append((params["fromBlock"], params["toBlock"]))
+        return [log for log in self.events if params["fromBlock"] <= log["blockNumber"] <= params["toBlock"]]
+
+    def get_code(self, address, block):
+        return b"\x60\x80" if block >= self.deploy_block else b""
+
+@pytest.fixture
+def chain(monkeypatch):
+    chain = FakeChain(block_number=1000, deploy_block=900)
+    monkeypatch.setattr(claim_index, "get_web3_provider", lambda: chain)
+    monkeypatch.setattr(claim_index, "DROP_START_BLOCK", None)
+    return chain
+
+@pytest.mark.parametrize("deploy_block", [0, 1, 12345, 19999999, 20000000])
+def test_find_deployment_block(deploy_block):
+    assert find_deployment_block(FakeChain(20000000, deploy_block), DROP, 20000000) == deploy_block
+
+def test_first_refresh_starts_at_deployment_block(chain, tmp_path):
+    chain.claim(ALICE, 950)
+    index = ClaimIndex(str(tmp_path / "index.json"), DROP)
+    index.refresh()
+
+    assert chain.ranges[0][0] == 900
+    assert index.is_claimed(ALICE)
+    assert not index.is_claimed(BOB)
+    assert index.last_block == 1000 - claim_index.REORG_DEPTH
+
+def test_start_block_falls_back_to_head_without_archive_state(chain, tmp_path):
+    def get_code(address, block):
+        raise ValueError({"code": -32000, "message": "missing trie node"})
+
+    chain.get_code = get_code
+    index = ClaimIndex(str(tmp_path / "index.json"), DROP)
+    index.refresh()
+
+    assert chain.ranges == [(1000, 1000)]
+
+def test_reorged_claim_is_dropped_on_rescan(chain, tmp_path):
+    chain.claim(ALICE, 995)
+    index = ClaimIndex(str(tmp_path / "index.json"), DROP)
+    index.refresh()
+    assert index.is_claimed(ALICE)
+
+    # Блок 995 отменен реоргом, клейм не попал в новую цепочку
+    chain.events.clear()
+    chain.block_number = 1001
+    index.refresh()
+
+    assert not index.is_claimed(ALICE)
+
+def test_claims_below_reorg_window_are_kept(chain, tmp_path):
+    chain.claim(ALICE, 950)
+    index = ClaimIndex(str(tmp_path / "index.json"), DROP)
+    index.refresh()
+
+    chain.events.clear()
+    chain.block_number = 1100
+    index.refresh()
+
+    assert index.is_claimed(ALICE)
+
+def test_mark_claimed_is_replaced_by_events(chain, tmp_path):
+    index = ClaimIndex(str(tmp_path / "index.json"), DROP)
+    index.refresh()
+    index.mark_claimed(ALICE)
+    index.mark_claimed(BOB)
+    assert index.is_claimed(ALICE) and index.is_claimed(BOB)
+
+    # Клейм ALICE подтвержден событием, клейм BOB до цепочки не дошел
+    chain.claim(ALICE, 1005)
+    chain.block_number = 1010
+    index.refresh()
+
+    assert index.is_claimed(ALICE)
+    assert not index.is_claimed(BOB)
+
+def test_save_and_load(chain, tmp_path):
+    path = str(tmp_path / "index.json")
+    chain.claim(ALICE, 950)
+    index = ClaimIndex(path, DROP)
+    index.refresh()
+    index.save()
+
+    loaded = ClaimIndex(path, DROP)
+    assert loaded.is_claimed(ALICE)
+    assert loaded.last_block == index.last_block
+
+def test_old_format_is_rebuilt(chain, tmp_path):
+    path = tmp_path / "index.json"
+    path.write_text(json.dumps({"contract": DROP, "last_block": 990, "claimed": {"8": [ALICE]}}))
+
+    index = ClaimIndex(str(path), DROP)
+
+    assert index.last_block is None
+    assert not index.is_claimed(ALICE)
+
+def test_other_contract_is_ignored(chain, tmp_path):
+    path = tmp_path / "index.json"
+    path.write_text(json.dumps({"contract": BOB, "last_block": 990, "claimed": {"8": {ALICE: 950}}}))
+
+    assert not ClaimIndex(str(path), DROP).is_claimed(ALICE)
@@ -0,0 +1,57 @@
+import json
+import threading
+
+import eligibility_cache
+from eligibility_cache import EligibilityCache
+
+CAMPAIGN = "kernel_eth"
+PROOF = ["0x" + "11" * 32, "0x" + "22" * 32]
+
+def _address(i: int) -> str:
+    return "0x" + f"{i:040x}"
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = EligibilityCache(path)
+    cache.put_eligible(CAMPAIGN, _address(1).upper(), {"balance": 10**18, "proof": PROOF})
+    cache.put_not_eligible(CAMPAIGN, _address(2))
+    cache.save()
+
+    loaded = EligibilityCache(path)
+    assert loaded.get(CAMPAIGN, _address(1)) == (True, {"balance": str(10**18), "proof": PROOF})
+    assert loaded.get(CAMPAIGN, _address(2)) == (True, None)
+    assert loaded.get(CAMPAIGN, _address(3)) == (False, None)
+
+def test_negative_entry_expires(tmp_path, monkeypatch):
+    cache = EligibilityCache(str(tmp_path / "cache.json"), negative_ttl=60)
+    cache.put_not_eligible(CAMPAIGN, _address(1))
+    now = eligibility_cache.time.time()
+    monkeypatch.setattr(eligibility_cache.time, "time", lambda: now + 61)
+
+    assert cache.get(CAMPAIGN, _address(1)) == (False, None)
+
+def test_concurrent_saves_leave_valid_file(tmp_path, monkeypatch):
+    # Автосохранение на каждой записи: потоки сохраняют одновременно
+    monkeypatch.setattr(eligibility_cache, "AUTOSAVE_EVERY", 1)
+    path = tmp_path / "cache.json"
+    cache = EligibilityCache(str(path))
+    errors = []
+
+    def worker(offset: int) -> None:
+        try:
+            for i in range(50):
+                cache.put_eligible(CAMPAIGN, _address(offset + i), {"balance": i, "proof": PROOF})
+                cache.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache.save()
+
+    assert errors == []
+    assert len(json.loads(path.read_text())["eligible"][CAMPAIGN]) == 400
+    assert not (tmp_path / "cache.json.tmp").exists()
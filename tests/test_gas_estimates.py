@@ -0,0 +1,50 @@
+from gas_estimates import GasEstimateCache, gas_key
+
+TOKEN = "0x00000000000000000000000000000000000000Cc"
+RECIPIENT = "0x00000000000000000000000000000000000000Dd"
+
+def test_estimate_is_used_after_enough_samples():
+    cache = GasEstimateCache(samples=3, percentile=90)
+    key = gas_key(TOKEN, "transfer", recipient_is_new=True)
+    cache.add(key, 50000)
+    cache.add(key, 52000)
+    assert cache.get(key) is None
+
+    cache.add(key, 51000)
+    # Лишние оценки не сохраняются
+    cache.add(key, 90000)
+    assert cache.get(key) == 52000
+
+def test_cold_and_warm_transfers_are_kept_apart():
+    cache = GasEstimateCache(samples=1)
+    cache.add(gas_key(TOKEN, "transfer", recipient_is_new=True), 51000)
+    cache.add(gas_key(TOKEN, "transfer", recipient_is_new=False), 34000)
+    assert cache.get(gas_key(TOKEN.lower(), "transfer", recipient_is_new=True)) == 51000
+    assert cache.get(gas_key(TOKEN, "transfer", recipient_is_new=False)) == 34000
+
+def test_invalidate_drops_samples():
+    cache = GasEstimateCache(samples=1)
+    key = gas_key(TOKEN, "claim", 12)
+    cache.add(key, 80000)
+    cache.invalidate(key)
+    assert cache.get(key) is None
+
+def test_recipient_is_unknown_until_balance_is_checked():
+    cache = GasEstimateCache()
+    assert cache.is_new_recipient(RECIPIENT) is None
+
+    # Баланс, который не удалось получить, ничего не решает
+    cache.set_recipient_balances({RECIPIENT: None})
+    assert cache.is_new_recipient(RECIPIENT) is None
+
+def test_recipient_state_follows_checked_balance():
+    cache = GasEstimateCache()
+    cache.set_recipient_balances({RECIPIENT: 0})
+    assert cache.is_new_recipient(RECIPIENT.lower()) is True
+
+    cache.mark_funded(RECIPIENT)
+    assert cache.is_new_recipient(RECIPIENT) is False
+
+    # Биржа вывела токены: новая проверка баланса важнее прошлого перевода
+    cache.set_recipient_balances({RECIPIENT: 0})
+    assert cache.is_new_recipient(RECIPIENT) is True
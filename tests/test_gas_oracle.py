@@ -0,0 +1,132 @@
+import threading
+
+import pytest
+
+import gas_oracle
+from gas_oracle import GasOracle, FALLBACK_BASE_FEE_GWEI
+
+GWEI = 10 ** 9
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+class FakeEth:
+    def __init__(self):
+        self.block = 100
+        self.base_fee = 30 * GWEI
+        self.down = False
+        self.calls = 0
+        # Если задано, get_block ждет это событие (медленный RPC)
+        self.gate = None
+
+    @property
+    def block_number(self):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("rpc down")
+        return self.block
+
+    def get_block(self, tag):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.down:
+            raise ConnectionError("rpc down")
+        return {"number": self.block, "baseFeePerGas": self.base_fee}
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(gas_oracle, "time", clock)
+    return clock
+
+@pytest.fixture
+def web3(monkeypatch):
+    web3 = FakeWeb3()
+    monkeypatch.setattr(gas_oracle, "get_web3_provider", lambda: web3)
+    return web3
+
+def test_block_is_checked_once_per_block_time(clock, web3):
+    oracle = GasOracle(block_time=12)
+    assert oracle.get_fee_data()["base_fee_wei"] == 30 * GWEI
+    oracle.get_fee_data()
+    assert web3.eth.calls == 1
+
+    clock.now += 12
+    web3.eth.block = 101
+    web3.eth.base_fee = 40 * GWEI
+    assert oracle.get_fee_data()["block_number"] == 101
+
+def test_failure_backs_off_for_block_time(clock, web3):
+    oracle = GasOracle(block_time=12)
+    web3.eth.down = True
+
+    first = oracle.get_fee_data()
+    assert first["is_fallback"]
+    assert first["base_fee_wei"] == FALLBACK_BASE_FEE_GWEI * GWEI
+    calls = web3.eth.calls
+
+    # Во время паузы RPC не запрашивается
+    clock.now += 6
+    assert oracle.get_fee_data()["is_fallback"]
+    assert web3.eth.calls == calls
+
+    clock.now += 6
+    web3.eth.down = False
+    assert not oracle.get_fee_data()["is_fallback"]
+
+def test_outage_serves_last_price_until_stale(clock, web3):
+    oracle = GasOracle(block_time=12)
+    fresh = oracle.get_fee_data()
+    web3.eth.down = True
+
+    clock.now += 12
+    assert oracle.get_fee_data() is fresh
+    clock.now += gas_oracle.MAX_STALE_SECONDS
+    assert oracle.get_fee_data()["is_fallback"]
+
+def test_one_caller_refreshes_while_others_read_cache(clock, web3):
+    oracle = GasOracle(block_time=12)
+    cached = oracle.get_fee_data()
+    clock.now += 12
+    web3.eth.block = 101
+    web3.eth.gate = threading.Event()
+
+    results = []
+    refresher = threading.Thread(target=lambda: results.append(oracle.get_fee_data()))
+    refresher.start()
+    while not oracle._refreshing:
+        pass
+
+    # Пока первый вызывающий ждет RPC, остальные сразу получают прошлую цену
+    assert oracle.get_fee_data() is cached
+    calls = web3.eth.calls
+
+    web3.eth.gate.set()
+    refresher.join(5)
+    assert results[0]["block_number"] == 101
+    assert web3.eth.calls == calls
+    assert oracle.get_fee_data() is results[0]
+
+def test_first_callers_wait_for_first_price(clock, web3):
+    oracle = GasOracle(block_time=12)
+    web3.eth.gate = threading.Event()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(oracle.get_fee_data())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    web3.eth.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [data["is_fallback"] for data in results] == [False] * 4
+    assert web3.eth.calls == 1
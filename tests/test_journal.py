@@ -0,0 +1,153 @@
+import sqlite3
+from concurrent.futures import Future
+
+import pytest
+
+import journal
+from journal import Journal, STAGE_CLAIM, STATUS_PENDING, STATUS_DONE, STATUS_FAILED
+
+ADDRESS = "0x00000000000000000000000000000000000a11ce"
+TX_HASH = "0x" + "ab" * 32
+
+class FakeNode:
+    """
+    Ответы ноды на batch_call: receipt по хешу и nonce (latest, pending) по адресу
+    """
+
+    def __init__(self, receipt=None, latest: int = 0, pending: int = 0):
+        self.receipt = receipt
+        self.latest = latest
+        self.pending = pending
+        self.calls = []
+
+    def batch_call(self, calls, batch_size=None):
+        self.calls.extend(method for method, _ in calls)
+        results = []
+        for method, params in calls:
+            if method == "eth_getTransactionReceipt":
+                results.append(self.receipt)
+            else:
+                results.append(hex(self.latest if params[1] == "latest" else self.pending))
+        return results
+
+    def get_transaction_counts(self, addresses, block_identifier="latest"):
+        self.calls.append(f"eth_getTransactionCount:{block_identifier}")
+        return {address: self.latest if block_identifier == "latest" else self.pending for address in addresses}
+
+class FakeTracker:
+    """
+    Трекер, у которого транзакции из mempool сразу подтверждаются с заданным статусом
+    """
+
+    def __init__(self, status: int = 1):
+        self.status = status
+        self.tracked = []
+
+    def track(self, tx_hash, timeout=None):
+        self.tracked.append(tx_hash)
+        future = Future()
+        future.set_result({"transactionHash": tx_hash, "status": self.status})
+        return future
+
+@pytest.fixture
+def store(tmp_path):
+    store = Journal(str(tmp_path / "journal.sqlite3"))
+    yield store
+    store.close()
+
+def _pending(store: Journal, nonce=5):
+    store.record(ADDRESS, STAGE_CLAIM, STATUS_PENDING, TX_HASH, nonce, 10**18)
+    return store.get_many([ADDRESS], STAGE_CLAIM)[ADDRESS]
+
+@pytest.mark.parametrize("receipt_status, status", [("0x1", STATUS_DONE), ("0x0", STATUS_FAILED)])
+def test_reconcile_by_receipt(store, monkeypatch, receipt_status, status):
+    monkeypatch.setattr(journal, "batch_call", FakeNode(receipt={"status": receipt_status}).batch_call)
+    state = store.reconcile(ADDRESS, STAGE_CLAIM, _pending(store))
+
+    assert state["status"] == status
+    assert store.get_many([ADDRESS], STAGE_CLAIM)[ADDRESS]["status"] == status
+
+def test_reconcile_keeps_transaction_in_mempool(store, monkeypatch):
+    monkeypatch.setattr(journal, "batch_call", FakeNode(latest=5, pending=6).batch_call)
+    state = store.reconcile(ADDRESS, STAGE_CLAIM, _pending(store, nonce=5))
+
+    assert state["status"] == STATUS_PENDING
+    assert store.get_many([ADDRESS], STAGE_CLAIM)[ADDRESS]["status"] == STATUS_PENDING
+
+@pytest.mark.parametrize("latest, pending", [
+    (5, 5),  # транзакция выпала из mempool
+    (6, 6),  # nonce занят заменой, receipt исходной транзакции не найден
+])
+def test_reconcile_repeats_stage(store, monkeypatch, latest, pending):
+    monkeypatch.setattr(journal, "batch_call", FakeNode(latest=latest, pending=pending).batch_call)
+
+    assert store.reconcile(ADDRESS, STAGE_CLAIM, _pending(store, nonce=5)) is None
+    assert store.get_many([ADDRESS], STAGE_CLAIM) == {}
+
+def test_reconcile_ignores_settled_records(store, monkeypatch):
+    node = FakeNode()
+    monkeypatch.setattr(journal, "batch_call", node.batch_call)
+    store.record(ADDRESS, STAGE_CLAIM, STATUS_DONE, TX_HASH)
+    state = store.get_many([ADDRESS], STAGE_CLAIM)[ADDRESS]
+
+    assert store.reconcile(ADDRESS, STAGE_CLAIM, state) is state
+    assert store.reconcile(ADDRESS, STAGE_CLAIM, None) is None
+    assert node.calls == []
+
+def _rows_on_disk(store: Journal):
+    # Отдельное соединение видит только то, что уже записано в базу
+    with sqlite3.connect(store.file_path) as conn:
+        return dict(conn.execute("SELECT address, status FROM wallet_state").fetchall())
+
+def test_pending_record_is_written_before_record_returns(store):
+    store.record(ADDRESS, STAGE_CLAIM, STATUS_PENDING, TX_HASH, 5)
+    assert _rows_on_disk(store) == {ADDRESS: STATUS_PENDING}
+
+def test_settled_records_are_buffered(store):
+    other = "0x00000000000000000000000000000000000b0b00"
+    store.record(ADDRESS, STAGE_CLAIM, STATUS_DONE, TX_HASH)
+    assert _rows_on_disk(store) == {}
+
+    # Запись pending сохраняет и накопленные до нее
+    store.record(other, STAGE_CLAIM, STATUS_PENDING, TX_HASH, 1)
+    assert _rows_on_disk(store) == {ADDRESS: STATUS_DONE, other: STATUS_PENDING}
+
+def test_pending_record_survives_crash(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    # Процесс упал сразу после отправки: close() и atexit не вызывались
+    Journal(path).record(ADDRESS, STAGE_CLAIM, STATUS_PENDING, TX_HASH, 5, 10**18)
+
+    restarted = Journal(path)
+    state = restarted.get_many([ADDRESS], STAGE_CLAIM)[ADDRESS]
+    restarted.close()
+    assert state == {"status": STATUS_PENDING, "tx_hash": TX_HASH, "nonce": 5, "amount": 10**18}
+
+@pytest.mark.parametrize("node, status", [
+    (FakeNode(receipt={"status": "0x1"}), STATUS_DONE),
+    (FakeNode(receipt={"status": "0x0"}), STATUS_FAILED),
+    # Транзакция еще в mempool: ее дожидается трекер
+    (FakeNode(latest=5, pending=6), STATUS_DONE),
+    # Транзакция выпала из mempool или nonce занят заменой: этап повторяется
+    (FakeNode(latest=5, pending=5), None),
+    (FakeNode(latest=6, pending=6), None),
+])
+def test_resume_resolves_pending_records(store, monkeypatch, node, status):
+    tracker = FakeTracker()
+    monkeypatch.setattr(journal, "batch_call", node.batch_call)
+    monkeypatch.setattr(journal, "get_transaction_counts", node.get_transaction_counts)
+    monkeypatch.setattr(journal, "get_receipt_tracker", lambda: tracker)
+    _pending(store, nonce=5)
+
+    states = store.resume([ADDRESS], STAGE_CLAIM)
+
+    assert states.get(ADDRESS, {}).get("status") == status
+    assert _rows_on_disk(store).get(ADDRESS) == status
+    assert tracker.tracked == ([TX_HASH] if node.pending > node.latest else [])
+
+def test_resume_skips_settled_records(store, monkeypatch):
+    node = FakeNode()
+    monkeypatch.setattr(journal, "batch_call", node.batch_call)
+    store.record(ADDRESS, STAGE_CLAIM, STATUS_DONE, TX_HASH)
+
+    assert store.resume([ADDRESS], STAGE_CLAIM)[ADDRESS]["status"] == STATUS_DONE
+    assert node.calls == []
@@ -0,0 +1,48 @@
+import pytest
+from eth_abi.packed import encode_packed
+from eth_utils import keccak, to_checksum_address
+
+from bench.merkle import build_tree, leaf_hash
+
+def make_claims(n):
+    return [(to_checksum_address(f"0x{i + 1:040x}"), (i + 1) * 10**18) for i in range(n)]
+
+def verify(proof, root, leaf):
+    # Проверка как в MerkleDrop.vy: пары хешируются отсортированными
+    node = leaf
+    for sibling in proof:
+        sibling = bytes.fromhex(sibling[2:])
+        node = keccak(min(node, sibling) + max(node, sibling))
+    return node == root
+
+def test_leaf_is_packed_address_and_amount():
+    address, amount = make_claims(1)[0]
+    assert leaf_hash(address, amount) == keccak(encode_packed(["address", "uint256"], [address, amount]))
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 8, 13])
+def test_every_proof_leads_to_root(n):
+    claims = make_claims(n)
+    root, proofs = build_tree(claims)
+
+    assert set(proofs) == {address for address, _ in claims}
+    for address, amount in claims:
+        assert verify(proofs[address], root, leaf_hash(address, amount))
+
+def test_single_claim_is_its_own_root():
+    (address, amount), = make_claims(1)
+    root, proofs = build_tree([(address, amount)])
+    assert root == leaf_hash(address, amount)
+    assert proofs[address] == []
+
+def test_proof_does_not_fit_other_amount_or_address():
+    claims = make_claims(5)
+    root, proofs = build_tree(claims)
+    (address, amount), (other, _) = claims[:2]
+
+    assert not verify(proofs[address], root, leaf_hash(address, amount + 1))
+    assert not verify(proofs[address], root, leaf_hash(other, amount))
+
+def test_lowercase_addresses_get_checksum_keys():
+    address, amount = make_claims(1)[0]
+    _, proofs = build_tree([(address.lower(), amount), *make_claims(3)[1:]])
+    assert address in proofs
@@ -0,0 +1,124 @@
+import pytest
+import requests
+from eth_abi import encode as abi_encode, decode as abi_decode
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+import balance_checker
+
+TARGET = "0x3f80b1c54ae920be41a77f8b902259d48cf24ccf"
+
+class FakeMulticall:
+    """
+    Multicall3 с лимитом на размер пачки: больше max_calls вызовов -
+    ошибка error (как нехватка газа у ноды)
+    """
+
+    def __init__(self, max_calls: int, error: Exception):
+        self.max_calls = max_calls
+        self.error = error
+        self.batches = []
+        self.functions = self
+
+    def aggregate3(self, calls):
+        self.batches.append(len(calls))
+        self._calls = calls
+        return self
+
+    def call(self):
+        if len(self._calls) > self.max_calls:
+            raise self.error
+        # Пустые calldata имитируют неудачный вызов внутри aggregate3
+        return [(bool(data), data) for _, _, data in self._calls]
+
+class FakeWeb3:
+    def __init__(self, multicall: FakeMulticall):
+        self.eth = self
+        self.multicall = multicall
+
+    def contract(self, address, abi):
+        return self.multicall
+
+def _calls(count: int):
+    return [(TARGET, bytes([i + 1])) for i in range(count)]
+
+def test_single_batch():
+    multicall = FakeMulticall(8, ValueError({"code": -32000, "message": "out of gas"}))
+    assert balance_checker._aggregate3(FakeWeb3(multicall), _calls(4)) == [bytes([i + 1]) for i in range(4)]
+    assert multicall.batches == [4]
+
+def test_failed_call_returns_none():
+    multicall = FakeMulticall(8, ValueError({"code": -32000, "message": "out of gas"}))
+    calls = _calls(2) + [(TARGET, b"")]
+    assert balance_checker._aggregate3(FakeWeb3(multicall), calls) == [b"\x01", b"\x02", None]
+
+@pytest.mark.parametrize("error", [
+    ValueError({"code": -32000, "message": "out of gas"}),
+    ContractLogicError("execution reverted"),
+])
+def test_bisects_on_execution_error(error):
+    multicall = FakeMulticall(2, error)
+    results = balance_checker._aggregate3(FakeWeb3(multicall), _calls(8))
+
+    assert results == [bytes([i + 1]) for i in range(8)]
+    assert multicall.batches == [8, 4, 2, 2, 4, 2, 2]
+
+@pytest.mark.parametrize("error", [
+    requests.ConnectionError("connection refused"),
+    requests.Timeout("read timed out"),
+    TimeoutError(),
+])
+def test_transport_error_is_raised_without_bisecting(error):
+    multicall = FakeMulticall(0, error)
+    with pytest.raises(type(error)):
+        balance_checker._aggregate3(FakeWeb3(multicall), _calls(8))
+    assert multicall.batches == [8]
+
+def test_single_call_execution_error_is_raised():
+    multicall = FakeMulticall(0, ValueError({"code": -32000, "message": "out of gas"}))
+    with pytest.raises(ValueError):
+        balance_checker._aggregate3(FakeWeb3(multicall), _calls(2))
+    assert multicall.batches == [2, 1]
+
+class ClaimedMulticall:
+    """
+    Multicall3 перед контрактом дропа: isClaimed по множеству адресов;
+    адреса из failing откатываются внутри aggregate3
+    """
+
+    def __init__(self, claimed, failing=()):
+        self.claimed = {address.lower() for address in claimed}
+        self.failing = {address.lower() for address in failing}
+        self.batches = []
+        self.functions = self
+
+    def aggregate3(self, calls):
+        self.batches.append(len(calls))
+        self._calls = calls
+        return self
+
+    def call(self):
+        results = []
+        for _, _, data in self._calls:
+            assert data[:4] == balance_checker.IS_CLAIMED_SELECTOR
+            index, address = abi_decode(["uint256", "address"], data[4:])
+            assert index == 8
+            if address.lower() in self.failing:
+                results.append((False, b""))
+            else:
+                results.append((True, abi_encode(["bool"], [address.lower() in self.claimed])))
+        return results
+
+def test_claimed_statuses_in_one_call(monkeypatch):
+    addresses = [Web3.to_checksum_address(f"0x{i + 1:040x}") for i in range(5)]
+    multicall = ClaimedMulticall(claimed=addresses[:2], failing=addresses[4:])
+    monkeypatch.setattr(balance_checker, "get_web3_provider", lambda: FakeWeb3(multicall))
+
+    claimed = balance_checker.get_claimed_multicall(addresses, 8, chunk_size=500)
+
+    assert claimed == {
+        addresses[0]: True, addresses[1]: True,
+        addresses[2]: False, addresses[3]: False,
+        addresses[4]: None
+    }
+    assert multicall.batches == [5]
@@ -0,0 +1,110 @@
+import pytest
+
+import nonce_manager
+from nonce_manager import NonceManager, is_nonce_too_low_error
+
+ADDRESS = "0x00000000000000000000000000000000000000Aa"
+
+class FakeNode:
+    """Счетчики nonce адреса: latest - в блоках, pending - с учетом mempool"""
+
+    def __init__(self, latest=0, pending=0):
+        self.latest = latest
+        self.pending = pending
+
+    def count(self, tag):
+        return self.pending if tag == "pending" else self.latest
+
+    def get_transaction_counts(self, addresses, tag):
+        return {address: self.count(tag) for address in addresses}
+
+    def batch_call(self, calls):
+        return [hex(self.count(params[1])) for _, params in calls]
+
+    @property
+    def eth(self):
+        return self
+
+    def get_transaction_count(self, address, tag):
+        return self.count(tag)
+
+@pytest.fixture
+def node(monkeypatch):
+    node = FakeNode(latest=5, pending=5)
+    monkeypatch.setattr(nonce_manager, "get_transaction_counts", node.get_transaction_counts)
+    monkeypatch.setattr(nonce_manager, "batch_call", node.batch_call)
+    monkeypatch.setattr(nonce_manager, "get_web3_provider", lambda: node)
+    return node
+
+def test_nonces_are_handed_out_locally(node):
+    manager = NonceManager()
+    manager.seed_many([ADDRESS])
+    node.pending = 100
+    assert [manager.next_nonce(ADDRESS) for _ in range(3)] == [5, 6, 7]
+
+def test_released_nonce_is_reused_first(node):
+    manager = NonceManager()
+    nonces = [manager.next_nonce(ADDRESS) for _ in range(3)]
+    manager.release(ADDRESS, nonces[0])
+    assert manager.next_nonce(ADDRESS) == 5
+    assert manager.next_nonce(ADDRESS) == 8
+
+def test_releasing_last_nonce_closes_adjacent_gaps(node):
+    manager = NonceManager()
+    for _ in range(3):
+        manager.next_nonce(ADDRESS)
+    manager.release(ADDRESS, 6)
+    manager.release(ADDRESS, 7)
+    assert manager.next_nonce(ADDRESS) == 6
+
+def test_reseed_replaces_local_nonce_and_gaps(node):
+    manager = NonceManager()
+    for _ in range(3):
+        manager.next_nonce(ADDRESS)
+    manager.release(ADDRESS, 5)
+
+    # Транзакции 6 и 7 выпали из mempool: следующий режим начинает с nonce сети
+    manager.seed_many([ADDRESS])
+    assert [manager.next_nonce(ADDRESS) for _ in range(2)] == [5, 6]
+
+def test_failed_reseed_keeps_local_nonce(node, monkeypatch):
+    manager = NonceManager()
+    manager.next_nonce(ADDRESS)
+
+    def fail(addresses, tag):
+        raise ConnectionError("rpc down")
+    monkeypatch.setattr(nonce_manager, "get_transaction_counts", fail)
+    manager.seed_many([ADDRESS])
+    assert manager.next_nonce(ADDRESS) == 6
+
+def test_resync_without_trust_keeps_higher_local_nonce(node):
+    manager = NonceManager()
+    for _ in range(3):
+        manager.next_nonce(ADDRESS)
+    assert manager.resync(ADDRESS) == 8
+    assert manager.resync(ADDRESS, trust_chain=True) == 5
+
+def test_recover_gap_resyncs_after_dropped_transaction(node):
+    manager = NonceManager()
+    for _ in range(3):
+        manager.next_nonce(ADDRESS)
+    # В блок попала только транзакция с nonce 5, остальные выпали
+    node.latest = node.pending = 6
+
+    assert manager.recover_gap(ADDRESS, 6)
+    assert manager.next_nonce(ADDRESS) == 6
+
+@pytest.mark.parametrize("latest, pending", [(5, 8), (7, 7)])
+def test_recover_gap_keeps_nonce_in_mempool_or_mined(node, latest, pending):
+    manager = NonceManager()
+    for _ in range(3):
+        manager.next_nonce(ADDRESS)
+    node.latest, node.pending = latest, pending
+
+    assert not manager.recover_gap(ADDRESS, 6)
+    assert manager.next_nonce(ADDRESS) == 8
+
+def test_nonce_too_low_messages():
+    assert is_nonce_too_low_error(ValueError({"code": -32000, "message": "nonce too low"}))
+    assert is_nonce_too_low_error(ValueError("already known"))
+    assert not is_nonce_too_low_error(ValueError("insufficient funds"))
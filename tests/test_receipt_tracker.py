@@ -0,0 +1,112 @@
+import pytest
+
+import receipt_tracker
+from receipt_tracker import ReceiptTracker, ReceiptTimeout
+
+class FakeChain:
+    def __init__(self):
+        self.block = 10
+        # {хеш: номер блока}
+        self.mined = {}
+        self.requested = []
+
+    def batch_call(self, calls):
+        results = []
+        for method, params in calls:
+            if method == "eth_blockNumber":
+                results.append(hex(self.block))
+            else:
+                self.requested.append(params[0])
+                block = self.mined.get(params[0])
+                results.append(None if block is None else {"status": "0x1", "blockNumber": hex(block)})
+        return results
+
+@pytest.fixture
+def chain(monkeypatch):
+    chain = FakeChain()
+    monkeypatch.setattr(receipt_tracker, "batch_call", chain.batch_call)
+    # Опрос выполняет тест, фоновый поток не нужен
+    monkeypatch.setattr(ReceiptTracker, "_run", lambda self: None)
+    return chain
+
+def poll(tracker):
+    tracker._poll(list(tracker._pending))
+
+def test_unmined_transaction_is_not_requested_again_in_same_block(chain):
+    tracker = ReceiptTracker()
+    tracker.track("0xaa")
+    poll(tracker)
+    poll(tracker)
+    assert chain.requested == ["0xaa"]
+
+    chain.block += 1
+    poll(tracker)
+    assert chain.requested == ["0xaa", "0xaa"]
+
+def test_new_transaction_is_checked_without_waiting_for_next_block(chain):
+    tracker = ReceiptTracker()
+    first = tracker.track("0xaa")
+    poll(tracker)
+
+    # Вторая транзакция попала в уже известный блок
+    second = tracker.track("0xbb")
+    chain.mined["0xbb"] = 10
+    poll(tracker)
+
+    assert chain.requested == ["0xaa", "0xbb"]
+    assert second.result(0)["status"] == 1
+    assert not first.done()
+
+def test_receipt_waits_for_confirmations(chain):
+    tracker = ReceiptTracker(confirmations=3)
+    future = tracker.track("0xaa")
+    chain.mined["0xaa"] = 10
+    poll(tracker)
+    assert not future.done()
+
+    chain.block = 12
+    poll(tracker)
+    assert future.result(0)["blockNumber"] == 10
+
+def test_expired_transaction_fails_with_timeout(chain):
+    tracker = ReceiptTracker()
+    future = tracker.track("0xaa", timeout=0)
+    tracker._expire()
+    with pytest.raises(ReceiptTimeout):
+        future.result(0)
+    assert not tracker._unchecked
+
+def test_untrack_cancels_future(chain):
+    tracker = ReceiptTracker()
+    future = tracker.track("0xAA")
+    tracker.untrack("0xaa", future)
+    assert future.cancelled()
+    assert not tracker._pending and not tracker._unchecked
+
+def test_untrack_keeps_other_waiters(chain):
+    tracker = ReceiptTracker()
+    # Журнал и TxReplacer ждут одну и ту же транзакцию
+    journal_future = tracker.track("0xaa")
+    replacer_future = tracker.track("0xAA")
+    tracker.untrack("0xaa", replacer_future)
+
+    chain.mined["0xaa"] = 10
+    poll(tracker)
+
+    assert replacer_future.cancelled()
+    assert journal_future.result(0)["status"] == 1
+    assert not tracker._pending
+
+def test_waiters_have_own_deadlines(chain):
+    tracker = ReceiptTracker()
+    short = tracker.track("0xaa", timeout=0)
+    long = tracker.track("0xaa", timeout=60)
+    tracker._expire()
+
+    with pytest.raises(ReceiptTimeout):
+        short.result(0)
+    assert not long.done()
+
+    chain.mined["0xaa"] = 10
+    poll(tracker)
+    assert long.result(0)["blockNumber"] == 10
@@ -0,0 +1,82 @@
+import pytest
+import requests
+
+import rpc_batch
+
+def _http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+def _answer(payload):
+    return [{"jsonrpc": "2.0", "id": item["id"], "result": hex(item["id"])} for item in payload]
+
+@pytest.fixture(autouse=True)
+def batch_size(monkeypatch):
+    # Запомненный размер batch - глобальное состояние модуля
+    monkeypatch.setattr(rpc_batch, "_effective_batch_size", 8)
+
+def test_splits_calls_into_batches(monkeypatch):
+    sizes = []
+
+    def post_batch(payload):
+        sizes.append(len(payload))
+        return _answer(payload)
+
+    monkeypatch.setattr(rpc_batch, "post_batch", post_batch)
+    results = rpc_batch.batch_call([("eth_blockNumber", [])] * 10)
+
+    assert sizes == [8, 2]
+    assert results == [hex(i) for i in range(8)] + ["0x0", "0x1"]
+
+def test_shrinks_on_413(monkeypatch):
+    sizes = []
+
+    def post_batch(payload):
+        sizes.append(len(payload))
+        if len(payload) > 2:
+            raise _http_error(413)
+        return _answer(payload)
+
+    monkeypatch.setattr(rpc_batch, "post_batch", post_batch)
+    rpc_batch.batch_call([("eth_blockNumber", [])] * 4)
+
+    assert sizes == [4, 2, 2]
+    assert rpc_batch._get_batch_size() == 2
+
+def test_shrinks_on_batch_limit_error(monkeypatch):
+    def post_batch(payload):
+        if len(payload) > 1:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch too large"}}
+        return _answer(payload)
+
+    monkeypatch.setattr(rpc_batch, "post_batch", post_batch)
+    assert rpc_batch.batch_call([("eth_blockNumber", [])] * 2) == ["0x0", "0x0"]
+    assert rpc_batch._get_batch_size() == 1
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503])
+def test_server_errors_do_not_shrink(monkeypatch, status):
+    def post_batch(payload):
+        raise _http_error(status)
+
+    monkeypatch.setattr(rpc_batch, "post_batch", post_batch)
+    with pytest.raises(requests.HTTPError):
+        rpc_batch.batch_call([("eth_blockNumber", [])] * 4)
+    assert rpc_batch._get_batch_size() == 8
+
+def test_rate_limit_error_does_not_shrink(monkeypatch):
+    def post_batch(payload):
+        return {"jsonrpc": "2.0", "id": None, "error": {"code": -32005, "message": "request rate exceeded"}}
+
+    monkeypatch.setattr(rpc_batch, "post_batch", post_batch)
+    with pytest.raises(ValueError):
+        rpc_batch.batch_call([("eth_blockNumber", [])] * 4)
+    assert rpc_batch._get_batch_size() == 8
+
+def test_call_error_is_raised(monkeypatch):
+    def post_batch(payload):
+        return [{"jsonrpc": "2.0", "id": 0, "error": {"code": -32000, "message": "header not found"}}]
+
+    monkeypatch.setattr(rpc_batch, "post_batch", post_batch)
+    with pytest.raises(ValueError, match="header not found"):
+        rpc_batch.batch_call([("eth_getBalance", ["0x0", "latest"])])
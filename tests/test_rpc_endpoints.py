@@ -0,0 +1,98 @@
+import pytest
+
+import rpc_endpoints
+from rpc_endpoints import EndpointPool, EJECT_AFTER_FAILURES, EJECT_SECONDS, EJECT_MIN_SAMPLES
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rpc_endpoints, "time", clock)
+    return clock
+
+@pytest.fixture
+def pool(clock):
+    return EndpointPool(["http://a", "http://b"])
+
+def test_fastest_endpoint_is_chosen(pool):
+    a, b = pool.endpoints
+    pool.report(a, 1.0, ok=True)
+    pool.report(b, 0.1, ok=True)
+    assert pool.choose() is b
+    assert pool.choose(exclude=[b]) is a
+
+def test_ejected_after_consecutive_failures_not_before(pool):
+    a, b = pool.endpoints
+    for _ in range(EJECT_AFTER_FAILURES - 1):
+        pool.report(a, 0.1, ok=False)
+    # Доля ошибок уже выше порога, но запросов еще мало
+    assert a.error_rate > rpc_endpoints.EJECT_ERROR_RATE
+    assert not a.ejected_until
+
+    pool.report(a, 0.1, ok=False)
+    assert a.ejected_until == pytest.approx(100.0 + EJECT_SECONDS)
+    assert pool.choose() is b
+
+def test_success_resets_consecutive_failures(pool):
+    a, _ = pool.endpoints
+    for _ in range(3):
+        pool.report(a, 0.1, ok=False)
+        pool.report(a, 0.1, ok=True)
+        a.ejected_until = 0.0
+    assert a.failures == 0
+
+def test_ejected_by_error_rate_after_enough_samples(pool):
+    a, _ = pool.endpoints
+    for _ in range(EJECT_MIN_SAMPLES):
+        pool.report(a, 0.1, ok=True)
+    # Ошибки через одну: подряд их меньше порога, но доля растет
+    for _ in range(10):
+        pool.report(a, 0.1, ok=False)
+        pool.report(a, 0.1, ok=False)
+        if a.ejected_until:
+            break
+        pool.report(a, 0.1, ok=True)
+    assert a.ejected_until
+    assert a.failures < EJECT_AFTER_FAILURES
+
+def test_readmitted_after_timeout_and_backoff_doubles(pool, clock):
+    a, b = pool.endpoints
+    for _ in range(EJECT_AFTER_FAILURES):
+        pool.report(a, 0.01, ok=False)
+    pool.report(b, 1.0, ok=True)
+    assert pool.choose() is b
+
+    clock.now += EJECT_SECONDS
+    assert pool.choose() is a
+    assert (a.failures, a.samples, a.ejected_until) == (0, 0, 0.0)
+
+    # Сразу после возврата одна ошибка не исключает endpoint снова
+    pool.report(a, 0.01, ok=False)
+    assert not a.ejected_until
+
+    for _ in range(EJECT_AFTER_FAILURES - 1):
+        pool.report(a, 0.01, ok=False)
+    assert a.ejected_until == pytest.approx(clock.now + 2 * EJECT_SECONDS)
+
+def test_all_ejected_returns_earliest_readmission(pool, clock):
+    a, b = pool.endpoints
+    for _ in range(EJECT_AFTER_FAILURES):
+        pool.report(a, 0.1, ok=False)
+    clock.now += 1
+    for _ in range(EJECT_AFTER_FAILURES):
+        pool.report(b, 0.1, ok=False)
+    assert pool.choose() is a
+
+def test_single_endpoint_is_never_ejected(clock):
+    pool = EndpointPool(["http://only"])
+    (only,) = pool.endpoints
+    for _ in range(EJECT_AFTER_FAILURES + EJECT_MIN_SAMPLES):
+        pool.report(only, 0.1, ok=False)
+    assert not only.ejected_until
+    assert pool.choose() is only
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+import deadlines
+import rpc_limiter
+import utils
+from deadlines import deadline, DeadlineExceeded
+from rpc_limiter import RpcRateLimiter, METHOD_READ, METHOD_CALL, METHOD_SEND
+
+URL = "https://rpc.example"
+OTHER_URL = "https://rpc2.example"
+
+class FakeClock:
+    """
+    Часы для utils, rpc_limiter и deadlines: sleep() сдвигает время без ожидания
+    """
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    for module in (utils, rpc_limiter, deadlines):
+        monkeypatch.setattr(module, "time", clock)
+    return clock
+
+@pytest.fixture
+def limiter(clock):
+    return RpcRateLimiter({METHOD_READ: 4, METHOD_CALL: 2, METHOD_SEND: 1})
+
+def test_method_classes():
+    assert rpc_limiter.method_class("eth_sendRawTransaction") == METHOD_SEND
+    assert rpc_limiter.method_class("eth_estimateGas") == METHOD_CALL
+    assert rpc_limiter.method_class("eth_getBalance") == METHOD_READ
+
+def test_classes_have_separate_buckets(limiter, clock):
+    assert limiter.acquire(URL, ["eth_sendRawTransaction"]) == 0.0
+    # Лимит отправок исчерпан, чтение и eth_call не ждут
+    assert limiter.acquire(URL, ["eth_getBalance"] * 4) == 0.0
+    assert limiter.acquire(URL, ["eth_call", "eth_estimateGas"]) == 0.0
+    assert clock.sleeps == []
+
+    assert limiter.acquire(URL, ["eth_sendRawTransaction"]) == pytest.approx(1.0)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+def test_endpoints_have_separate_buckets(limiter, clock):
+    limiter.acquire(URL, ["eth_sendRawTransaction"])
+    assert limiter.acquire(OTHER_URL, ["eth_sendRawTransaction"]) == 0.0
+    assert clock.sleeps == []
+
+def test_batch_spends_tokens_of_each_class(limiter, clock):
+    assert limiter.acquire(URL, ["eth_call", "eth_call", "eth_blockNumber"]) == 0.0
+
+    # Из чтения потрачен один токен из четырех, eth_call - оба
+    assert limiter.acquire(URL, ["eth_getBalance"] * 3) == 0.0
+    assert limiter.acquire(URL, ["eth_call"]) == pytest.approx(0.5)
+
+def test_batch_larger_than_capacity_is_taken_in_pieces(limiter, clock):
+    # 10 чтений при запасе 4 и скорости 4/с: 4 сразу, затем две порции по 4 и 2 токена
+    assert limiter.acquire(URL, ["eth_getBalance"] * 10) == pytest.approx(1.5)
+    assert clock.sleeps == [pytest.approx(1.0), pytest.approx(0.5)]
+
+def test_throttle_honors_retry_after(limiter, clock):
+    limiter.throttle(URL, 3.0)
+
+    # Пауза действует на все классы endpoint, другие endpoint не затронуты
+    assert limiter.acquire(OTHER_URL, ["eth_getBalance"]) == 0.0
+    assert limiter.acquire(URL, ["eth_getBalance"]) == pytest.approx(3.0)
+    assert limiter.acquire(URL, ["eth_sendRawTransaction"]) == 0.0
+    assert clock.sleeps == [pytest.approx(3.0)]
+
+def test_wait_beyond_deadline_raises(limiter, clock):
+    limiter.acquire(URL, ["eth_sendRawTransaction"])
+
+    with deadline(0.5):
+        with pytest.raises(DeadlineExceeded):
+            limiter.acquire(URL, ["eth_sendRawTransaction"])
+    assert clock.sleeps == []
+
+    # Ожидание, которое укладывается в бюджет, выполняется
+    with deadline(5):
+        assert limiter.acquire(URL, ["eth_sendRawTransaction"]) == pytest.approx(1.0)
+
+def test_throttle_beyond_deadline_raises(limiter, clock):
+    limiter.throttle(URL, 30.0)
+    with deadline(10):
+        with pytest.raises(DeadlineExceeded):
+            limiter.acquire(URL, ["eth_getBalance"])
+
+def test_acquire_async_waits_without_blocking(limiter, clock, monkeypatch):
+    async def sleep(seconds):
+        clock.sleep(seconds)
+    monkeypatch.setattr(rpc_limiter.asyncio, "sleep", sleep)
+    limiter.acquire(URL, ["eth_sendRawTransaction"])
+
+    assert asyncio.run(limiter.acquire_async(URL, ["eth_sendRawTransaction"])) == pytest.approx(1.0)
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from eth_account import Account
+
+import signer
+
+MESSAGE = signer.SEASON1_MESSAGE
+
+def _keys(count: int):
+    return [(i + 1).to_bytes(32, "big") for i in range(count)]
+
+@pytest.fixture
+def fresh_cache(monkeypatch, tmp_path):
+    """Пустой кэш подписей с файлом во временной директории"""
+    path = tmp_path / "signatures.json"
+    monkeypatch.setattr(signer, "SIGNATURE_CACHE_FILE", str(path))
+    monkeypatch.setattr(signer, "_signature_cache", {})
+    monkeypatch.setattr(signer, "_signature_cache_loaded", False)
+    return path
+
+@pytest.mark.parametrize("count", [signer.SIGN_POOL_THRESHOLD - 1, signer.SIGN_POOL_THRESHOLD + 44])
+def test_sign_many_matches_serial_signing(count):
+    keys = _keys(count)
+    # Часть ключей в hex, с префиксом и без
+    mixed = [key.hex() if i % 3 == 1 else "0x" + key.hex() if i % 3 == 2 else key for i, key in enumerate(keys)]
+
+    signatures = signer.sign_many(mixed, MESSAGE, max_workers=2, chunk_size=64)
+
+    assert signatures == [signer.generate_signature(key.hex(), MESSAGE) for key in keys]
+
+def test_get_signatures_signs_only_missing(fresh_cache, monkeypatch):
+    keys = _keys(4)
+    addresses = [Account.from_key(key).address for key in keys]
+    first = signer.get_signature("0x" + keys[0].hex(), MESSAGE)
+    signed = []
+    sign_many = signer.sign_many
+
+    def counting_sign_many(private_keys, message):
+        signed.extend(private_keys)
+        return sign_many(private_keys, message)
+    monkeypatch.setattr(signer, "sign_many", counting_sign_many)
+
+    signatures = signer.get_signatures(keys, MESSAGE, addresses)
+
+    assert signatures[0] == first
+    assert signed == keys[1:]
+    assert all(signer.verify_signature(address, MESSAGE, signature)
+               for address, signature in zip(addresses, signatures))
+
+def test_signature_cache_round_trip(fresh_cache, monkeypatch):
+    keys = _keys(3)
+    addresses = [Account.from_key(key).address for key in keys]
+    signatures = signer.get_signatures(keys, MESSAGE, addresses)
+    signer.save_signature_cache()
+
+    assert set(json.loads(fresh_cache.read_text())[MESSAGE]) == {address.lower() for address in addresses}
+
+    # Новый запуск: подписи берутся из файла, без подписи ключами
+    monkeypatch.setattr(signer, "_signature_cache", {})
+    monkeypatch.setattr(signer, "_signature_cache_loaded", False)
+    def fail(private_keys, message):
+        raise AssertionError("подписи должны быть взяты из кэша")
+    monkeypatch.setattr(signer, "sign_many", fail)
+
+    assert signer.get_signatures(keys, MESSAGE, addresses) == signatures
@@ -0,0 +1,174 @@
+import math
+from concurrent.futures import Future
+
+import pytest
+from eth_account import Account
+from web3 import Web3
+
+import tx_replacer
+from tx_replacer import TxReplacer, FeeCapReached, MIN_REPLACEMENT_BUMP, CANCEL_GAS_LIMIT
+from receipt_tracker import ReceiptTimeout
+
+GWEI = 10 ** 9
+ACCOUNT = Account.from_key("0x" + "11" * 32)
+
+def make_tx(max_fee=20 * GWEI, priority_fee=2 * GWEI, nonce=7):
+    return {
+        "to": Web3.to_checksum_address("0x" + "bb" * 20),
+        "value": 0,
+        "data": b"\x01",
+        "gas": 60000,
+        "nonce": nonce,
+        "chainId": 1,
+        "maxFeePerGas": max_fee,
+        "maxPriorityFeePerGas": priority_fee
+    }
+
+def assert_replaceable(old_tx, max_fee, priority_fee):
+    # Правило ноды: обе комиссии выше прежних хотя бы на 10%
+    assert max_fee >= math.ceil(old_tx["maxFeePerGas"] * (1 + MIN_REPLACEMENT_BUMP))
+    assert priority_fee >= math.ceil(old_tx["maxPriorityFeePerGas"] * (1 + MIN_REPLACEMENT_BUMP))
+    assert max_fee >= priority_fee
+
+@pytest.fixture
+def network_fees(monkeypatch):
+    fees = {"priority_fee_wei": 1 * GWEI, "max_fee_wei": 10 * GWEI}
+    monkeypatch.setattr(tx_replacer, "estimate_fees", lambda: fees)
+    return fees
+
+@pytest.mark.parametrize("max_fee, priority_fee", [
+    (20 * GWEI, 2 * GWEI),
+    # Малые значения: округление не должно съесть повышение
+    (11, 1),
+    (10 * GWEI + 1, 10 * GWEI + 1),
+])
+def test_bump_meets_replacement_rule(network_fees, max_fee, priority_fee):
+    old_tx = make_tx(max_fee, priority_fee)
+    assert_replaceable(old_tx, *TxReplacer()._bumped_fees(old_tx))
+
+def test_bump_follows_higher_network_estimate(network_fees):
+    network_fees.update(priority_fee_wei=5 * GWEI, max_fee_wei=60 * GWEI)
+    old_tx = make_tx()
+    assert TxReplacer()._bumped_fees(old_tx) == (60 * GWEI, 5 * GWEI)
+
+def test_bump_is_clamped_to_cap_when_cap_allows_minimum(network_fees):
+    old_tx = make_tx(max_fee=20 * GWEI)
+    # 12.5% дало бы 22.5 Gwei, потолок 22 Gwei еще выше минимальных 10%
+    max_fee, priority_fee = TxReplacer(fee_cap_gwei=22)._bumped_fees(old_tx)
+    assert max_fee == 22 * GWEI
+    assert_replaceable(old_tx, max_fee, priority_fee)
+
+def test_bump_above_cap_raises(network_fees):
+    with pytest.raises(FeeCapReached):
+        TxReplacer(fee_cap_gwei=21.9)._bumped_fees(make_tx(max_fee=20 * GWEI))
+
+class FakeTracker:
+    """Подтверждает хеши из confirmed, остальные сразу завершаются по таймауту"""
+
+    def __init__(self):
+        self.confirmed = set()
+        self.untracked = []
+
+    def track(self, tx_hash, timeout=None):
+        future = Future()
+        if tx_hash in self.confirmed:
+            future.set_result({"transactionHash": tx_hash, "status": 1})
+        else:
+            future.set_exception(ReceiptTimeout(tx_hash))
+        return future
+
+    def untrack(self, tx_hash, future):
+        self.untracked.append(tx_hash)
+
+class FakeNode:
+    def __init__(self):
+        self.sent = []
+        self.nonce_used = False
+
+    @property
+    def eth(self):
+        return self
+
+    def send_raw_transaction(self, raw):
+        if self.nonce_used:
+            raise ValueError({"code": -32000, "message": "nonce too low"})
+        self.sent.append(raw)
+        return Web3.keccak(raw)
+
+class FakeNonceManager:
+    def __init__(self):
+        self.checked = []
+
+    def recover_gap(self, address, nonce):
+        self.checked.append((address, nonce))
+        return False
+
+@pytest.fixture
+def replacer(monkeypatch, network_fees):
+    tracker, node, manager = FakeTracker(), FakeNode(), FakeNonceManager()
+    monkeypatch.setattr(tx_replacer, "get_receipt_tracker", lambda: tracker)
+    monkeypatch.setattr(tx_replacer, "get_web3_provider", lambda: node)
+    monkeypatch.setattr(tx_replacer, "get_nonce_manager", lambda: manager)
+    replacer = TxReplacer()
+    replacer.tracker, replacer.node, replacer.manager = tracker, node, manager
+    return replacer
+
+def confirm_replacements(replacer, monkeypatch, cancel_only=False):
+    """Подтверждает замены (или только отмену) и возвращает список всех отправленных версий"""
+    watched = []
+    original_watch = replacer.watch
+
+    def watch(account, tx, tx_hash):
+        watched.append(tx)
+        if tx["to"] == account.address or not cancel_only:
+            replacer.tracker.confirmed.add(tx_hash)
+        original_watch(account, tx, tx_hash)
+    monkeypatch.setattr(replacer, "watch", watch)
+    return watched
+
+def test_wait_returns_receipt_of_speed_up(replacer, monkeypatch):
+    replacer.watch(ACCOUNT, make_tx(), "0xoriginal")
+    confirm_replacements(replacer, monkeypatch)
+
+    receipt = replacer.wait(ACCOUNT.address, 7, max_replacements=3)
+    assert receipt["transactionHash"] != "0xoriginal"
+    assert receipt["status"] == 1
+    assert len(replacer.node.sent) == 1
+    assert not replacer.manager.checked
+
+def test_wait_cancels_after_replacement_limit(replacer, monkeypatch):
+    replacer.watch(ACCOUNT, make_tx(), "0xoriginal")
+    watched = confirm_replacements(replacer, monkeypatch, cancel_only=True)
+
+    # Подтвердилась отмена, а не сама транзакция
+    assert replacer.wait(ACCOUNT.address, 7, max_replacements=2) is None
+
+    *speed_ups, cancel_tx = watched
+    assert len(speed_ups) == 2
+    assert cancel_tx["to"] == ACCOUNT.address
+    assert cancel_tx["value"] == 0
+    assert cancel_tx["gas"] == CANCEL_GAS_LIMIT
+    assert_replaceable(speed_ups[-1], cancel_tx["maxFeePerGas"], cancel_tx["maxPriorityFeePerGas"])
+    # Nonce занят отменой, проверять дыру не нужно
+    assert not replacer.manager.checked
+
+def test_wait_gives_up_when_cancel_is_not_confirmed(replacer):
+    replacer.watch(ACCOUNT, make_tx(), "0xoriginal")
+    assert replacer.wait(ACCOUNT.address, 7, max_replacements=1) is None
+    # Ускорение и отмена
+    assert len(replacer.node.sent) == 2
+    assert replacer.manager.checked == [(ACCOUNT.address, 7)]
+
+def test_wait_leaves_transaction_at_fee_cap(replacer):
+    replacer.fee_cap_wei = 21 * GWEI
+    replacer.watch(ACCOUNT, make_tx(max_fee=20 * GWEI), "0xoriginal")
+    assert replacer.wait(ACCOUNT.address, 7) is None
+    assert not replacer.node.sent
+    assert replacer.manager.checked == [(ACCOUNT.address, 7)]
+
+def test_wait_stops_replacing_when_nonce_is_used(replacer):
+    replacer.node.nonce_used = True
+    replacer.watch(ACCOUNT, make_tx(), "0xoriginal")
+    assert replacer.wait(ACCOUNT.address, 7) is None
+    assert not replacer.node.sent
+    assert replacer.manager.checked == [(ACCOUNT.address, 7)]
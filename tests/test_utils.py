@@ -0,0 +1,95 @@
+from email.utils import format_datetime
+from datetime import datetime, timezone
+
+import pytest
+
+import utils
+from utils import TokenBucket, parse_retry_after
+
+class FakeClock:
+    """
+    Часы для utils.time: sleep() сдвигает время без ожидания
+    """
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(utils, "time", clock)
+    return clock
+
+def test_bucket_starts_full(clock):
+    bucket = TokenBucket(rate=5)
+    assert [bucket.try_acquire() for _ in range(5)] == [0.0] * 5
+    assert bucket.try_acquire() == pytest.approx(0.2)
+
+def test_bucket_refills_at_rate(clock):
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.try_acquire(2)
+    clock.now += 0.1
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.1)
+
+def test_bucket_does_not_exceed_capacity(clock):
+    bucket = TokenBucket(rate=10, capacity=2)
+    clock.now += 60
+    assert bucket.try_acquire(2) == 0.0
+    assert bucket.try_acquire() > 0
+
+def test_acquire_waits_for_tokens(clock):
+    bucket = TokenBucket(rate=4, capacity=1)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.25)
+    assert clock.sleeps == [pytest.approx(0.25)]
+
+def test_unlimited_bucket_never_waits(clock):
+    bucket = TokenBucket(rate=0)
+    assert all(bucket.try_acquire() == 0.0 for _ in range(1000))
+
+@pytest.mark.parametrize("rate", [0, 10])
+def test_pause_blocks_all_tokens(clock, rate):
+    bucket = TokenBucket(rate=rate)
+    bucket.pause(3)
+    assert bucket.try_acquire() == pytest.approx(3)
+    clock.now += 3
+    assert bucket.try_acquire() == 0.0
+
+def test_pause_does_not_shorten_longer_pause(clock):
+    bucket = TokenBucket(rate=10)
+    bucket.pause(5)
+    bucket.pause(1)
+    assert bucket.try_acquire() == pytest.approx(5)
+
+@pytest.mark.parametrize("value, expected", [
+    (None, 2.0),
+    ("", 2.0),
+    ("7", 7.0),
+    ("1.5", 1.5),
+    ("-3", 0.0),
+    ("soon", 2.0),
+])
+def test_parse_retry_after_seconds(clock, value, expected):
+    assert parse_retry_after(value, 2.0) == expected
+
+def test_parse_retry_after_http_date(clock):
+    clock.now = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    value = format_datetime(datetime(2026, 1, 1, 0, 0, 30, tzinfo=timezone.utc), usegmt=True)
+    assert parse_retry_after(value, 2.0) == pytest.approx(30)
+
+def test_parse_retry_after_date_in_past(clock):
+    clock.now = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    value = format_datetime(datetime(2025, 12, 31, tzinfo=timezone.utc), usegmt=True)
+    assert parse_retry_after(value, 2.0) == 0.0
@@ -0,0 +1,100 @@
+import hashlib
+import json
+
+import pytest
+from eth_account import Account
+
+import wallet_loader
+from wallet_loader import iter_wallet_chunks, key_fingerprint
+
+EXCHANGE = "0x742d35Cc6634C0532925a3b844Bc454e4438f44e"
+
+def _key(i: int) -> bytes:
+    return (i + 1).to_bytes(32, "big")
+
+@pytest.fixture
+def cache_file(monkeypatch, tmp_path):
+    """Пустой кэш адресов с файлом во временной директории"""
+    path = tmp_path / "wallet_cache.json"
+    monkeypatch.setattr(wallet_loader, "WALLET_CACHE_FILE", str(path))
+    monkeypatch.setattr(wallet_loader, "_address_cache", {})
+    monkeypatch.setattr(wallet_loader, "_address_cache_source", None)
+    monkeypatch.setattr(wallet_loader, "_address_cache_loaded", False)
+    return path
+
+@pytest.fixture
+def wallets_file(tmp_path):
+    lines = ["# ключи", ""]
+    for i in range(5):
+        # Ключи с префиксом и без, у части есть адрес биржи
+        key = _key(i).hex()
+        lines.append(("0x" + key if i % 2 else key) + (f",{EXCHANGE.lower()}" if i == 1 else ""))
+        if i == 2:
+            lines.append("zz-not-a-key")
+    path = tmp_path / "wallets.txt"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+def _reset_memory(monkeypatch):
+    # Новый запуск: кэш в памяти пуст, читается с диска
+    monkeypatch.setattr(wallet_loader, "_address_cache", {})
+    monkeypatch.setattr(wallet_loader, "_address_cache_source", None)
+    monkeypatch.setattr(wallet_loader, "_address_cache_loaded", False)
+
+def test_chunks_and_offsets(cache_file, wallets_file):
+    chunks = list(iter_wallet_chunks(str(wallets_file), chunk_size=2))
+    content = wallets_file.read_bytes()
+
+    # Строка с некорректным ключом занимает место в пачке и отбрасывается
+    assert [len(wallets) for wallets, _ in chunks] == [2, 1, 2]
+    wallets = [wallet for chunk, _ in chunks for wallet in chunk]
+    assert [wallet.key for wallet in wallets] == [_key(i) for i in range(5)]
+    assert [wallet.address for wallet in wallets] == [Account.from_key(_key(i)).address for i in range(5)]
+    assert wallets[1].exchange_address == EXCHANGE
+    # Смещение - конец последней прочитанной строки пачки (строки 3, 5 и конец файла)
+    ends = [len(b"".join(content.splitlines(keepends=True)[:n])) for n in (4, 6)]
+    assert [offset for _, offset in chunks] == ends + [len(content)]
+
+def test_resume_from_offset(cache_file, wallets_file):
+    chunks = iter_wallet_chunks(str(wallets_file), chunk_size=2)
+    first, offset = next(chunks)
+    chunks.close()
+
+    resumed = [wallet.key for chunk, _ in iter_wallet_chunks(str(wallets_file), offset=offset, chunk_size=2)
+               for wallet in chunk]
+
+    assert [wallet.key for wallet in first] == [_key(0), _key(1)]
+    assert resumed == [_key(i) for i in range(2, 5)]
+
+def test_start_and_stop_lines(cache_file, wallets_file):
+    # Строки 0-1 - комментарий и пустая, 5 - некорректный ключ
+    keys = [wallet.key for chunk, _ in iter_wallet_chunks(str(wallets_file), start=3, stop=7) for wallet in chunk]
+    assert keys == [_key(1), _key(2), _key(3)]
+
+def test_full_read_saves_digest_and_prunes_cache(cache_file, wallets_file, monkeypatch):
+    stale = key_fingerprint(_key(100))
+    cache_file.write_text(json.dumps({"source": None, "addresses": {stale: "0x" + "ab" * 20}}))
+
+    list(iter_wallet_chunks(str(wallets_file), chunk_size=2))
+
+    data = json.loads(cache_file.read_text())
+    assert data["source"] == hashlib.sha256(wallets_file.read_bytes()).hexdigest()
+    assert set(data["addresses"]) == {key_fingerprint(_key(i)) for i in range(5)}
+
+    # Следующий проход по неизмененному файлу не вычисляет адреса и не переписывает кэш
+    _reset_memory(monkeypatch)
+    def fail(keys):
+        raise AssertionError("адреса должны быть взяты из кэша")
+    monkeypatch.setattr(wallet_loader, "_derive_chunk", fail)
+    cache_file.write_text(cache_file.read_text() + " ")
+    written = cache_file.read_text()
+
+    assert len([w for chunk, _ in iter_wallet_chunks(str(wallets_file)) for w in chunk]) == 5
+    assert cache_file.read_text() == written
+
+def test_partial_read_does_not_record_digest(cache_file, wallets_file):
+    list(iter_wallet_chunks(str(wallets_file), stop=4))
+
+    data = json.loads(cache_file.read_text())
+    assert data["source"] is None
+    assert set(data["addresses"]) == {key_fingerprint(_key(i)) for i in range(2)}
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import math
+import logging
+import threading
+from concurrent.futures import wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Tuple
+from web3 import Web3
+from eth_account.signers.local import LocalAccount
+from dotenv import load_dotenv
+
+from rpc_provider import get_web3_provider
+from gas_oracle import estimate_fees
+from nonce_manager import get_nonce_manager, is_nonce_too_low_error
+from receipt_tracker import get_receipt_tracker, RECEIPT_TIMEOUT
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# Константы
+# Минимальное повышение обеих комиссий, которое ноды принимают для замены (geth: 10%)
+MIN_REPLACEMENT_BUMP = 0.10
+# Повышение комиссий при каждой замене (с запасом над минимальным)
+REPLACEMENT_BUMP = max(float(os.getenv("TX_REPLACEMENT_BUMP", "0.125")), MIN_REPLACEMENT_BUMP)
+# Потолок maxFeePerGas для замен, Gwei
+MAX_FEE_CAP_GWEI = float(os.getenv("TX_MAX_FEE_CAP_GWEI", "100"))
+# Сколько секунд ждать подтверждения перед очередной заменой
+REPLACE_AFTER_SECONDS = float(os.getenv("TX_REPLACE_AFTER", str(RECEIPT_TIMEOUT)))
+# Максимальное количество замен одной транзакции
+MAX_REPLACEMENTS = int(os.getenv("TX_MAX_REPLACEMENTS", "3"))
+# Газ для отмены: перевод 0 ETH самому себе
+CANCEL_GAS_LIMIT = 21000
+
+class FeeCapReached(Exception):
+    """Замена требует комиссию выше TX_MAX_FEE_CAP_GWEI"""
+
+class TxReplacer:
+    """
+    Следит за отправленными транзакциями и заменяет зависшие: та же
+    транзакция с тем же nonce переподписывается с повышенными комиссиями
+    (не меньше чем на MIN_REPLACEMENT_BUMP, иначе нода ее отклонит) или
+    заменяется переводом 0 ETH самому себе для отмены.
+
+    Транзакции хранятся по ключу (адрес, nonce) вместе со всеми хешами
+    замен: подтвердиться может любая из них.
+    """
+
+    def __init__(self, fee_cap_gwei: float = MAX_FEE_CAP_GWEI):
+        self.fee_cap_wei = Web3.to_wei(fee_cap_gwei, 'gwei')
+        self._lock = threading.Lock()
+        # {(адрес в нижнем регистре, nonce): {"account", "tx", "hashes"}}
+        self._pending: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+    def watch(self, account: LocalAccount, tx: Dict[str, Any], tx_hash: str) -> None:
+        """
+        Регистрирует отправленную транзакцию для возможной замены
+
+        Args:
+            account (LocalAccount): Аккаунт, которым транзакция подписана
+            tx (Dict[str, Any]): Неподписанная EIP-1559 транзакция (с nonce и комиссиями)
+            tx_hash (str): Хеш отправленной транзакции
+        """
+        key = (account.address.lower(), tx["nonce"])
+        with self._lock:
+            entry = self._pending.setdefault(key, {"account": account, "tx": tx, "hashes": []})
+            entry["tx"] = tx
+            entry["hashes"].append(tx_hash)
+
+    def _bumped_fees(self, tx: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        Рассчитывает комиссии замены: повышение на REPLACEMENT_BUMP,
+        но не ниже текущей оценки сети и не выше потолка
+        """
+        old_max_fee = tx["maxFeePerGas"]
+        old_priority_fee = tx["maxPriorityFeePerGas"]
+        fees = estimate_fees()
+
+        priority_fee = max(math.ceil(old_priority_fee * (1 + REPLACEMENT_BUMP)), fees["priority_fee_wei"])
+        max_fee = max(math.ceil(old_max_fee * (1 + REPLACEMENT_BUMP)), fees["max_fee_wei"], priority_fee)
+
+        if max_fee > self.fee_cap_wei:
+            # Упираемся в потолок, если он еще позволяет минимальное повышение
+            min_max_fee = math.ceil(old_max_fee * (1 + MIN_REPLACEMENT_BUMP))
+            if self.fee_cap_wei < max(min_max_fee, priority_fee):
+                raise FeeCapReached(
+                    f"Для замены нужен maxFee {Web3.from_wei(max_fee, 'gwei'):.2f} Gwei, "
+                    f"потолок {Web3.from_wei(self.fee_cap_wei, 'gwei'):.2f} Gwei"
+                )
+            max_fee = self.fee_cap_wei
+
+        return max_fee, priority_fee
+
+    def _replace(self, address: str, nonce: int, cancel: bool) -> Optional[str]:
+        logger = logging.getLogger("tx_replacer")
+        key = (address.lower(), nonce)
+
+        with self._lock:
+            entry = self._pending.get(key)
+        if entry is None:
+            raise KeyError(f"Транзакция {address} с nonce {nonce} не отслеживается")
+
+        old_tx = entry["tx"]
+        max_fee, priority_fee = self._bumped_fees(old_tx)
+
+        if cancel:
+            new_tx = {
+                "to": entry["account"].address,
+                "value": 0,
+                "data": b"",
+                "gas": CANCEL_GAS_LIMIT,
+                "nonce": nonce,
+                "chainId": old_tx["chainId"]
+            }
+        else:
+            new_tx = dict(old_tx)
+        new_tx["maxFeePerGas"] = max_fee
+        new_tx["maxPriorityFeePerGas"] = priority_fee
+
+        web3 = get_web3_provider()
+        signed_tx = entry["account"].sign_transaction(new_tx)
+        try:
+            tx_hash = Web3.to_hex(web3.eth.send_raw_transaction(signed_tx.rawTransaction))
+        except Exception as e:
+            if is_nonce_too_low_error(e):
+                # Одна из отправленных версий уже попала в блок
+                logger.info(f"Nonce {nonce} для {address} уже использован, замена не нужна")
+                return None
+            raise
+
+        action = "Отмена" if cancel else "Ускорение"
+        logger.info(f"{action} транзакции {address} nonce {nonce}: {tx_hash}, "
+                    f"maxFee={Web3.from_wei(max_fee, 'gwei'):.2f} gwei, "
+                    f"priorityFee={Web3.from_wei(priority_fee, 'gwei'):.2f} gwei")
+        self.watch(entry["account"], new_tx, tx_hash)
+        return tx_hash
+
+    def speed_up(self, address: str, nonce: int) -> Optional[str]:
+        """
+        Отправляет ту же транзакцию с тем же nonce и повышенными комиссиями
+
+        Args:
+            address (str): Адрес отправителя
+            nonce (int): Nonce зависшей транзакции
+
+        Returns:
+            Optional[str]: Хеш замены или None, если nonce уже использован в сети
+
+        Raises:
+            FeeCapReached: Если замена требует комиссию выше потолка
+        """
+        return self._replace(address, nonce, cancel=False)
+
+    def cancel(self, address: str, nonce: int) -> Optional[str]:
+        """
+        Отменяет зависшую транзакцию переводом 0 ETH самому себе с тем же nonce
+
+        Args:
+            address (str): Адрес отправителя
+            nonce (int): Nonce зависшей транзакции
+
+        Returns:
+            Optional[str]: Хеш отмены или None, если nonce уже использован в сети
+
+        Raises:
+            FeeCapReached: Если отмена требует комиссию выше потолка
+        """
+        return self._replace(address, nonce, cancel=True)
+
+    def wait(
+        self,
+        address: str,
+        nonce: int,
+        max_replacements: int = MAX_REPLACEMENTS,
+        replace_first: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Ждет подтверждения транзакции, ускоряя ее каждые REPLACE_AFTER_SECONDS
+        секунд. После max_replacements замен транзакция отменяется, чтобы
+        освободить nonce для следующих транзакций кошелька. Если замена
+        упирается в потолок комиссии, отменить транзакцию тоже нельзя
+        (отмене нужно такое же повышение), и она остается в mempool.
+
+        Args:
+            address (str): Адрес отправителя
+            nonce (int): Nonce транзакции
+            max_replacements (int): Максимальное количество ускорений до отмены
+            replace_first (bool): Сразу ускорить транзакцию (подтверждения уже ждали)
+
+        Returns:
+            Optional[Dict[str, Any]]: Receipt подтвержденной версии (ее хеш в
+                                      transactionHash) или None, если не дождались
+                                      или подтвердилась отмена
+        """
+        logger = logging.getLogger("tx_replacer")
+        tracker = get_receipt_tracker()
+        key = (address.lower(), nonce)
+        replacements = 0
+        cancel_hash = None
+        # Больше замен не будет: отправлена отмена или nonce уже занят одной из версий
+        final = False
+
+        try:
+            while True:
+                with self._lock:
+                    hashes = list(self._pending[key]["hashes"])
+
+                # Ждем любую из версий транзакции
+                futures = {} if replace_first else {
+                    tracker.track(tx_hash, timeout=REPLACE_AFTER_SECONDS): tx_hash for tx_hash in hashes
+                }
+                replace_first = False
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if not future.cancelled() and future.exception() is None:
+                            # Перестаем ждать остальные версии (только свои Future)
+                            for other in pending:
+                                tracker.untrack(futures[other], other)
+                            receipt = future.result()
+                            if cancel_hash is not None and receipt["transactionHash"].lower() == cancel_hash.lower():
+                                logger.info(f"Транзакция {address} nonce {nonce} отменена: {cancel_hash}")
+                                return None
+                            return receipt
+
+                if final:
+                    logger.warning(f"Транзакция {address} nonce {nonce} не подтверждена")
+                    return self._give_up(address, nonce)
+
+                try:
+                    if replacements < max_replacements:
+                        new_hash = self.speed_up(address, nonce)
+                        replacements += 1
+                    else:
+                        logger.warning(f"Транзакция {address} nonce {nonce} не подтверждена "
+                                       f"после {replacements} замен, отменяем")
+                        new_hash = cancel_hash = self.cancel(address, nonce)
+                        final = True
+                except FeeCapReached as e:
+                    logger.warning(f"Транзакция {address} nonce {nonce} не заменена: {str(e)}")
+                    return self._give_up(address, nonce)
+                except Exception as e:
+                    logger.error(f"Ошибка при замене транзакции {address} nonce {nonce}: {str(e)}")
+                    return self._give_up(address, nonce)
+
+                if new_hash is None:
+                    # Nonce занят одной из версий: дожидаемся ее receipt без замен
+                    final = True
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _give_up(self, address: str, nonce: int) -> None:
+        """
+        Транзакцию не дождались: если она выпала из mempool, закрываем
+        дыру в nonce, иначе следующие транзакции кошелька застрянут
+        """
+        logger = logging.getLogger("tx_replacer")
+        try:
+            get_nonce_manager().recover_gap(address, nonce)
+        except Exception as e:
+            logger.warning(f"Не удалось проверить nonce {nonce} для {address}: {str(e)}")
+        return None
+
+    def wait_for(self, account: LocalAccount, tx: Dict[str, Any], tx_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Регистрирует транзакцию и ждет ее подтверждения с заменами (см. wait)
+
+        Args:
+            account (LocalAccount): Аккаунт отправителя
+            tx (Dict[str, Any]): Неподписанная транзакция
+            tx_hash (str): Хеш отправленной транзакции
+
+        Returns:
+            Optional[Dict[str, Any]]: Receipt или None, если не дождались
+        """
+        self.watch(account, tx, tx_hash)
+        return self.wait(account.address, tx["nonce"])
+
+# Общий для процесса экземпляр
+_replacer_lock = threading.Lock()
+_replacer: Optional[TxReplacer] = None
+
+def get_tx_replacer() -> TxReplacer:
+    """
+    Возвращает общий для процесса TxReplacer
+
+    Returns:
+        TxReplacer: Заменитель транзакций
+    """
+    global _replacer
+    with _replacer_lock:
+        if _replacer is None:
+            _replacer = TxReplacer()
+        return _replacer
@@ -2,10 +2,16 @@
 # -*- coding: utf-8 -*-
 
 import os
+import math
+import time
 import logging
 import datetime
-from typing import List, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
 
 def setup_logging(log_dir: str = "logs") -> None:
     """
@@ -29,6 +35,7 @@ def setup_logging(log_dir: str = "logs") -> None:
         ("api_checker", f"{log_dir}/api_checker_{current_date}.log"),
         ("eligibility", f"{log_dir}/eligibility_{current_date}.log"),
         ("balance_checker", f"{log_dir}/balance_checker_{current_date}.log"),
+        ("gas_oracle", f"{log_dir}/gas_oracle_{current_date}.log"),
         ("gas_balance", f"{log_dir}/gas_balance_{current_date}.log"),
         ("token_balance", f"{log_dir}/token_balance_{current_date}.log"),
         ("claimer", f"{log_dir}/claimer_{current_date}.log"),
@@ -118,6 +125,150 @@ def parallel_process(tasks: List[Dict[str, Any]], worker_function, max_workers:
     
     return results
 
+def process_map_chunked(
+    worker: Callable[[List[Any]], List[Any]],
+    items: List[Any],
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> List[Any]:
+    """
+    Выполняет CPU-задачу в пуле процессов, передавая данные пачками
+    
+    Args:
+        worker: Функция верхнего уровня модуля, принимающая пачку и возвращающая
+                список результатов той же длины
+        items (List[Any]): Входные данные
+        max_workers (Optional[int]): Количество процессов (по умолчанию - число ядер)
+        chunk_size (Optional[int]): Размер пачки (по умолчанию ~4 пачки на процесс)
+        
+    Returns:
+        List[Any]: Результаты в порядке входных данных
+    """
+    workers = max_workers or os.cpu_count() or 1
+    # Несколько пачек на процесс, чтобы нагрузка распределялась равномерно
+    chunk_size = chunk_size or max(1, math.ceil(len(items) / (workers * 4)))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # executor.map возвращает результаты в порядке пачек
+        return [result for chunk in executor.map(worker, chunks) for result in chunk]
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """
+    Разбирает заголовок Retry-After (секунды или HTTP-дата)
+    
+    Args:
+        value (Optional[str]): Значение заголовка
+        default (float): Пауза, если заголовка нет или он не разобран
+        
+    Returns:
+        float: Пауза в секундах
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return default
+
+def create_http_session(pool_size: int = 32) -> requests.Session:
+    """
+    Создает HTTP-сессию с пулом keep-alive соединений
+    
+    Args:
+        pool_size (int): Максимальное количество соединений в пуле
+        
+    Returns:
+        requests.Session: Сессия с подключенным пулом
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты запросов (token bucket).
+    Токены пополняются со скоростью rate в секунду до capacity;
+    acquire() блокирует вызывающий поток, пока токен не появится.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate (float): Количество запросов в секунду (0 или меньше - без ограничения)
+            capacity (Optional[float]): Максимальный запас токенов (по умолчанию rate)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Забирает токены без ожидания, если они есть
+        
+        Args:
+            tokens (float): Количество токенов (не больше capacity)
+            
+        Returns:
+            float: 0.0, если токены получены, иначе сколько секунд подождать
+                   перед следующей попыткой
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.rate > 0:
+                self._refill(now)
+            wait = self._blocked_until - now
+            if wait > 0:
+                return wait
+            if self.rate <= 0:
+                return 0.0
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+            
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Забирает токены, при необходимости ожидая их пополнения
+        
+        Args:
+            tokens (float): Количество токенов (не больше capacity)
+            
+        Returns:
+            float: Время ожидания в секундах
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+            
+    def pause(self, seconds: float) -> None:
+        """
+        Приостанавливает выдачу токенов всем потокам (например, после ответа 429)
+        
+        Args:
+            seconds (float): Длительность паузы в секундах
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
 def create_env_file() -> bool:
     """
     Создает файл .env если его не существует
@@ -2,75 +2,449 @@
 # -*- coding: utf-8 -*-
 
 import os
+import json
+import hashlib
 import logging
-from typing import List, Dict, Optional
+import threading
+from typing import List, Dict, Optional, Set, Tuple, Iterator, Union, Any
 from eth_account import Account
+from eth_account.signers.local import LocalAccount
 from dotenv import load_dotenv
 from web3 import Web3
 
+from utils import process_map_chunked
+
 # Загружаем переменные окружения
 load_dotenv()
 
-def load_wallets(file_path: str = "wallets.txt") -> List[Dict[str, str]]:
+# Файл кэша адресов {отпечаток ключа: адрес}
+WALLET_CACHE_FILE = os.getenv("WALLET_CACHE_FILE", ".wallet_cache.json")
+# Меньше этого количества ключей адреса вычисляются в текущем процессе
+DERIVE_POOL_THRESHOLD = 256
+# Количество кошельков в одной пачке при потоковом чтении файла
+WALLET_CHUNK_SIZE = int(os.getenv("WALLET_CHUNK_SIZE", "1000"))
+
+# Кэш адресов в памяти и хеш файла кошельков, для которого он был сохранен
+_address_cache_lock = threading.Lock()
+_address_cache: Dict[str, str] = {}
+_address_cache_source: Optional[str] = None
+_address_cache_loaded = False
+
+class Wallet:
+    """
+    Кошелек из файла: ключ в виде 32 байт, checksum-адрес и адрес биржи.
+    Адреса вычисляются и приводятся к checksum один раз при загрузке,
+    LocalAccount создается при первом обращении и переиспользуется.
+    
+    Для совместимости со старым кодом поддерживает доступ как к словарю:
+    wallet["private_key"], wallet["address"], wallet.get("exchange_address").
     """
-    Загружает приватные ключи из файла и возвращает список кошельков
+    
+    __slots__ = ("key", "address", "exchange_address", "_account")
+    
+    def __init__(self, key: bytes, address: str, exchange_address: Optional[str] = None):
+        self.key = key
+        self.address = address
+        self.exchange_address = exchange_address
+        self._account: Optional[LocalAccount] = None
+        
+    @property
+    def private_key(self) -> str:
+        """Приватный ключ в формате hex без префикса 0x"""
+        return self.key.hex()
+        
+    @property
+    def account(self) -> LocalAccount:
+        """LocalAccount для подписи транзакций (создается один раз)"""
+        if self._account is None:
+            self._account = Account.from_key(self.key)
+        return self._account
+        
+    def __getitem__(self, name: str) -> Any:
+        if name not in ("private_key", "address", "exchange_address"):
+            raise KeyError(name)
+        return getattr(self, name)
+        
+    def get(self, name: str, default: Any = None) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            return default
+        
+    def __repr__(self) -> str:
+        # Ключ в repr не выводим, чтобы он не попал в логи
+        return f"Wallet(address={self.address!r}, exchange_address={self.exchange_address!r})"
+
+def local_account(wallet_or_key: Union[Wallet, str]) -> LocalAccount:
+    """
+    Возвращает LocalAccount для кошелька или приватного ключа.
+    Для Wallet используется уже созданный аккаунт, ключ заново не разбирается.
     
     Args:
-        file_path (str): Путь к файлу с приватными ключами
+        wallet_or_key (Union[Wallet, str]): Кошелек или приватный ключ (с или без префикса 0x)
+        
+    Returns:
+        LocalAccount: Аккаунт для подписи
+    """
+    if isinstance(wallet_or_key, Wallet):
+        return wallet_or_key.account
+    if wallet_or_key.startswith("0x"):
+        wallet_or_key = wallet_or_key[2:]
+    return Account.from_key(wallet_or_key)
+
+def key_fingerprint(key: bytes) -> str:
+    """
+    Возвращает отпечаток приватного ключа (SHA-256), по которому нельзя восстановить ключ
+    
+    Args:
+        key (bytes): Приватный ключ в виде 32 байт
+        
+    Returns:
+        str: Отпечаток в формате hex
+    """
+    return hashlib.sha256(key).hexdigest()
+
+def _derive_chunk(keys: List[bytes]) -> List[Optional[str]]:
+    """
+    Вычисляет адреса для пачки ключей (выполняется в процессе пула)
+    
+    Args:
+        keys (List[bytes]): Ключи в виде 32 байт
+        
+    Returns:
+        List[Optional[str]]: Адреса или None для некорректных ключей
+    """
+    addresses = []
+    for key in keys:
+        try:
+            addresses.append(Account.from_key(key).address)
+        except Exception:
+            addresses.append(None)
+    return addresses
+
+def _load_address_cache() -> None:
+    """
+    Загружает кэш адресов из WALLET_CACHE_FILE. Вызывается под _address_cache_lock.
+    """
+    global _address_cache_source, _address_cache_loaded
+    logger = logging.getLogger("wallet_loader")
+    
+    _address_cache_loaded = True
+    if not os.path.exists(WALLET_CACHE_FILE):
+        return
+        
+    try:
+        with open(WALLET_CACHE_FILE, "r") as f:
+            data = json.load(f)
+        _address_cache.update(data.get("addresses", {}))
+        _address_cache_source = data.get("source")
+    except Exception as e:
+        logger.warning(f"Не удалось загрузить кэш адресов: {str(e)}")
+
+def _save_address_cache(source_digest: Optional[str], fingerprints: Optional[Set[str]]) -> None:
+    """
+    Сохраняет в кэш адреса ключей из текущего файла кошельков
+    
+    Args:
+        source_digest (Optional[str]): SHA-256 содержимого файла кошельков или None, если он неизвестен
+        fingerprints (Optional[Set[str]]): Отпечатки ключей, которые есть в файле,
+                                           или None, чтобы сохранить все известные адреса
+    """
+    global _address_cache_source
+    logger = logging.getLogger("wallet_loader")
+    
+    with _address_cache_lock:
+        if fingerprints is None:
+            addresses = dict(_address_cache)
+        else:
+            addresses = {fp: address for fp, address in _address_cache.items() if fp in fingerprints}
+        _address_cache_source = source_digest
+        
+    try:
+        tmp_path = f"{WALLET_CACHE_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"source": source_digest, "addresses": addresses}, f)
+        os.replace(tmp_path, WALLET_CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить кэш адресов: {str(e)}")
+
+def derive_addresses(private_keys: List[str], max_workers: Optional[int] = None) -> List[Optional[str]]:
+    """
+    Вычисляет адреса для списка приватных ключей. Уже известные адреса берутся
+    из кэша по отпечатку ключа, остальные вычисляются в пуле процессов.
+    
+    Args:
+        private_keys (List[str]): Приватные ключи (с или без префикса 0x)
+        max_workers (Optional[int]): Количество процессов (по умолчанию - число ядер)
+        
+    Returns:
+        List[Optional[str]]: Checksum-адреса в порядке ключей или None для некорректных ключей
+    """
+    logger = logging.getLogger("wallet_loader")
+    
+    keys: List[Optional[bytes]] = []
+    for private_key in private_keys:
+        try:
+            keys.append(bytes.fromhex(private_key[2:] if private_key.startswith("0x") else private_key))
+        except ValueError:
+            keys.append(None)
+    fingerprints = [key_fingerprint(key) if key is not None else None for key in keys]
+    
+    with _address_cache_lock:
+        if not _address_cache_loaded:
+            _load_address_cache()
+        addresses = [_address_cache.get(fp) if fp else None for fp in fingerprints]
+        
+    missing = [i for i, address in enumerate(addresses) if address is None and keys[i] is not None]
+    if not missing:
+        return addresses
+        
+    missing_keys = [keys[i] for i in missing]
+    if len(missing_keys) < DERIVE_POOL_THRESHOLD:
+        derived = _derive_chunk(missing_keys)
+    else:
+        logger.info(f"Вычисление {len(missing_keys)} адресов в пуле процессов")
+        derived = process_map_chunked(_derive_chunk, missing_keys, max_workers)
+        
+    with _address_cache_lock:
+        for i, address in zip(missing, derived):
+            addresses[i] = address
+            if address is not None:
+                _address_cache[fingerprints[i]] = address
+                
+    return addresses
+
+def _parse_wallet_line(line: str, line_number: int) -> Tuple[str, Optional[str]]:
+    """
+    Разбирает строку файла кошельков вида ПРИВАТНЫЙ_КЛЮЧ[,АДРЕС_БИРЖИ]
+    
+    Args:
+        line (str): Строка без пробелов по краям (не пустая и не комментарий)
+        line_number (int): Номер строки с нуля (для сообщений в логе)
+        
+    Returns:
+        Tuple[str, Optional[str]]: (приватный ключ без 0x, checksum-адрес биржи или None)
+    """
+    logger = logging.getLogger("wallet_loader")
+    
+    # Разделяем строку на приватный ключ и адрес биржи
+    parts = line.split(",")
+    private_key = parts[0].strip()
+    
+    # Удаляем префикс 0x, если он есть
+    if private_key.startswith("0x"):
+        private_key = private_key[2:]
+    
+    # Проверяем наличие адреса биржи во второй части
+    exchange_address = None
+    if len(parts) > 1 and parts[1].strip() and parts[1].strip().lower() != "нету":
+        exchange_address = parts[1].strip()
+        # Проверяем формат адреса биржи
+        if exchange_address.startswith("0x") and Web3.is_address(exchange_address):
+            exchange_address = Web3.to_checksum_address(exchange_address)
+        else:
+            logger.warning(f"Некорректный адрес биржи в строке {line_number+1}: {exchange_address}")
+    
+    return private_key, exchange_address
+
+def _build_wallets(parsed: List[Tuple[int, str, Optional[str]]]) -> List[Wallet]:
+    """
+    Вычисляет адреса для разобранных строк и собирает объекты Wallet.
+    Строки с некорректным ключом пропускаются с ошибкой в логе.
+    
+    Args:
+        parsed (List[Tuple[int, str, Optional[str]]]): Список (номер строки, приватный ключ, адрес биржи)
         
     Returns:
-        List[Dict[str, str]]: Список словарей с данными кошельков 
-                             (приватный ключ и соответствующий адрес)
+        List[Wallet]: Кошельки в порядке строк
     """
     logger = logging.getLogger("wallet_loader")
     
+    # Получаем адреса из кэша или вычисляем их для новых ключей
+    addresses = derive_addresses([private_key for _, private_key, _ in parsed])
+    
     wallets = []
+    for (i, private_key, exchange_address), address in zip(parsed, addresses):
+        if address is None:
+            logger.error(f"Ошибка при обработке строки {i+1}: некорректный приватный ключ")
+            continue
+            
+        wallets.append(Wallet(bytes.fromhex(private_key), address, exchange_address))
+    return wallets
+
+def iter_wallet_chunks(
+    file_path: str = "wallets.txt",
+    start: int = 0,
+    stop: Optional[int] = None,
+    offset: int = 0,
+    chunk_size: int = WALLET_CHUNK_SIZE
+) -> Iterator[Tuple[List[Wallet], int]]:
+    """
+    Лениво читает файл кошельков и отдает их пачками. В памяти находится
+    только текущая пачка, поэтому первые кошельки можно обрабатывать
+    до того, как прочитан весь файл.
+    
+    Args:
+        file_path (str): Путь к файлу с приватными ключами
+        start (int): Номер первой строки (с нуля, считая от offset)
+        stop (Optional[int]): Номер строки, перед которой чтение останавливается (None - до конца файла)
+        offset (int): Смещение в байтах, с которого начинается чтение
+                      (значение, полученное вместе с предыдущей пачкой)
+        chunk_size (int): Количество кошельков в пачке
+        
+    Yields:
+        Tuple[List[Wallet], int]: (пачка кошельков, смещение в байтах
+                                          сразу после последней прочитанной строки)
+    """
+    logger = logging.getLogger("wallet_loader")
+    
+    if not os.path.exists(file_path):
+        logger.error(f"Файл с приватными ключами не найден: {file_path}")
+        return
+        
+    with _address_cache_lock:
+        if not _address_cache_loaded:
+            _load_address_cache()
+        derived_before = len(_address_cache)
+        
+    # Хеш файла и отпечатки ключей для кэша адресов собираются по ходу чтения,
+    # но имеют смысл только если файл прочитан целиком
+    whole_file = offset == 0 and start == 0 and stop is None
+    digest = hashlib.sha256()
+    fingerprints: Set[str] = set()
+    
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        position = offset
+        parsed = []
+        
+        for i, raw_line in enumerate(f):
+            if stop is not None and i >= stop:
+                break
+            position += len(raw_line)
+            if whole_file:
+                digest.update(raw_line)
+            if i < start:
+                continue
+                
+            line = raw_line.decode("utf-8").strip()
+            if not line or line.startswith("#"):
+                continue
+                
+            try:
+                private_key, exchange_address = _parse_wallet_line(line, i)
+                parsed.append((i, private_key, exchange_address))
+            except Exception as e:
+                logger.error(f"Ошибка при обработке строки {i+1}: {str(e)}")
+                continue
+                
+            if whole_file:
+                try:
+                    fingerprints.add(key_fingerprint(bytes.fromhex(private_key)))
+                except ValueError:
+                    # Некорректный ключ: ошибку в лог запишет _build_wallets
+                    pass
+                
+            if len(parsed) >= chunk_size:
+                wallets = _build_wallets(parsed)
+                parsed = []
+                # Пачку, в которой все ключи оказались некорректными, не отдаем
+                if wallets:
+                    yield wallets, position
+                
+        wallets = _build_wallets(parsed) if parsed else []
+        if wallets:
+            yield wallets, position
+            
+    # Новые адреса сохраняем, чтобы не вычислять их при следующем проходе.
+    # После чтения всего файла записываем его хеш и убираем адреса ключей,
+    # которых в файле больше нет
+    with _address_cache_lock:
+        derived_new = len(_address_cache) != derived_before
+        cached_source = _address_cache_source
+    if whole_file:
+        source_digest = digest.hexdigest()
+        if derived_new or source_digest != cached_source:
+            _save_address_cache(source_digest, fingerprints)
+    elif derived_new:
+        _save_address_cache(None, None)
+
+def iter_wallets(
+    file_path: str = "wallets.txt",
+    start: int = 0,
+    stop: Optional[int] = None,
+    offset: int = 0
+) -> Iterator[Wallet]:
+    """
+    Лениво читает кошельки из файла по одному (см. iter_wallet_chunks)
+    
+    Args:
+        file_path (str): Путь к файлу с приватными ключами
+        start (int): Номер первой строки (с нуля, считая от offset)
+        stop (Optional[int]): Номер строки, перед которой чтение останавливается
+        offset (int): Смещение в байтах, с которого начинается чтение
+        
+    Yields:
+        Wallet: Кошелек (приватный ключ, адрес и адрес биржи)
+    """
+    for chunk, _ in iter_wallet_chunks(file_path, start, stop, offset):
+        yield from chunk
+
+def load_wallets(file_path: str = "wallets.txt") -> List[Wallet]:
+    """
+    Загружает приватные ключи из файла и возвращает список кошельков.
+    Адреса берутся из кэша (для неизмененного файла вычислений не требуется),
+    а для новых ключей вычисляются в пуле процессов.
+    
+    Args:
+        file_path (str): Путь к файлу с приватными ключами
+        
+    Returns:
+        List[Wallet]: Список кошельков (приватный ключ, адрес и адрес биржи)
+    """
+    logger = logging.getLogger("wallet_loader")
+    
     try:
         if not os.path.exists(file_path):
             logger.error(f"Файл с приватными ключами не найден: {file_path}")
             return []
             
-        with open(file_path, "r") as f:
-            lines = f.readlines()
-            
+        with open(file_path, "rb") as f:
+            content = f.read()
+        source_digest = hashlib.sha256(content).hexdigest()
+        lines = content.decode("utf-8").splitlines()
+        
+        # Разбираем строки: (номер строки, приватный ключ, адрес биржи)
+        parsed = []
         for i, line in enumerate(lines):
             line = line.strip()
             if not line or line.startswith("#"):
                 continue
             
             try:
-                # Разделяем строку на приватный ключ и адрес биржи
-                parts = line.split(",")
-                private_key = parts[0].strip()
-                
-                # Удаляем префикс 0x, если он есть
-                if private_key.startswith("0x"):
-                    private_key = private_key[2:]
-                
-                # Создаем аккаунт из приватного ключа, чтобы получить адрес
-                account = Account.from_key(private_key)
-                address = account.address
-                
-                # Проверяем наличие адреса биржи во второй части
-                exchange_address = None
-                if len(parts) > 1 and parts[1].strip() and parts[1].strip().lower() != "нету":
-                    exchange_address = parts[1].strip()
-                    # Проверяем формат адреса биржи
-                    if exchange_address.startswith("0x") and Web3.is_address(exchange_address):
-                        exchange_address = Web3.to_checksum_address(exchange_address)
-                    else:
-                        logger.warning(f"Некорректный адрес биржи в строке {i+1}: {exchange_address}")
-                
-                # Добавляем кошелек в список
-                wallet = {
-                    "private_key": private_key,
-                    "address": address,
-                    "exchange_address": exchange_address
-                }
-                wallets.append(wallet)
-                
+                private_key, exchange_address = _parse_wallet_line(line, i)
+                parsed.append((i, private_key, exchange_address))
             except Exception as e:
                 logger.error(f"Ошибка при обработке строки {i+1}: {str(e)}")
+        
+        with _address_cache_lock:
+            if not _address_cache_loaded:
+                _load_address_cache()
+            file_unchanged = _address_cache_source == source_digest
+        if file_unchanged:
+            logger.info("Файл кошельков не изменился, адреса берутся из кэша")
+        
+        wallets = _build_wallets(parsed)
+        
+        # Обновляем кэш, только если файл изменился
+        if not file_unchanged:
+            fingerprints = set()
+            for _, private_key, _ in parsed:
+                try:
+                    fingerprints.add(key_fingerprint(bytes.fromhex(private_key)))
+                except ValueError:
+                    continue
+            _save_address_cache(source_digest, fingerprints)
                 
         logger.info(f"Успешно загружено {len(wallets)} кошельков")
         return wallets
@@ -79,6 +453,56 @@ def load_wallets(file_path: str = "wallets.txt") -> List[Dict[str, str]]:
         logger.error(f"Ошибка при загрузке кошельков: {str(e)}")
         return []
 
+def remove_wallets(addresses: List[str], file_path: str = "wallets.txt") -> int:
+    """
+    Удаляет из файла строки кошельков с указанными адресами.
+    Файл переписывается построчно через временный файл, пустые строки
+    удаляются, комментарии сохраняются.
+    
+    Args:
+        addresses (List[str]): Адреса удаляемых кошельков
+        file_path (str): Путь к файлу с приватными ключами
+        
+    Returns:
+        int: Количество кошельков, оставшихся в файле
+    """
+    remove_set = {address.lower() for address in addresses}
+    kept_wallets = 0
+    
+    def flush(out, lines: List[str]) -> int:
+        keys = [line.split(",")[0].strip() for line in lines]
+        kept = 0
+        for line, address in zip(lines, derive_addresses(keys)):
+            # Строки с некорректным ключом оставляем как есть, но не считаем
+            if address is None:
+                out.write(f"{line}\n")
+            elif address.lower() not in remove_set:
+                out.write(f"{line}\n")
+                kept += 1
+        return kept
+    
+    tmp_path = f"{file_path}.tmp"
+    with open(file_path, "r") as f, open(tmp_path, "w") as out:
+        pending = []
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                # Сохраняем порядок строк: сначала записываем накопленные ключи
+                kept_wallets += flush(out, pending)
+                pending = []
+                out.write(f"{line}\n")
+                continue
+            pending.append(line)
+            if len(pending) >= WALLET_CHUNK_SIZE:
+                kept_wallets += flush(out, pending)
+                pending = []
+        kept_wallets += flush(out, pending)
+        
+    os.replace(tmp_path, file_path)
+    return kept_wallets
+
 def create_sample_wallets_file(file_path: str = "wallets.txt") -> bool:
     """
     Создает шаблон файла с примерами приватных ключей и адресов бирж